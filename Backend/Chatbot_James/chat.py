@@ -1,20 +1,13 @@
-import os
 from dotenv import load_dotenv
-from groq import Groq
 import json
 
-# Load environment variables
-load_dotenv()
-API_KEY = os.getenv("GROQ_API_KEY")
+from LLM.gateway import chat_completion
 
-if not API_KEY:
-    raise RuntimeError("GROQ_API_KEY not found in environment variables")
+# Load environment variables (GROQ_API_KEY is checked by the LLM gateway on first call)
+load_dotenv()
 
 QUESTIONS_FILE = "questions.json"
 
-# Initialize Groq client
-client = Groq(api_key=API_KEY)
-
 #------------------------------------
 # Step 1- Question Generation Functions
 #------------------------------------
@@ -59,13 +52,14 @@ def generate_questions(domain: str):
         - Hard questions should be **challenging**, requiring reasoning, troubleshooting, optimization, or advanced domain knowledge.
     """
 
-    response = client.chat.completions.create(
+    response = chat_completion(
         model="llama-3.1-8b-instant",
         messages=[{"role": "user", "content": prompt}],
         temperature=0.2,
+        cache_site="chatbot_questions",
     )
 
-    questions_json = response.choices[0].message.content.strip()
+    questions_json = response.strip()
 
     return    questions_json
 
@@ -157,13 +151,13 @@ Guidelines:
 - Be constructive and professional.
 """
 
-    response = client.chat.completions.create(
+    response = chat_completion(
         model="llama-3.1-8b-instant",
         messages=[{"role": "user", "content": prompt}],
         temperature=0.3,
     )
 
-    return response.choices[0].message.content.strip()
+    return response.strip()
 
 # ----------------------------
 # Main Chat Flow
@@ -210,15 +204,15 @@ def evaluate_candidate_in_api_old2(domain: str, answers: list[dict]):
         please  return  your  response  very  carefully  according  to  what  your  task  is 
     """
 
-    response = client.chat.completions.create(
+    response = chat_completion(
         model="llama-3.1-8b-instant",
         messages=[{"role": "user", "content": prompt}],
         temperature=0.2,
     )
 
-    print("evaluation  llm  response.choices[0]   ",response.choices[0])
+    print("evaluation  llm  response   ",response)
 
-    return response.choices[0].message.content
+    return response
 
 
 def evaluate_candidate_in_api(domain: str, answers: list[dict]):
@@ -262,17 +256,18 @@ def evaluate_candidate_in_api(domain: str, answers: list[dict]):
 
     """
 
-    response = client.chat.completions.create(
+    response = chat_completion(
         model="llama-3.1-8b-instant",
         messages=[
             {"role": "system", "content": "You output strict JSON only."},
             {"role": "user", "content": prompt}
         ],
         temperature=0,
+        cache_site="chatbot_evaluation",
     )
 
-    response_choices  =  response.choices[0].message.content
-    print("response_choices  (response.choices[0].message.content)     ", response_choices)
+    response_choices  =  response
+    print("response_choices     ", response_choices)
 
     return response_choices
 
@@ -321,15 +316,15 @@ def evaluate_candidate_in_api_old3(domain: str, answers: list[dict]):
         ]
     """
 
-    response = client.chat.completions.create(
+    response = chat_completion(
         model="llama-3.1-8b-instant",
         messages=[{"role": "user", "content": prompt}],
         temperature=0.2,
     )
 
-    print("evaluation  llm  response.choices[0]   ",response.choices[0])
+    print("evaluation  llm  response   ",response)
 
-    return response.choices[0].message.content
+    return response
 
 
 #
@@ -370,15 +365,15 @@ def evaluate_candidate_in_api_old(domain: str, formatted_answers):
         - Be constructive and professional.
     """
 
-    response = client.chat.completions.create(
+    response = chat_completion(
         model="llama-3.1-8b-instant",
         messages=[{"role": "user", "content": prompt}],
         temperature=0.3,
     )
 
-    print("evaluation  llm  response.choices[0]   ",response.choices[0])
+    print("evaluation  llm  response   ",response)
 
-    return response.choices[0].message.content
+    return response
 
 if __name__ == "__main__":
     startChat()
\ No newline at end of file
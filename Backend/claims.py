@@ -0,0 +1,152 @@
+# claims.py
+# Atomic claiming of CandidateEvalAI work, safe with several schedulers/workers
+# on the same database.
+#
+# One transaction selects a bounded batch with SELECT ... FOR UPDATE SKIP LOCKED
+# (rows another claimer holds are skipped, not waited on), then sets the
+# picked-up flag and stamps updated_at with this claim's timestamp. With row
+# locks (MySQL, PostgreSQL) the locked rows are this claim's. SQLite has no
+# row locks: there the timestamp is the claim token, and only rows still
+# carrying it are returned (SQLite keeps microseconds, so two claims never
+# share a token; MySQL DATETIME columns may not, and do not need to).
+#
+# updated_at is the lease: a picked-up row that has not been touched for
+# CANDIDATE_EVAL_LEASE_MINUTES is claimable again. Running jobs renew it
+# (renew_leases, every CLAIM_RENEW_SECONDS), so it only expires when the
+# worker holding the row is gone.
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, or_
+
+from Backend.extensions import db
+from Backend.models.candidate_models import CandidateEvalAI
+
+CLAIM_BATCH_SIZE = int(os.getenv("CANDIDATE_EVAL_CLAIM_BATCH", "10"))
+CLAIM_LEASE_MINUTES = int(os.getenv("CANDIDATE_EVAL_LEASE_MINUTES", "30"))
+# Running jobs re-stamp their rows this often: three renewals per lease
+CLAIM_RENEW_SECONDS = CLAIM_LEASE_MINUTES * 60 / 3
+
+
+# Work kinds: (filters for rows that need the work, the row's picked-up flag)
+def _generation_kind():
+    return (
+        (CandidateEvalAI.to_pickup.is_(True), CandidateEvalAI.completed.is_(False)),
+        CandidateEvalAI.picked_up,
+    )
+
+
+def _evaluation_kind():
+    return (
+        (CandidateEvalAI.candidate_attempted.is_(True), CandidateEvalAI.evaluation_completed.is_(False)),
+        CandidateEvalAI.evaluation_picked_up,
+    )
+
+
+_KINDS = {"evaluation": _evaluation_kind, "generation": _generation_kind}
+
+
+def _claimable(ready_filters, flag, now):
+    lease_expired = now - timedelta(minutes=CLAIM_LEASE_MINUTES)
+    return (
+        *ready_filters,
+        or_(flag.is_(False), flag.is_(None), CandidateEvalAI.updated_at < lease_expired),
+    )
+
+
+def _row_locks():
+    # SELECT ... FOR UPDATE is a no-op on SQLite
+    return db.session.get_bind().dialect.name != "sqlite"
+
+
+def _as_utc(value):
+    # MySQL / SQLite hand back naive datetimes; the app stores UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _claim(ready_filters, flag, batch_size, exclude_ids=()):
+    """
+    Claim up to `batch_size` rows matching `ready_filters` whose `flag` column is unset or whose lease expired.
+    Each returned row carries `queued_at`: its updated_at before the claim (when it became ready).
+    """
+    now = datetime.now(timezone.utc)
+    claimable = _claimable(ready_filters, flag, now)
+    if exclude_ids:
+        claimable += (CandidateEvalAI.id.notin_(list(exclude_ids)),)
+
+    try:
+        queued_at = {
+            row.id: _as_utc(row.updated_at) for row in db.session.query(CandidateEvalAI.id, CandidateEvalAI.updated_at)
+            .filter(*claimable)
+            .order_by(CandidateEvalAI.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        }
+        if queued_at:
+            db.session.query(CandidateEvalAI).filter(
+                CandidateEvalAI.id.in_(list(queued_at)), *claimable
+            ).update({flag: True, CandidateEvalAI.updated_at: now}, synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if not queued_at:
+        return []
+    won = (CandidateEvalAI.id.in_(list(queued_at)), flag.is_(True))
+    if not _row_locks():
+        won += (CandidateEvalAI.updated_at == now,)
+    records = CandidateEvalAI.query.filter(*won).order_by(CandidateEvalAI.id).all()
+    for record in records:
+        record.queued_at = queued_at[record.id] or now
+    return records
+
+
+def claim_generation_records(batch_size=None, exclude_ids=()):
+    """Candidates waiting for a quiz; returned rows have picked_up=True."""
+    return _claim(*_generation_kind(), batch_size or CLAIM_BATCH_SIZE, exclude_ids)
+
+
+def claim_evaluation_records(batch_size=None, exclude_ids=()):
+    """Attempted quizzes waiting for SAQ scoring; returned rows have evaluation_picked_up=True."""
+    return _claim(*_evaluation_kind(), batch_size or CLAIM_BATCH_SIZE, exclude_ids)
+
+
+def renew_leases(kind, record_ids):
+    """
+    Re-stamp updated_at of `kind` ("generation" | "evaluation") rows that are still picked up
+    and not done, so their lease does not expire under a running job. Returns the rows renewed.
+    """
+    if not record_ids:
+        return 0
+    ready_filters, flag = _KINDS[kind]()
+    try:
+        renewed = db.session.query(CandidateEvalAI).filter(
+            CandidateEvalAI.id.in_(list(record_ids)), *ready_filters, flag.is_(True)
+        ).update({CandidateEvalAI.updated_at: datetime.now(timezone.utc)}, synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return renewed
+
+
+def queue_stats():
+    """{"generation"|"evaluation": {"pending", "oldest_age_s"}} for work nobody holds yet."""
+    now = datetime.now(timezone.utc)
+    stats = {}
+    for name, kind in _KINDS.items():
+        ready_filters, flag = kind()
+        pending, oldest = db.session.query(
+            func.count(CandidateEvalAI.id), func.min(CandidateEvalAI.updated_at)
+        ).filter(*_claimable(ready_filters, flag, now)).one()
+        oldest = _as_utc(oldest)
+        stats[name] = {
+            "pending": pending,
+            "oldest_age_s": round((now - oldest).total_seconds(), 1) if oldest else None,
+        }
+    db.session.commit()
+    return stats
@@ -6,8 +6,12 @@ DB_PASS = os.getenv("DB_Password")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT") 
 
+# Questions per generated quiz (upload routes and candidate jobs)
+MAX_QUESTIONS = 20
+
 class Config:
-    SQLALCHEMY_DATABASE_URI = (
+    # DATABASE_URL overrides the MySQL settings (e.g. sqlite for benchmarks)
+    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL") or (
         f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
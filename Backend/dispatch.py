@@ -0,0 +1,94 @@
+# dispatch.py
+# Wake-ups for the job lanes (Backend/jobs.py), so work starts as soon as a row
+# becomes ready instead of at the next poll.
+#
+# Whoever flips to_pickup / candidate_attempted (the Django side) calls
+#   POST /jobs/wake   {"lane": "evaluation" | "generation"}   (no lane: both)
+# on the web app. wake() runs this process's listeners (the in-process
+# scheduler) and forwards the call to every worker in WORKER_WAKE_URLS, each
+# serving serve_wake_endpoint() (python -m Backend.worker --wake-port 8006).
+# Polling stays on as a safety net for missed or failed wake-ups.
+import os
+import json
+import threading
+import urllib.request
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# e.g. "http://10.0.0.5:8006/wake,http://10.0.0.6:8006/wake"
+WORKER_WAKE_URLS = [url.strip() for url in os.getenv("WORKER_WAKE_URLS", "").split(",") if url.strip()]
+WAKE_TIMEOUT_SECONDS = float(os.getenv("WAKE_TIMEOUT_SECONDS", "0.5"))
+
+_listeners = []
+
+
+def add_listener(callback):
+    """Call `callback(lane)` on every wake() in this process (lane None: all lanes)."""
+    _listeners.append(callback)
+
+
+def _forward(url, lane):
+    body = json.dumps({"lane": lane}).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=WAKE_TIMEOUT_SECONDS):
+            pass
+    except Exception as e:
+        # The worker's poll picks the work up anyway
+        print(f"⚠️ Wake-up to {url} failed: {e}")
+
+
+def wake(lane=None):
+    """Start `lane` (None: every lane) now, here and on the workers in WORKER_WAKE_URLS. Does not block."""
+    for callback in list(_listeners):
+        try:
+            callback(lane)
+        except Exception as e:
+            print(f"⚠️ Wake-up listener failed: {e}")
+    for url in WORKER_WAKE_URLS:
+        threading.Thread(target=_forward, args=(url, lane), daemon=True).start()
+
+
+def serve_wake_endpoint(port, callback, host="0.0.0.0"):
+    """
+    Serve POST /wake on a background thread; each request calls `callback(lane)`.
+    The callback returns False for an unknown lane (answered with 400). Returns the server.
+    """
+    class WakeHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            parsed = urlparse(self.path)
+            if parsed.path.rstrip("/") != "/wake":
+                self._reply(404, {"error": "Not found"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}") if length else {}
+            except ValueError:
+                self._reply(400, {"error": "Invalid JSON"})
+                return
+            lane = (payload or {}).get("lane") or parse_qs(parsed.query).get("lane", [None])[0]
+            if callback(lane) is False:
+                self._reply(400, {"error": f"Unknown lane: {lane}"})
+                return
+            self._reply(202, {"woken": lane or "all"})
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), WakeHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="wake-endpoint", daemon=True).start()
+    print(f"🔔 Wake endpoint listening on http://{host}:{port}/wake")
+    return server
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from PyPDF2 import PdfReader
 from flask_cors import CORS
 import os
@@ -8,21 +8,27 @@ import uuid
 import socket
 from   apscheduler.schedulers.background  import   BackgroundScheduler
 from datetime import datetime, timezone
-from  decimal    import  Decimal
-import  math
+import time
+import threading
 # ----------------------------
 # Project imports
 # ----------------------------
 # sys.path.append(r"C:\BLS\EvalAI8\Quiz")
-from Quiz.quiz_generator import generate_quiz_from_pdf
-from Quiz.saving_quiz import save_quiz, save_user_attempt, load_existing_quiz
-from Quiz.qa_evaluator import evaluate_saq
+from Quiz.quiz_generator import generate_quiz_from_pdf, iter_quiz_generation, generation_params
+from Quiz.saving_quiz import save_quiz, existing_quiz_key, load_quiz_with_index, quiz_cache_key
+from Quiz.attempt_store import ATTEMPT_STORE_ENABLED
+from Quiz.quiz_analytics import quiz_analytics
+from LLM.cache import cache_stats
+from Backend.submissions import start_submission, get_submission, wait_for_update
 from Backend.initials import is_english_file, is_pdf_file, is_invalid_file
 
 
-from   Backend.config   import  Config
+from   Backend.config   import  Config, MAX_QUESTIONS
 from  Backend.extensions  import  db
-from  Backend.models.candidate_models   import  CandidateResearch,  CandidateEvalAI  ,  CandidateQuizQuestion
+from  Backend.models.candidate_models   import  CandidateResearch,  CandidateEvalAI
+import  Backend.jobs  as  jobs
+from  Backend.claims  import  queue_stats
+import  Backend.dispatch  as  dispatch
 # ======================================================
 # FLASK APP SETUP
 # ======================================================
@@ -34,10 +40,6 @@ app.config.from_object(Config)
 db.init_app(app) 
 
 FLASK_ROOT = os.path.dirname(os.path.abspath(__file__))  # D:\BLS_Main\Live_dev\AI-Quiz-Generator-Microservice\Backend
-DJANGO_ROOT = os.path.abspath(os.path.join(FLASK_ROOT, "../../IAE-CRM"))  # resolves ..\.. properly
-RESEARCH_FILES_ROOT = os.path.join(DJANGO_ROOT, "static", "Others", "Candidates", "Researches_Docs")
- 
-QUIZ_JSON_FOLDER = os.path.join(FLASK_ROOT, "Quiz/quizzes") 
 
 
 @app.route("/candidate/<int:candidate_id>")
@@ -87,11 +89,20 @@ def test_db():
     }
 
 
+@app.route("/llm/cache_stats")
+def llm_cache_stats():
+    return jsonify(cache_stats())
+
+
 # UPLOAD_FOLDER = r"C:\BLS\EvalAI8\Uploads"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER =  os.path.join(BASE_DIR, "../Uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-MAX_QUESTIONS = 20
+
+# /submissions/<id>/events: longest a stream stays open, and keepalive interval
+SUBMISSION_SSE_TIMEOUT = int(os.getenv("SUBMISSION_SSE_TIMEOUT", "300"))
+SSE_KEEPALIVE_SECONDS = 15
+
 
 def get_local_ip():
     try:
@@ -105,57 +116,68 @@ def get_local_ip():
         return "127.0.0.1"
 
 def make_quiz_key(pdf_list):
-    return "_".join(
-        sorted(os.path.basename(p) for p in pdf_list)
-    )
+    """Content-addressed cache key of the quiz generated for these PDF files."""
+    return quiz_cache_key(pdf_list, generation_params(MAX_QUESTIONS))
 
 
 
 # ======================================================
 # 1️⃣ UPLOAD PDFs & GENERATE QUIZ
 # ======================================================
-@app.route("/upload_pdfs/", methods=["POST"])
-def upload_pdfs():
-    if "files" not in request.files:
-        return jsonify({"error": "No files part in request"}), 400
-
-    files = request.files.getlist("files")
-    if not files:
-        return jsonify({"error": "No files uploaded"}), 400
-
+def save_uploaded_pdfs(files):
+    """
+    Save and validate uploaded PDFs.
+    Returns (pdf_paths, None) on success or (None, error_response) on the first bad file.
+    """
     pdf_paths = []
 
     for file in files:
         # 1️⃣ PDF check
         if not is_pdf_file(file):
-            return jsonify({
+            return None, (jsonify({
                 "error": "invalid_file",
                 "message": f"File '{file.filename}' is not a valid PDF",
                 "files": [file.filename]
-            }), 200
+            }), 200)
 
         pdf_path = os.path.join(UPLOAD_FOLDER, file.filename)
         file.save(pdf_path)
 
         # ✅ 1.5️⃣ Empty / corrupt PDF check (BEST placement)
         if is_invalid_file(pdf_path):
-            return jsonify({
+            return None, (jsonify({
                 "error": "invalid_file",
                 "message": f"File '{file.filename}' is invalid",
                 "files": [file.filename]
-            }), 200
+            }), 200)
 
         # 3️⃣ English check (using new detector class)
         if not is_english_file(file):
             print("❌ Non-English file detected:", file.filename)
-            return jsonify({
+            return None, (jsonify({
                 "error": "non_english_file",
                 "message": f"File '{file.filename}' is not in English",
                 "files": [file.filename]
-            }), 200
+            }), 200)
         print("✅ English file confirmed:", file.filename)
         pdf_paths.append(pdf_path)
 
+    return pdf_paths, None
+
+
+@app.route("/upload_pdfs/", methods=["POST"])
+def upload_pdfs():
+    if "files" not in request.files:
+        return jsonify({"error": "No files part in request"}), 400
+
+    files = request.files.getlist("files")
+    if not files:
+        return jsonify({"error": "No files uploaded"}), 400
+
+    pdf_paths, error_response = save_uploaded_pdfs(files)
+    if error_response:
+        return error_response
+
     # ======================================================
     # Process ALL PDFs together → global clusters → single LLM call
     # ======================================================
@@ -171,16 +193,72 @@ def upload_pdfs():
         if "id" not in q or not q["id"]:
             q["id"] = f"q_{idx}"
 
-    quiz_key = make_quiz_key(pdf_paths)
-    save_quiz(quiz_key, combined_quiz)
+    save_quiz(pdf_paths, combined_quiz, generation_params(MAX_QUESTIONS))
 
     return jsonify({
+        "quiz_key": make_quiz_key(pdf_paths),
         "total_questions": len(combined_quiz),
         "mcq_count": sum(1 for q in combined_quiz if q["type"] == "MCQ"),
         "saq_count": sum(1 for q in combined_quiz if q["type"] == "SAQ"),
         "quiz": combined_quiz
     })
 
+
+# ======================================================
+# 1️⃣b UPLOAD PDFs & STREAM QUIZ (NDJSON)
+# ======================================================
+@app.route("/upload_pdfs/stream", methods=["POST"])
+def upload_pdfs_stream():
+    """
+    Same pipeline as /upload_pdfs/, streamed as newline-delimited JSON:
+    progress events, then validated questions per cluster as they complete,
+    then a final "done" event with the quiz key and the full (shuffled) quiz.
+    Validation errors are returned as a normal JSON response before streaming.
+    """
+    if "files" not in request.files:
+        return jsonify({"error": "No files part in request"}), 400
+
+    files = request.files.getlist("files")
+    if not files:
+        return jsonify({"error": "No files uploaded"}), 400
+
+    pdf_paths, error_response = save_uploaded_pdfs(files)
+    if error_response:
+        return error_response
+
+    def generate_events():
+        try:
+            for event in iter_quiz_generation(pdf_paths, max_questions=MAX_QUESTIONS, save=False):
+                if event["event"] != "done":
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+                    continue
+
+                combined_quiz = event["result"].get("quiz", [])
+                for idx, q in enumerate(combined_quiz):
+                    if "id" not in q or not q["id"]:
+                        q["id"] = f"q_{idx}"
+
+                save_quiz(pdf_paths, combined_quiz, generation_params(MAX_QUESTIONS))
+                quiz_key = make_quiz_key(pdf_paths)
+
+                yield json.dumps({
+                    "event": "done",
+                    "quiz_key": quiz_key,
+                    "total_questions": len(combined_quiz),
+                    "mcq_count": sum(1 for q in combined_quiz if q["type"] == "MCQ"),
+                    "saq_count": sum(1 for q in combined_quiz if q["type"] == "SAQ"),
+                    "quiz": combined_quiz
+                }, ensure_ascii=False) + "\n"
+        except Exception as e:
+            print("❌ upload_pdfs_stream error:", e)
+            yield json.dumps({"event": "error", "message": str(e)}) + "\n"
+
+    return Response(
+        stream_with_context(generate_events()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ======================================================
 # 2️⃣ SUBMIT QUIZ (MCQ AUTO, SAQ STORED)
 # ======================================================
@@ -191,28 +269,38 @@ def submit_quiz():
         data = request.get_json()
         print("Received data:", data)
 
+        quiz_key = data.get("quiz_key")
         pdf_names = data.get("pdf_names")
+        if isinstance(pdf_names, str):
+            pdf_names = [pdf_names]
         mcq_answers = data.get("mcq_answers", {})
         saq_answers = data.get("saq_answers", {})
         user_id = str(uuid.uuid4())
 
-        if not pdf_names:
-            return jsonify({"error": "Missing pdf_names"}), 400
+        if not quiz_key and not pdf_names:
+            return jsonify({"error": "Missing quiz_key or pdf_names"}), 400
 
         # --------------------------------------------------
-        # Load saved quiz (PASS PDF NAMES, NOT KEY)
+        # Load saved quiz: by the key upload returned, else by the uploaded files' content
         # --------------------------------------------------
-        saved_quiz_data = load_existing_quiz(pdf_names)
+        # Parsed quizzes come from an in-process LRU; disk is only read on a miss
+        if not quiz_key:
+            pdf_paths = [os.path.join(UPLOAD_FOLDER, os.path.basename(name)) for name in pdf_names]
+            quiz_key = existing_quiz_key(pdf_paths, generation_params(MAX_QUESTIONS))
+        saved_quiz_data, questions = load_quiz_with_index(quiz_key) or (None, {})
+        if saved_quiz_data and not pdf_names:
+            # Attempt files are named after the quiz's PDFs
+            pdf_names = [saved_quiz_data.get("pdf_names", "quiz")]
         print("entering if else block for saved quiz data")
         if not saved_quiz_data or not saved_quiz_data.get("quiz"):
             print("❌ Saved quiz not found or empty for PDFs:", saved_quiz_data)
             return jsonify({
                 "error": "Saved quiz not found for given PDFs",
+                "quiz_key": quiz_key,
                 "pdf_names": pdf_names
             }), 404
         else:
             print("✅ Everything was fine:", pdf_names)
-        saved_quiz = saved_quiz_data["quiz"]
 
         # =====================
         # Evaluation
@@ -221,11 +309,11 @@ def submit_quiz():
         total_correct = 0
         total_questions = 0
 
-        for idx, q in enumerate(saved_quiz):
-            if not isinstance(q, dict):
-                continue
+        # SAQs are graded in the background; see Backend/submissions.py
+        saq_jobs = []
+        reference_embeddings = saved_quiz_data.get("reference_embeddings", {})
 
-            qid = q.get("id") or f"q_{idx}"
+        for qid, q in questions.items():
             question_text = q.get("question", "")
             qtype = q.get("type")
             explanation = q.get("explanation", "")
@@ -259,17 +347,12 @@ def submit_quiz():
                 user_answer = saq_answers.get(qid, "")
                 correct_answer = q.get("answer", "")
 
-                # 🔹 NEW: pass question_text
-                eval_result = evaluate_saq(
-                    user_answer=user_answer,
-                    correct_answer=correct_answer,
-                    question=question_text
-                )
-
-                is_correct = eval_result["is_correct"]
-
-                if is_correct:
-                    total_correct += 1
+                saq_jobs.append((len(evaluated_questions), {
+                    "question": question_text,
+                    "correct_answer": correct_answer,
+                    "user_answer": user_answer,
+                    "reference_embedding": reference_embeddings.get(qid)
+                }))
 
                 evaluated_questions.append({
                     "question_id": qid,
@@ -282,32 +365,32 @@ def submit_quiz():
                     # 🔹 similarity no longer exists → set to None
                     "similarity": None,
 
-                    "is_correct": is_correct,
-
-                    # 🔹 Better explanation from LLM if available
-                    "explanation": eval_result.get("reason", explanation),
-
-                    # 🔹 OPTIONAL but useful (won't break frontend)
-                    "score": eval_result.get("score"),
-                    "verdict": eval_result.get("verdict")
+                    # 🔹 filled in by the grading worker (LLM reason replaces the explanation)
+                    "is_correct": None,
+                    "explanation": explanation,
+                    "score": None,
+                    "verdict": "PENDING",
+                    "graded_by": None
                 })
 
         # =====================
         # Save Attempt
         # =====================
         attempt_record = {
+            "quiz_key": quiz_key,
             "total_questions": total_questions,
             "total_correct": total_correct,
             "evaluated_quiz": evaluated_questions
         }
 
-        save_user_attempt(user_id, pdf_names, attempt_record)
+        # MCQs are final now; total_correct grows once the SAQs are graded
+        submission = start_submission(user_id, pdf_names, attempt_record, saq_jobs)
 
         return jsonify({
             "message": "Quiz submitted successfully",
-            "total_questions": total_questions,
-            "total_correct": total_correct,
-            "evaluated_quiz": evaluated_questions
+            **submission,
+            "status_url": f"/submissions/{user_id}",
+            "events_url": f"/submissions/{user_id}/events"
         })
 
     except Exception as e:
@@ -315,243 +398,129 @@ def submit_quiz():
         return jsonify({"error": str(e)}), 500
 
 
-def save_quiz_json_to_db(candidate_id, json_file_path,quiz_id):
-    """
-    Reads a generated quiz JSON file and saves it into DB for the given candidate.
-    """
-    if not os.path.exists(json_file_path):
-        print(f"Quiz JSON file does not exist: {json_file_path}")
-        return
-
-    # Read JSON file
-    with open(json_file_path, "r", encoding="utf-8") as f:
-        quiz_data = json.load(f)
-
-    # Get pdf_names
-    pdf_names = quiz_data.get("pdf_names", "Unknown_Quiz")
-
-     
-
-    # Iterate over questions
-    questions = quiz_data.get("quiz", [])
-    questions_count =  0
-    for q in questions:
-        questions_count =  questions_count  +  1
+@app.route("/submissions/<submission_id>", methods=["GET"])
+def submission_status(submission_id):
+    """Grading status of a submission; the full result once status is "complete"."""
+    submission = get_submission(submission_id)
+    if submission is None:
+        return jsonify({"error": "Unknown submission", "submission_id": submission_id}), 404
+    return jsonify(submission)
 
-        q_type = q.get("type", "").upper()
 
-        # ---------- MCQ handling ----------
-        options_dict = None
-        correct_answer = None
-
-        if q_type == "MCQ":
-            options_raw = q.get("options", {})
-
-            # store dict as JSON string in TextField
-            if isinstance(options_raw, dict):
-                options_dict = json.dumps(options_raw)
+@app.route("/submissions/<submission_id>/events", methods=["GET"])
+def submission_events(submission_id):
+    """
+    Server-sent events: a "status" event now and after every change,
+    until grading completes or fails (or SUBMISSION_SSE_TIMEOUT passes).
+    """
+    submission = get_submission(submission_id)
+    if submission is None:
+        return jsonify({"error": "Unknown submission", "submission_id": submission_id}), 404
+
+    def generate_events():
+        deadline = time.monotonic() + SUBMISSION_SSE_TIMEOUT
+        current, sent_version = submission, None
+        while current is not None:
+            if current["version"] != sent_version:
+                yield f"event: status\ndata: {json.dumps(current, ensure_ascii=False)}\n\n"
+                sent_version = current["version"]
             else:
-                options_dict = None
-
-            correct_answer = q.get("correct_answer")
-
-
-        question = CandidateQuizQuestion(
-            quiz_id=quiz_id,
-            question_text=q.get("question", ""),
-            answer_text=q.get("answer", ""),
-            explanation_text=q.get("explanation", ""),
-            question_type=q.get("type", ""),
-            source_pdf=q.get("source_pdf", ""),
-            options=options_dict,
-            correct_answer=correct_answer
-        )
-        db.session.add(question)
-
-    # Commit all questions
-    db.session.commit()
-    print(f"Saved quiz '{pdf_names}' with {len(questions)} questions for candidate_id {candidate_id}")
+                # No change yet: keep the connection alive through proxies
+                yield ": keepalive\n\n"
+            if current["status"] != "pending" or time.monotonic() >= deadline:
+                return
+            current = wait_for_update(submission_id, sent_version, timeout=SSE_KEEPALIVE_SECONDS)
+
+    return Response(
+        stream_with_context(generate_events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    return   questions_count
 
+# ======================================================
+# Quiz analytics (precomputed attempt rollups)
+# ======================================================
+@app.route("/analytics/quiz/<quiz_key>", methods=["GET"])
+def quiz_analytics_view(quiz_key):
+    """Per-question correctness, SAQ score distributions and verdict mixes for a quiz."""
+    if not ATTEMPT_STORE_ENABLED:
+        return jsonify({"error": "Attempt store is disabled"}), 404
+    analytics = quiz_analytics(quiz_key)
+    if analytics is None:
+        return jsonify({"error": "No attempts for quiz", "quiz_key": quiz_key}), 404
+    return jsonify(analytics)
 
 
- 
-def   sched_score_saq_questions(quiz_id):
+# ----------------- Task Function -----------------
+def process_candidate_eval():
+    with app.app_context():  # 🔑 Important: provides Flask context for DB operations
+        jobs.process_candidate_eval()
 
-    print("sched_score_saq_questions  quiz_id ",quiz_id)
 
-    saq_questions = CandidateQuizQuestion.query.filter_by(
-        quiz_id=quiz_id,
-        question_type="SAQ"
-    ).all()
+def process_lane(lane):
+    with app.app_context():
+        while True:
+            _lane_woken[lane].clear()
+            jobs.process_lane(lane)
+            # Woken while running (the scheduler skips the extra instance): go again
+            if not _lane_woken[lane].is_set():
+                break
 
-    total_obt_score  =  0.00
- 
 
-    for q in saq_questions:
+@app.route("/jobs/metrics", methods=["GET"])
+def job_metrics():
+    """Queue depth / oldest waiting row per lane, and this process's lane counters."""
+    return jsonify({
+        "queues": queue_stats(),
+        "lanes": {name: m.summary() for name, m in jobs.lane_metrics.items()},
+    })
 
-        if not q.user_answer:
-            continue
 
-        eval_result = evaluate_saq(
-            user_answer=q.user_answer,
-            correct_answer=q.answer_text,
-            question=q.question_text
-        )
-        eval_result_score =  eval_result["score"] 
+@app.route("/jobs/wake", methods=["POST"])
+def wake_jobs():
+    """
+    Start a lane now instead of at its next poll. The Django side calls this right
+    after setting to_pickup (lane "generation") or candidate_attempted (lane "evaluation").
+    """
+    payload = request.get_json(silent=True) or {}
+    lane = payload.get("lane") or request.args.get("lane")
+    if lane is not None and lane not in jobs.LANES:
+        return jsonify({"error": f"Unknown lane: {lane}", "lanes": list(jobs.LANES)}), 400
+    dispatch.wake(lane)
+    return jsonify({"woken": [lane] if lane else list(jobs.LANES)}), 202
 
-        total_obt_score =  total_obt_score  +    eval_result_score
+# ----------------- Scheduler Setup -----------------
+# EVALAI_RUN_SCHEDULER=0 imports the app without starting the job (benchmarks, tooling,
+# or when the work is done by `python -m Backend.worker` processes instead)
+RUN_SCHEDULER = os.getenv("EVALAI_RUN_SCHEDULER", "1") == "1"
 
-        q.its_score = eval_result_score
+# Work normally starts on POST /jobs/wake; the interval only catches missed wake-ups
+SCHEDULER_POLL_MINUTES = float(os.getenv("SCHEDULER_POLL_MINUTES", "3"))
 
-    db.session.commit()
+scheduler = BackgroundScheduler()
+# One job per lane: a long generation run never holds up scoring (and vice versa)
+for lane in jobs.LANES:
+    scheduler.add_job(func=process_lane, args=[lane], trigger="interval", minutes=SCHEDULER_POLL_MINUTES,
+                      id=f"{lane}_lane", max_instances=1)
 
-    return  total_obt_score
+_lane_woken = {lane: threading.Event() for lane in jobs.LANES}
 
 
+def wake_scheduler(lane=None):
+    for name in jobs.LANES:
+        if lane in (None, name):
+            _lane_woken[name].set()
+            scheduler.modify_job(f"{name}_lane", next_run_time=datetime.now(timezone.utc))
 
-# ----------------- Task Function -----------------
-def process_candidate_eval():
-    with app.app_context():  # 🔑 Important: provides Flask context for DB operations
-        print(f"[{datetime.now(timezone.utc)}] Running  process_candidate_eval...")
-
-        # Step 1: Get CandidateEvalAI records to process
-        pending_records = CandidateEvalAI.query.filter_by(
-            to_pickup=True,
-            picked_up=False,
-            completed=False
-        ).all()
-
-        evaluation_pending_records = CandidateEvalAI.query.filter_by(
-            candidate_attempted=True,
-            evaluation_picked_up=False,
-            evaluation_completed  = False
-        ).all()
-
-        if  evaluation_pending_records:
-
-            for  record in  evaluation_pending_records:
-                try: 
-                    record.evaluation_picked_up = True
-                    db.session.commit()
-                    print(f"Evaluation  Picked up  and  updating  picked_up  for  candidate  id  {record.candidate_id}   and   CandidateEvalAI id: {record.id}")
-                except Exception as e:
-                    print(f"Evaluation  Erro   updating  picked_up  for  candidate  id  {record.candidate_id}   and    CandidateEvalAI id {record.id}: {str(e)}")
-                    record.evaluation_progress_error_occured = True
-                    db.session.commit() 
-
-            for  record  in  evaluation_pending_records:
-                try:
-                    total_obt_score =  sched_score_saq_questions(record.id)
-                    eva_obt_score  =   Decimal(record.obt_score)  + Decimal(total_obt_score)
-                    record.obt_score =   eva_obt_score
-                    eval_obt_perc  =      Decimal((math.trunc((eva_obt_score/ record.tot_score) * 100) / 100))  *  Decimal("100")
-                    # print("bot_obt_perc   as  here  ",bot_obt_perc  ,  "   type   ",type(bot_obt_perc))
-                    if   Decimal(eval_obt_perc)  >  Decimal("70"):
-                        record.candidate_passed  =  True 
-
-
-                    eval_obt_perc = str(eval_obt_perc) + "%"
-                    record.obt_perc  =  eval_obt_perc
-                    record.evaluation_completed  =  True
-                    db.session.commit() 
-                except Exception as e:
-                    print(f"Evaluation  Error  in  processing  for  candidate  id  {record.candidate_id}   and  CandidateEvalAI id {record.id}: {str(e)}")
-                    record.evaluation_progress_error_occured = True
-                    record.evaluation_picked_up  =  False
-                    db.session.commit() 
-        else:
-            print("No   evaluation_pending_records")
-
-        if  pending_records:
-
-            for record in pending_records:
-                try: 
-                    record.picked_up = True
-                    db.session.commit()
-                    print(f"Picked up  and  updating  picked_up  for  candidate  id  {record.candidate_id}   and   CandidateEvalAI id: {record.id}")
-                except Exception as e:
-                    print(f"Erro   updating  picked_up  for  candidate  id  {record.candidate_id}   and    CandidateEvalAI id {record.id}: {str(e)}")
-                    record.progress_error_occured = True
-                    db.session.commit() 
-            
-
-            for record in pending_records:
-                try: 
-
-                    # Step 3: Fetch related CandidateResearch records
-                    candidate_id = record.candidate_id
-                    research_records = CandidateResearch.query.filter_by(candidate_id=candidate_id).all()
-                    if   research_records: 
-
-                        pdf_paths =  []
-
-                        for research in research_records:
-                            file_name = os.path.basename(research.file)
-                            file_path = os.path.join(RESEARCH_FILES_ROOT, file_name)
-                            file_path = os.path.abspath(file_path)  # ✅ ensure absolute path
-                            print(f"Absolute PDF path: {file_path}")
-
-                            if os.path.isfile(file_path) and file_path.lower().endswith(".pdf"):
-                                print(f"Processing PDF: {file_path}")
-                                pdf_paths.append(file_path)
-                            else:
-                                print(f"File does not exist or not a PDF: {file_path}") 
-                             
-
-                        print("pdf_paths  ",pdf_paths)
-
-                        
-                        
-
-                        # ======================================================
-                        # Process ALL PDFs together → global clusters → single LLM call
-                        # ======================================================
-                        quiz_data = generate_quiz_from_pdf(
-                            pdf_path=pdf_paths,
-                            max_questions=MAX_QUESTIONS,
-                            save=False
-                        )
-
-                        combined_quiz = quiz_data.get("quiz", [])
-
-                        for idx, q in enumerate(combined_quiz):
-                            if "id" not in q or not q["id"]:
-                                q["id"] = f"q_{idx}"
-
-                        quiz_key = make_quiz_key(pdf_paths)
-                        json_file_name = save_quiz(quiz_key, combined_quiz)
-
-                        print("json_file_name  ",json_file_name)
-
-                        json_file_path = os.path.join(QUIZ_JSON_FOLDER, json_file_name)
-
-                        questions_count = save_quiz_json_to_db(candidate_id, json_file_path,record.id)
-                        record.tot_score =   Decimal(questions_count  *  10)
-                        record.completed  =  True
-                        db.session.commit() 
-                    else:
-                        print(f"No  research  records   for  candidate  id  {record.candidate_id}   and  CandidateEvalAI id {record.id}")
-
-                    print(f"Success  in  processing  for  candidate  id  {record.candidate_id}   and  CandidateEvalAI id {record.id}")
-
-                except Exception as e:
-                    print(f"Error  in  processing  for  candidate  id  {record.candidate_id}   and  CandidateEvalAI id {record.id}: {str(e)}")
-                    record.progress_error_occured = True
-                    record.picked_up  =  False
-                    db.session.commit() 
-        else:
-            print("no  pending_records")
 
-# ----------------- Scheduler Setup -----------------
-scheduler = BackgroundScheduler()
-scheduler.add_job(func=process_candidate_eval, trigger="interval", minutes=3)
-scheduler.start()
+if RUN_SCHEDULER:
+    scheduler.start()
+    dispatch.add_listener(wake_scheduler)
 
-# Shut down scheduler when exiting Flask
-import atexit
-atexit.register(lambda: scheduler.shutdown())
+    # Shut down scheduler when exiting Flask
+    import atexit
+    atexit.register(lambda: scheduler.shutdown())
 
 
 # ======================================================
@@ -0,0 +1,506 @@
+# jobs.py
+# Candidate evaluation jobs: quiz generation for candidates waiting on a quiz,
+# and SAQ scoring of attempted quizzes. Shared by the in-process scheduler
+# (Backend/flaask.py) and the standalone worker (Backend/worker.py).
+#
+# Every function here expects a Flask app context (for db.session).
+import os
+import json
+import math
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from flask import current_app
+from sqlalchemy import case, func
+
+from Quiz.quiz_generator import generate_quiz_from_pdf, generation_params
+from Quiz.saving_quiz import save_quiz
+from Quiz.qa_evaluator import evaluate_saq_batch
+from Quiz.persistence import read_json
+from LLM.gateway import BACKGROUND
+
+from Backend.config import MAX_QUESTIONS
+from Backend.extensions import db
+from Backend.models.candidate_models import CandidateResearch, CandidateEvalAI, CandidateQuizQuestion
+import Backend.claims as claims
+from Backend.claims import claim_generation_records, claim_evaluation_records, renew_leases
+
+BACKEND_ROOT = os.path.dirname(os.path.abspath(__file__))
+DJANGO_ROOT = os.path.abspath(os.path.join(BACKEND_ROOT, "../../IAE-CRM"))  # resolves ..\.. properly
+RESEARCH_FILES_ROOT = os.path.join(DJANGO_ROOT, "static", "Others", "Candidates", "Researches_Docs")
+
+
+# Generated quizzes are still saved to Quiz/quizzes (quiz index, reuse by /upload_pdfs/),
+# on a background thread: the questions go to the database straight from memory
+SCHEDULER_QUIZ_JSON = os.getenv("SCHEDULER_QUIZ_JSON", "1") == "1"
+_quiz_json_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quiz-json")
+
+
+def quiz_question_rows(quiz_id, questions):
+    """CandidateQuizQuestion column values for each generated question."""
+    rows = []
+    for q in questions:
+        q_type = q.get("type", "").upper()
+
+        # ---------- MCQ handling ----------
+        options_dict = None
+        correct_answer = None
+
+        if q_type == "MCQ":
+            options_raw = q.get("options", {})
+
+            # store dict as JSON string in TextField
+            if isinstance(options_raw, dict):
+                options_dict = json.dumps(options_raw)
+
+            correct_answer = q.get("correct_answer")
+
+        rows.append({
+            "quiz_id": quiz_id,
+            "question_text": q.get("question", ""),
+            "answer_text": q.get("answer", ""),
+            "explanation_text": q.get("explanation", ""),
+            "question_type": q.get("type", ""),
+            "source_pdf": q.get("source_pdf", ""),
+            "options": options_dict,
+            "correct_answer": correct_answer,
+        })
+    return rows
+
+
+def insert_quiz_questions(quiz_id, questions):
+    """
+    Add the questions to the session's transaction as one multi-row INSERT ... VALUES
+    (one round trip, no ORM unit of work). The caller commits. Returns the number of questions.
+    """
+    rows = quiz_question_rows(quiz_id, questions)
+    if rows:
+        db.session.execute(CandidateQuizQuestion.__table__.insert().values(rows))
+    return len(rows)
+
+
+def save_quiz_json_to_db(candidate_id, json_file_path,quiz_id):
+    """
+    Reads a generated quiz JSON file and saves it into DB for the given candidate.
+    """
+    if not os.path.exists(json_file_path):
+        print(f"Quiz JSON file does not exist: {json_file_path}")
+        return
+
+    # Read JSON file
+    quiz_data = read_json(json_file_path)
+
+    # Get pdf_names
+    pdf_names = quiz_data.get("pdf_names", "Unknown_Quiz")
+
+    questions_count = insert_quiz_questions(quiz_id, quiz_data.get("quiz", []))
+
+    # Commit all questions
+    db.session.commit()
+    print(f"Saved quiz '{pdf_names}' with {questions_count} questions for candidate_id {candidate_id}")
+
+    return   questions_count
+
+
+def _save_quiz_json(pdf_paths, quiz, params):
+    try:
+        json_file_name = save_quiz(pdf_paths, quiz, params)
+        print("json_file_name  ",json_file_name)
+    except Exception as e:
+        # The database already has the quiz; only the file copy is missing
+        print(f"⚠️ Saving quiz JSON failed: {e}")
+
+
+def _bulk_update(table, values_by_column):
+    """
+    One UPDATE ... SET col = CASE id WHEN ... END for {column: {row id: value}} (caller commits).
+    Rows missing from a column's mapping keep their value.
+    """
+    ids = sorted(set().union(*(by_id.keys() for by_id in values_by_column.values())))
+    if not ids:
+        return
+    db.session.execute(
+        table.update().where(table.c.id.in_(ids)).values({
+            name: case(by_id, value=table.c.id, else_=table.c[name])
+            for name, by_id in values_by_column.items() if by_id
+        })
+    )
+
+
+def   sched_score_saq_questions(quiz_id):
+
+    return  sched_score_saq_questions_batch([quiz_id]).get(quiz_id, Decimal("0"))
+
+
+def sched_score_saq_questions_batch(quiz_ids):
+    """
+    Score the answered SAQs of several quizzes with shared batch grading calls and
+    write the scores back in one UPDATE (caller commits).
+    Returns {quiz_id: total SAQ score}, summed by the database.
+    """
+    print("sched_score_saq_questions_batch  quiz_ids ", quiz_ids)
+
+    # Only the columns grading needs
+    answered = db.session.query(
+        CandidateQuizQuestion.id,
+        CandidateQuizQuestion.question_text,
+        CandidateQuizQuestion.answer_text,
+        CandidateQuizQuestion.user_answer,
+    ).filter(
+        CandidateQuizQuestion.quiz_id.in_(quiz_ids),
+        CandidateQuizQuestion.question_type == "SAQ",
+        CandidateQuizQuestion.user_answer.isnot(None),
+        CandidateQuizQuestion.user_answer != "",
+    ).order_by(CandidateQuizQuestion.id).all()
+
+    eval_results = evaluate_saq_batch(
+        [
+            {"question": q.question_text, "correct_answer": q.answer_text, "user_answer": q.user_answer}
+            for q in answered
+        ],
+        lane=BACKGROUND
+    )
+
+    _bulk_update(CandidateQuizQuestion.__table__, {
+        "its_score": {q.id: eval_result["score"] for q, eval_result in zip(answered, eval_results)}
+    })
+
+    return  saq_totals(quiz_ids)
+
+
+def saq_totals(quiz_ids):
+    """{quiz_id: SUM(its_score) of its SAQs} in one GROUP BY query; quizzes without scored SAQs are left out."""
+    rows = db.session.query(
+        CandidateQuizQuestion.quiz_id, func.sum(CandidateQuizQuestion.its_score)
+    ).filter(
+        CandidateQuizQuestion.quiz_id.in_(quiz_ids),
+        CandidateQuizQuestion.question_type == "SAQ",
+    ).group_by(CandidateQuizQuestion.quiz_id).all()
+    # str(): SQLite sums NUMERIC as float
+    return {quiz_id: Decimal(str(total or 0)) for quiz_id, total in rows}
+
+
+def _evaluation_results(records, totals):
+    """
+    obt_score (the record's MCQ score plus its SAQ total), obt_perc and candidate_passed per record,
+    as _bulk_update columns. Returns (columns, records whose result could not be computed).
+    """
+    columns = {"obt_score": {}, "obt_perc": {}, "candidate_passed": {}, "evaluation_completed": {}}
+    failed = []
+    for  record  in  records:
+        try:
+            eva_obt_score  =   Decimal(record.obt_score)  + totals.get(record.id, Decimal("0"))
+            eval_obt_perc  =      Decimal((math.trunc((eva_obt_score/ record.tot_score) * 100) / 100))  *  Decimal("100")
+            columns["obt_score"][record.id] = eva_obt_score
+            if   Decimal(eval_obt_perc)  >  Decimal("70"):
+                columns["candidate_passed"][record.id] = True
+            columns["obt_perc"][record.id] = str(eval_obt_perc) + "%"
+            columns["evaluation_completed"][record.id] = True
+        except Exception as e:
+            print(f"Evaluation  Error  in  processing  for  candidate  id  {record.candidate_id}   and  CandidateEvalAI id {record.id}: {str(e)}")
+            failed.append(record)
+    return columns, failed
+
+
+# ============================================================
+# Jobs (one claimed batch / record each)
+# ============================================================
+def evaluate_records(record_ids):
+    """
+    Score claimed (evaluation_picked_up) records: all their quizzes share batch grading calls,
+    and scores and results are written in one transaction. True if all succeeded.
+    """
+    evaluation_pending_records = db.session.query(
+        CandidateEvalAI.id, CandidateEvalAI.candidate_id, CandidateEvalAI.obt_score, CandidateEvalAI.tot_score
+    ).filter(
+        CandidateEvalAI.id.in_(record_ids)
+    ).order_by(CandidateEvalAI.id).all()
+    eval_table = CandidateEvalAI.__table__
+
+    failed = []
+    try:
+        totals = sched_score_saq_questions_batch([record.id for record in evaluation_pending_records])
+        columns, failed = _evaluation_results(evaluation_pending_records, totals)
+        _bulk_update(eval_table, columns)
+        db.session.commit()
+    except Exception as e:
+        # Fall back to one quiz per transaction
+        print(f"Evaluation  batch  scoring  failed, scoring  quizzes  one  by  one: {str(e)}")
+        db.session.rollback()
+        failed = []
+        for  record  in  evaluation_pending_records:
+            try:
+                totals = {record.id: sched_score_saq_questions(record.id)}
+                columns, record_failed = _evaluation_results([record], totals)
+                _bulk_update(eval_table, columns)
+                db.session.commit()
+                failed += record_failed
+            except Exception as e:
+                print(f"Evaluation  Error  in  processing  for  candidate  id  {record.candidate_id}   and  CandidateEvalAI id {record.id}: {str(e)}")
+                db.session.rollback()
+                failed.append(record)
+
+    if failed:
+        db.session.execute(
+            eval_table.update().where(eval_table.c.id.in_([record.id for record in failed])).values(
+                evaluation_progress_error_occured=True, evaluation_picked_up=False
+            )
+        )
+        db.session.commit()
+    return not failed
+
+
+def generate_for_record(record_id):
+    """Generate and store the quiz of one claimed (picked_up) record. True on success."""
+    record = db.session.get(CandidateEvalAI, record_id)
+    if record is None:
+        return False
+
+    try:
+
+        # Step 3: Fetch related CandidateResearch records
+        candidate_id = record.candidate_id
+        research_records = CandidateResearch.query.filter_by(candidate_id=candidate_id).all()
+        if   research_records:
+
+            pdf_paths =  []
+
+            for research in research_records:
+                file_name = os.path.basename(research.file)
+                file_path = os.path.join(RESEARCH_FILES_ROOT, file_name)
+                file_path = os.path.abspath(file_path)  # ✅ ensure absolute path
+                print(f"Absolute PDF path: {file_path}")
+
+                if os.path.isfile(file_path) and file_path.lower().endswith(".pdf"):
+                    print(f"Processing PDF: {file_path}")
+                    pdf_paths.append(file_path)
+                else:
+                    print(f"File does not exist or not a PDF: {file_path}")
+
+
+            print("pdf_paths  ",pdf_paths)
+
+
+
+
+            # ======================================================
+            # Process ALL PDFs together → global clusters → single LLM call
+            # ======================================================
+            quiz_data = generate_quiz_from_pdf(
+                pdf_path=pdf_paths,
+                max_questions=MAX_QUESTIONS,
+                save=False,
+                lane=BACKGROUND
+            )
+
+            combined_quiz = quiz_data.get("quiz", [])
+
+            for idx, q in enumerate(combined_quiz):
+                if "id" not in q or not q["id"]:
+                    q["id"] = f"q_{idx}"
+
+            # Questions and the record's totals in one transaction
+            questions_count = insert_quiz_questions(record.id, combined_quiz)
+            record.tot_score =   Decimal(questions_count  *  10)
+            record.completed  =  True
+            db.session.commit()
+            print(f"Saved quiz with {questions_count} questions for candidate_id {candidate_id}")
+
+            if SCHEDULER_QUIZ_JSON:
+                _quiz_json_writer.submit(_save_quiz_json, pdf_paths, combined_quiz, generation_params(MAX_QUESTIONS))
+        else:
+            print(f"No  research  records   for  candidate  id  {record.candidate_id}   and  CandidateEvalAI id {record.id}")
+            # Nothing to generate from: take the row out of the queue instead of letting
+            # its lease expire and re-claiming it forever. Setting to_pickup again re-queues it.
+            record.progress_error_occured = True
+            record.to_pickup  =  False
+            record.picked_up  =  False
+            db.session.commit()
+            return False
+
+        print(f"Success  in  processing  for  candidate  id  {record.candidate_id}   and  CandidateEvalAI id {record.id}")
+        return True
+
+    except Exception as e:
+        print(f"Error  in  processing  for  candidate  id  {record.candidate_id}   and  CandidateEvalAI id {record.id}: {str(e)}")
+        db.session.rollback()
+        record.progress_error_occured = True
+        record.picked_up  =  False
+        db.session.commit()
+        return False
+
+
+# ============================================================
+# Lanes
+# ============================================================
+# Scoring is quick and a candidate is waiting on it; generation takes minutes
+# per candidate. Each runs in its own lane (own slots, own claim loop) so one
+# never queues behind the other.
+EVALUATION_LANE = "evaluation"
+GENERATION_LANE = "generation"
+LANES = (EVALUATION_LANE, GENERATION_LANE)   # priority order
+
+# Queue waits / run times kept per lane for percentiles
+METRICS_WINDOW = 1000
+
+
+def _summary(values):
+    if not values:
+        return {"n": 0, "mean": None, "p95": None, "max": None}
+    ordered = sorted(values)
+    return {
+        "n": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+class LaneMetrics:
+    """Thread-safe per-lane counters: claims, queue wait (ready → claimed), run time, outcomes."""
+
+    def __init__(self, lane):
+        self.lane = lane
+        self._lock = threading.Lock()
+        self.claimed = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.queue_wait_s = deque(maxlen=METRICS_WINDOW)
+        self.run_s = deque(maxlen=METRICS_WINDOW)
+
+    def claimed_records(self, records):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            self.claimed += len(records)
+            for record in records:
+                queued_at = getattr(record, "queued_at", None)
+                if queued_at is not None:
+                    self.queue_wait_s.append(max(0.0, (now - queued_at).total_seconds()))
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, seconds, ok):
+        with self._lock:
+            self.in_flight -= 1
+            self.run_s.append(seconds)
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def summary(self):
+        with self._lock:
+            return {
+                "lane": self.lane,
+                "claimed": self.claimed,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "queue_wait_s": _summary(list(self.queue_wait_s)),
+                "run_s": _summary(list(self.run_s)),
+            }
+
+
+# Totals for this process
+lane_metrics = {lane: LaneMetrics(lane) for lane in LANES}
+
+
+def claim_lane(lane, batch_size=None, exclude_ids=()):
+    """
+    Claim work for `lane`: a list of (job, argument, record ids).
+    An evaluation job scores the whole claimed batch (shared grading calls);
+    a generation job is one candidate.
+    """
+    if lane == EVALUATION_LANE:
+        records = claim_evaluation_records(batch_size, exclude_ids=exclude_ids)
+        lane_metrics[lane].claimed_records(records)
+        for record in records:
+            print(f"Evaluation  Picked up  candidate  id  {record.candidate_id}   and   CandidateEvalAI id: {record.id}")
+        record_ids = [record.id for record in records]
+        return [(evaluate_records, record_ids, record_ids)] if records else []
+
+    records = claim_generation_records(batch_size, exclude_ids=exclude_ids)
+    lane_metrics[lane].claimed_records(records)
+    for record in records:
+        print(f"Picked up  candidate  id  {record.candidate_id}   and   CandidateEvalAI id: {record.id}")
+    return [(generate_for_record, record.id, [record.id]) for record in records]
+
+
+class LeaseKeeper:
+    """Renews the leases of a running job's rows every CLAIM_RENEW_SECONDS, on its own thread and session."""
+
+    def __init__(self, lane, record_ids):
+        self.lane = lane
+        self.record_ids = list(record_ids)
+        self.app = current_app._get_current_object()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"{lane}-lease", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(claims.CLAIM_RENEW_SECONDS):
+            with self.app.app_context():
+                try:
+                    renew_leases(self.lane, self.record_ids)
+                except Exception as e:
+                    # Retried at the next interval; the lease has two more to go
+                    print(f"⚠️ {self.lane} lease renewal for {self.record_ids} failed: {e}")
+                finally:
+                    db.session.remove()
+
+    def __enter__(self):
+        if self.record_ids:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def run_job(lane, job, arg, record_ids=()):
+    """
+    Run one claimed job, recording its outcome in the lane's metrics. Returns True on success.
+    The leases of `record_ids` are renewed while it runs, so no other worker reclaims them.
+    """
+    metrics = lane_metrics[lane]
+    metrics.started()
+    start = time.perf_counter()
+    ok = False
+    try:
+        with LeaseKeeper(lane, record_ids):
+            ok = job(arg) is not False
+    finally:
+        metrics.finished(time.perf_counter() - start, ok)
+    return ok
+
+
+# ----------------- Task Function -----------------
+def process_lane(lane):
+    """Claim and run all pending work of one lane in this thread, one bounded batch at a time."""
+    print(f"[{datetime.now(timezone.utc)}] Running  {lane}  lane...")
+
+    # Records that failed in this run are released but not retried until the next run
+    handled = set()
+    while True:
+        claimed = claim_lane(lane, exclude_ids=handled)
+        if not claimed:
+            break
+        for job, arg, record_ids in claimed:
+            handled.update(record_ids)
+            run_job(lane, job, arg, record_ids)
+    if not handled:
+        print(f"No  pending  {lane}  records")
+
+
+def process_candidate_eval():
+    """Both lanes, one after the other (scoring first)."""
+    for lane in LANES:
+        process_lane(lane)
@@ -0,0 +1,175 @@
+# submissions.py
+# Background SAQ grading for /submit_quiz/.
+#
+# MCQs are scored inside the request; SAQs are graded on a small worker pool
+# and the attempt is saved again once grading finishes. Status is kept in
+# memory for SSE pushes and read back from the saved attempt otherwise (e.g.
+# when another worker process took the submission).
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import Quiz.saving_quiz as saving_quiz
+from Quiz.qa_evaluator import evaluate_saq_batch
+
+SUBMISSION_GRADING_WORKERS = int(os.getenv("SUBMISSION_GRADING_WORKERS", "4"))
+# Finished submissions kept in memory for status / SSE lookups
+SUBMISSION_HISTORY = 1000
+
+PENDING = "pending"
+COMPLETE = "complete"
+FAILED = "failed"
+
+_SUBMISSION_ID = re.compile(r"[0-9a-fA-F-]{36}")
+
+_executor = ThreadPoolExecutor(max_workers=SUBMISSION_GRADING_WORKERS, thread_name_prefix="saq-grading")
+_submissions = OrderedDict()
+_condition = threading.Condition()
+
+
+def _view(state):
+    return {
+        "submission_id": state["submission_id"],
+        "status": state["status"],
+        "version": state["version"],
+        "total_questions": state["attempt_record"]["total_questions"],
+        "total_correct": state["attempt_record"]["total_correct"],
+        # Copies: the grading worker fills these entries in while responses are serialized
+        "evaluated_quiz": [dict(q) for q in state["attempt_record"]["evaluated_quiz"]],
+    }
+
+
+def _update(state, status):
+    # The state itself, not a lookup: it may have been evicted from the history meanwhile
+    with _condition:
+        state["status"] = status
+        state["version"] += 1
+        _condition.notify_all()
+
+
+def _save(state):
+    state["attempt_record"]["grading_status"] = state["status"]
+    saving_quiz.save_user_attempt(state["submission_id"], state["pdf_names"], state["attempt_record"])
+
+
+# ============================================================
+# Grading job
+# ============================================================
+def _grade(submission_id):
+    with _condition:
+        state = _submissions[submission_id]
+    attempt_record = state["attempt_record"]
+    evaluated_quiz = attempt_record["evaluated_quiz"]
+    saq_jobs = state["saq_jobs"]
+
+    try:
+        results = evaluate_saq_batch([item for _, item in saq_jobs])
+
+        with _condition:
+            for (position, _), eval_result in zip(saq_jobs, results):
+                entry = evaluated_quiz[position]
+                entry["is_correct"] = eval_result["is_correct"]
+                entry["explanation"] = eval_result.get("reason", entry.get("explanation", ""))
+                entry["score"] = eval_result.get("score")
+                entry["verdict"] = eval_result.get("verdict")
+                entry["graded_by"] = eval_result.get("graded_by", "llm")
+            attempt_record["total_correct"] = sum(1 for q in evaluated_quiz if q.get("is_correct"))
+            state["status"] = COMPLETE
+
+    except Exception as e:
+        print(f"❌ Submission {submission_id}: SAQ grading failed: {e}")
+        with _condition:
+            state["status"] = FAILED
+        try:
+            _save(state)
+        finally:
+            _update(state, FAILED)
+        return
+
+    # Grading succeeded: a failed save is logged, it does not turn the attempt into FAILED
+    try:
+        _save(state)
+        print(f"✅ Submission {submission_id}: {len(saq_jobs)} SAQ(s) graded")
+    except Exception as e:
+        print(f"❌ Submission {submission_id}: saving the graded attempt failed: {e}")
+    finally:
+        _update(state, COMPLETE)
+
+
+# ============================================================
+# Public API
+# ============================================================
+def start_submission(submission_id, pdf_names, attempt_record, saq_jobs):
+    """
+    Save the attempt with MCQs scored and SAQs pending, then queue SAQ grading.
+
+    `saq_jobs` is a list of (index into attempt_record["evaluated_quiz"],
+    {"question", "correct_answer", "user_answer", ...}) pairs.
+    Returns the submission view ({"submission_id", "status", ...}).
+    """
+    state = {
+        "submission_id": submission_id,
+        "pdf_names": pdf_names,
+        "attempt_record": attempt_record,
+        "saq_jobs": saq_jobs,
+        "status": PENDING if saq_jobs else COMPLETE,
+        "version": 0,
+    }
+
+    with _condition:
+        _submissions[submission_id] = state
+        # Drop the oldest finished submissions; pending ones stay until graded
+        excess = len(_submissions) - SUBMISSION_HISTORY
+        if excess > 0:
+            finished = [sid for sid, s in _submissions.items() if s["status"] != PENDING and sid != submission_id]
+            for sid in finished[:excess]:
+                _submissions.pop(sid)
+
+    _save(state)
+    if saq_jobs:
+        _executor.submit(_grade, submission_id)
+
+    with _condition:
+        return _view(state)
+
+
+def _load_from_disk(submission_id):
+    if not _SUBMISSION_ID.fullmatch(submission_id):
+        return None
+    data = saving_quiz.load_user_attempt(submission_id)
+    if data is None:
+        return None
+    status = data.get("grading_status", COMPLETE)
+    return {
+        "submission_id": submission_id,
+        "status": status,
+        # Other processes' submissions have no counter; finishing is the only change
+        "version": 0 if status == PENDING else 1,
+        "total_questions": data.get("total_questions"),
+        "total_correct": data.get("total_correct"),
+        "evaluated_quiz": data.get("evaluated_quiz", []),
+    }
+
+
+def get_submission(submission_id):
+    """Current view of a submission, or None if it is unknown."""
+    with _condition:
+        state = _submissions.get(submission_id)
+        if state is not None:
+            return _view(state)
+    return _load_from_disk(submission_id)
+
+
+def wait_for_update(submission_id, version, timeout):
+    """Block until the submission moves past `version` (or `timeout` seconds pass); returns its view."""
+    with _condition:
+        state = _submissions.get(submission_id)
+        if state is not None:
+            _condition.wait_for(lambda: state["version"] != version, timeout=timeout)
+            return _view(state)
+    # Graded by another process: poll its saved attempt instead
+    time.sleep(timeout)
+    return _load_from_disk(submission_id)
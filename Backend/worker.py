@@ -0,0 +1,243 @@
+# worker.py
+# Standalone candidate-evaluation worker. Run any number of these, on one host
+# or several, against the same database; claims (Backend/claims.py) keep each
+# CandidateEvalAI row with a single worker.
+#
+#   python -m Backend.worker --evaluation-concurrency 2 --generation-concurrency 4
+#   python -m Backend.worker --once          (drain the queues, then exit)
+#   python -m Backend.worker --wake-port 8006
+#
+# With --wake-port, POST /wake (sent by the web app's /jobs/wake, see
+# Backend/dispatch.py) starts claiming at once. Polling is only the safety net:
+# an idle lane backs off from WORKER_POLL_MIN_SECONDS to WORKER_POLL_SECONDS and
+# goes back to the short interval as soon as it finds work.
+#
+# Scoring and generation run in separate lanes (Backend/jobs.py), each with its
+# own slots and claim loop: quick scoring jobs never wait behind generation.
+#
+# Start the web app with EVALAI_RUN_SCHEDULER=0 when workers do the work.
+# SIGINT / SIGTERM stop claiming and let in-flight jobs finish; a second signal
+# exits at once (the rows' leases expire and another worker picks them up).
+import os
+import json
+import time
+import signal
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from Backend.config import Config
+from Backend.extensions import db
+from Backend.claims import queue_stats
+from Backend.dispatch import serve_wake_endpoint
+import Backend.jobs as jobs
+
+WORKER_EVALUATION_CONCURRENCY = int(os.getenv("WORKER_EVALUATION_CONCURRENCY", "2"))
+WORKER_GENERATION_CONCURRENCY = int(os.getenv("WORKER_GENERATION_CONCURRENCY", "4"))
+# Idle wait between claim attempts: starts at the minimum, doubles while the queue stays empty
+WORKER_POLL_MIN_SECONDS = float(os.getenv("WORKER_POLL_MIN_SECONDS", "1"))
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "60"))
+# Port of the POST /wake listener (0: no listener, poll only)
+WORKER_WAKE_PORT = int(os.getenv("WORKER_WAKE_PORT", "0"))
+# Lane / queue metrics are logged this often
+WORKER_METRICS_SECONDS = float(os.getenv("WORKER_METRICS_SECONDS", "60"))
+# A record this worker just processed (and maybe released after an error) is not re-claimed sooner
+WORKER_RETRY_DELAY_SECONDS = 60
+
+
+def create_app():
+    """Flask app with only the database configured: models and db.session, no routes."""
+    app = Flask("evalai_worker")
+    app.config.from_object(Config)
+    db.init_app(app)
+    return app
+
+
+class Lane:
+    """One lane's slots and claim loop."""
+
+    def __init__(self, worker, name, concurrency):
+        self.worker = worker
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"{name}-lane")
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.woken = False
+        self.idle_wait = worker.min_poll_seconds
+        self._recent = {}   # record id → time its job finished
+
+    def wake(self):
+        with self.condition:
+            self.woken = True
+            self.condition.notify_all()
+
+    def _run(self, job, arg, record_ids):
+        try:
+            with self.worker.app.app_context():
+                try:
+                    jobs.run_job(self.name, job, arg, record_ids)
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            print(f"❌ {self.name} job {job.__name__}({arg}) failed: {e}")
+
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            for record_id in record_ids:
+                self._recent[record_id] = now
+            self.condition.notify_all()
+
+    def _excluded(self):
+        cutoff = time.monotonic() - WORKER_RETRY_DELAY_SECONDS
+        with self.condition:
+            self._recent = {i: t for i, t in self._recent.items() if t >= cutoff}
+            return set(self._recent)
+
+    def _claim_and_submit(self, free_slots):
+        with self.condition:
+            self.woken = False   # this claim sees everything flagged before the wake-up
+        with self.worker.app.app_context():
+            try:
+                claimed = jobs.claim_lane(self.name, free_slots, exclude_ids=self._excluded())
+            finally:
+                db.session.remove()
+        for job, arg, record_ids in claimed:
+            with self.condition:
+                self.in_flight += 1
+            self.executor.submit(self._run, job, arg, record_ids)
+        return len(claimed)
+
+    def loop(self, once=False):
+        stopping = self.worker.stopping
+        while not stopping.is_set():
+            with self.condition:
+                self.condition.wait_for(lambda: self.in_flight < self.concurrency or stopping.is_set())
+                free_slots = self.concurrency - self.in_flight
+            if stopping.is_set():
+                break
+
+            try:
+                started = self._claim_and_submit(free_slots)
+            except Exception as e:
+                print(f"⚠️ {self.name} lane: claiming failed: {e}")
+                started = 0
+            if started:
+                self.idle_wait = self.worker.min_poll_seconds
+                continue
+
+            with self.condition:
+                if once and self.in_flight == 0:
+                    break
+                if self.woken:
+                    continue
+                # Nothing to claim: wait for a wake-up, a finished job or stop, at most
+                # the current poll interval, which grows while the queue stays empty
+                if not self.condition.wait(timeout=self.idle_wait):
+                    self.idle_wait = min(self.idle_wait * 2, self.worker.poll_seconds)
+
+        self.executor.shutdown(wait=True)
+
+
+class Worker:
+    def __init__(self, app, evaluation_concurrency=WORKER_EVALUATION_CONCURRENCY,
+                 generation_concurrency=WORKER_GENERATION_CONCURRENCY, poll_seconds=WORKER_POLL_SECONDS,
+                 min_poll_seconds=WORKER_POLL_MIN_SECONDS):
+        self.app = app
+        self.poll_seconds = poll_seconds
+        self.min_poll_seconds = min(min_poll_seconds, poll_seconds)
+        self.stopping = threading.Event()
+        concurrency = {
+            jobs.EVALUATION_LANE: evaluation_concurrency,
+            jobs.GENERATION_LANE: generation_concurrency,
+        }
+        self.lanes = [Lane(self, name, concurrency[name]) for name in jobs.LANES]
+
+    def wake(self, lane=None):
+        """Claim now on `lane` (None: every lane). False for an unknown lane."""
+        lanes = [l for l in self.lanes if lane in (None, l.name)]
+        for l in lanes:
+            l.wake()
+        return bool(lanes)
+
+    def stop(self, *_):
+        if self.stopping.is_set():
+            print("🛑 Second stop signal: exiting without waiting for in-flight jobs")
+            os._exit(1)
+        print("🛑 Stopping: no new claims, finishing in-flight jobs...")
+        self.stopping.set()
+        for lane in self.lanes:
+            with lane.condition:
+                lane.condition.notify_all()
+
+    def metrics(self):
+        with self.app.app_context():
+            try:
+                queues = queue_stats()
+            except Exception as e:
+                queues = {"error": str(e)}
+            finally:
+                db.session.remove()
+        return {
+            "queues": queues,
+            "lanes": {name: m.summary() for name, m in jobs.lane_metrics.items()},
+        }
+
+    def run(self, once=False):
+        print("🚀 Worker started: " + ", ".join(f"{lane.name} lane × {lane.concurrency}" for lane in self.lanes)
+              + f", poll every {self.min_poll_seconds}-{self.poll_seconds}s")
+        threads = [
+            threading.Thread(target=lane.loop, args=(once,), name=f"{lane.name}-claims", daemon=True)
+            for lane in self.lanes
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Lanes run on their own threads; this one only reports
+        while any(thread.is_alive() for thread in threads):
+            if self.stopping.wait(timeout=0.2 if once else WORKER_METRICS_SECONDS):
+                break
+            if not once:
+                print(f"📊 {json.dumps(self.metrics())}")
+        for thread in threads:
+            thread.join()
+
+        print(f"✅ Worker stopped: {json.dumps(self.metrics())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Candidate evaluation worker")
+    parser.add_argument("--evaluation-concurrency", type=int, default=WORKER_EVALUATION_CONCURRENCY,
+                        help="scoring jobs run in parallel")
+    parser.add_argument("--generation-concurrency", type=int, default=WORKER_GENERATION_CONCURRENCY,
+                        help="quiz generation jobs run in parallel")
+    parser.add_argument("--poll-seconds", type=float, default=WORKER_POLL_SECONDS,
+                        help="longest idle wait between claims (safety net behind wake-ups)")
+    parser.add_argument("--min-poll-seconds", type=float, default=WORKER_POLL_MIN_SECONDS,
+                        help="idle wait right after work was found")
+    parser.add_argument("--wake-port", type=int, default=WORKER_WAKE_PORT, help="serve POST /wake on this port (0: off)")
+    parser.add_argument("--once", action="store_true", help="exit when no work is left")
+    args = parser.parse_args()
+
+    worker = Worker(
+        create_app(),
+        evaluation_concurrency=args.evaluation_concurrency,
+        generation_concurrency=args.generation_concurrency,
+        poll_seconds=args.poll_seconds,
+        min_poll_seconds=args.min_poll_seconds,
+    )
+    if args.wake_port:
+        serve_wake_endpoint(args.wake_port, worker.wake)
+    signal.signal(signal.SIGINT, worker.stop)
+    signal.signal(signal.SIGTERM, worker.stop)
+    worker.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# cache.py
+# Persistent LLM response cache (SQLite), keyed by model + prompt + sampling params.
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import defaultdict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(BASE_DIR, "cache", "llm_cache.sqlite3"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+# Eviction runs every N writes rather than on every insert
+EVICTION_CHECK_INTERVAL = 100
+
+DAY = 24 * 3600
+
+# ----------------------------
+# Per-call-site policy
+# ----------------------------
+# ttl:             seconds a cached response stays valid (None → never cache)
+# max_temperature: only cache calls sampled at or below this temperature
+CACHE_POLICIES = {
+    "quiz_generation":    {"ttl": 7 * DAY,  "max_temperature": 0.3},
+    "saq_grading":        {"ttl": 30 * DAY, "max_temperature": 0.0},
+    "chatbot_questions":  {"ttl": 1 * DAY,  "max_temperature": 0.2},
+    "chatbot_evaluation": {"ttl": 7 * DAY,  "max_temperature": 0.0},
+}
+
+
+def make_cache_key(model, messages, temperature, max_tokens, **kwargs) -> str:
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        **kwargs,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def cache_allowed(site, temperature) -> bool:
+    if not LLM_CACHE_ENABLED or site is None:
+        return False
+    policy = CACHE_POLICIES.get(site)
+    if not policy or policy["ttl"] is None:
+        return False
+    return temperature <= policy["max_temperature"]
+
+
+# ============================================================
+# SQLite store
+# ============================================================
+class ResponseCache:
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    site TEXT,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+
+    def _connection(self):
+        # One connection per thread; WAL lets several processes share the file
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _record(self, site, hit):
+        with self._lock:
+            self._stats[site]["hits" if hit else "misses"] += 1
+
+    def get(self, key, site=None):
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT response, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None or row[1] < now:
+            self._record(site, hit=False)
+            return None
+
+        with conn:
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        self._record(site, hit=True)
+        return row[0]
+
+    def set(self, key, response, ttl, site=None):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, site, response, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, site, response, now, now + ttl, now)
+            )
+
+        with self._lock:
+            self._writes += 1
+            check = self._writes % EVICTION_CHECK_INTERVAL == 0
+        if check:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used beyond `max_entries`."""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+            count = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                    (excess,)
+                )
+
+    def stats(self):
+        with self._lock:
+            return {site: dict(counts) for site, counts in self._stats.items()}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def cache_stats():
+    """Hit/miss counters per call site for this process."""
+    return get_cache().stats()
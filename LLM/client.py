@@ -0,0 +1,220 @@
+# client.py
+# One pooled HTTP transport + client factory shared by every LLM call site.
+#
+#  - a single keep-alive connection pool per worker process (HTTP/2 when `h2` is installed)
+#  - explicit connect / read / write / pool timeouts
+#  - sync and async clients
+#  - pluggable backends: LLM_BACKEND=groq (default) or stub, or register_backend(...)
+import os
+import asyncio
+import threading
+import weakref
+
+import httpx
+from groq import Groq, AsyncGroq
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ----------------------------
+# Transport configuration
+# ----------------------------
+# Point at a Groq/OpenAI-compatible server other than api.groq.com,
+# e.g. the offline stub: LLM_BASE_URL=http://127.0.0.1:8090
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_WRITE_TIMEOUT = float(os.getenv("LLM_WRITE_TIMEOUT", "10"))
+LLM_POOL_TIMEOUT = float(os.getenv("LLM_POOL_TIMEOUT", "10"))
+
+# Connections per worker process
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def build_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=LLM_CONNECT_TIMEOUT,
+        read=LLM_READ_TIMEOUT,
+        write=LLM_WRITE_TIMEOUT,
+        pool=LLM_POOL_TIMEOUT,
+    )
+
+
+def build_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_POOL_SIZE,
+        max_keepalive_connections=LLM_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+def _api_key():
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key and LLM_BASE_URL:
+        api_key = "stub"   # local stand-ins don't check keys
+    if not api_key:
+        raise RuntimeError("GROQ_API_KEY environment variable not set")
+    return api_key
+
+
+# ============================================================
+# Client factory
+# ============================================================
+_lock = threading.Lock()
+_pid = None
+_sync_client = None
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _reset_after_fork():
+    """Connection pools must not be shared across forked worker processes."""
+    global _pid, _sync_client
+    if _pid != os.getpid():
+        _pid = os.getpid()
+        _sync_client = None
+        _async_clients.clear()
+
+
+def get_client() -> Groq:
+    """Process-wide sync client on the shared connection pool."""
+    global _sync_client
+    with _lock:
+        _reset_after_fork()
+        if _sync_client is None:
+            http_client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                limits=build_limits(),
+                timeout=build_timeout(),
+            )
+            # Retries are handled by the gateway so they can be coordinated across callers
+            _sync_client = Groq(
+                api_key=_api_key(),
+                base_url=LLM_BASE_URL,
+                http_client=http_client,
+                timeout=build_timeout(),
+                max_retries=0,
+            )
+        return _sync_client
+
+
+def get_async_client() -> AsyncGroq:
+    """Async client for the running event loop (async pools are bound to their loop)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        _reset_after_fork()
+        client = _async_clients.get(loop)
+        if client is None:
+            http_client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=build_limits(),
+                timeout=build_timeout(),
+            )
+            client = AsyncGroq(
+                api_key=_api_key(),
+                base_url=LLM_BASE_URL,
+                http_client=http_client,
+                timeout=build_timeout(),
+                max_retries=0,
+            )
+            _async_clients[loop] = client
+        return client
+
+
+# ============================================================
+# Backends
+# ============================================================
+class LLMResponse:
+    def __init__(self, content, headers=None, usage=None):
+        self.content = content
+        self.headers = headers or {}
+        self.usage = usage or {}
+
+
+class LLMBackend:
+    """
+    Interface for anything that can answer a chat completion request.
+    `request` is the provider payload (model, messages, temperature, max_tokens, ...).
+    Errors should carry a `status_code` attribute when they map to an HTTP status.
+    """
+    name = "base"
+
+    def chat(self, request) -> LLMResponse:
+        raise NotImplementedError
+
+    async def achat(self, request) -> LLMResponse:
+        raise NotImplementedError
+
+
+def _usage_dict(usage):
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+
+
+class GroqBackend(LLMBackend):
+    name = "groq"
+
+    def chat(self, request):
+        raw = get_client().chat.completions.with_raw_response.create(**request)
+        response = raw.parse()
+        return LLMResponse(response.choices[0].message.content, raw.headers, _usage_dict(response.usage))
+
+    async def achat(self, request):
+        raw = await get_async_client().chat.completions.with_raw_response.create(**request)
+        response = raw.parse()
+        return LLMResponse(response.choices[0].message.content, raw.headers, _usage_dict(response.usage))
+
+
+class StubBackend(LLMBackend):
+    """In-process synthetic responses (no network), same shapes as LLM/stub_server.py."""
+    name = "stub"
+
+    def chat(self, request):
+        from LLM.stub_server import synthetic_response
+        content = synthetic_response(request.get("messages", []))
+        return LLMResponse(content)
+
+    async def achat(self, request):
+        return self.chat(request)
+
+
+_backend_factories = {
+    GroqBackend.name: GroqBackend,
+    StubBackend.name: StubBackend,
+}
+_backend = None
+
+
+def register_backend(name, factory):
+    """Make another provider available as LLM_BACKEND=<name>."""
+    _backend_factories[name] = factory
+
+
+def get_backend() -> LLMBackend:
+    global _backend
+    with _lock:
+        if _backend is None:
+            if LLM_BACKEND not in _backend_factories:
+                raise RuntimeError(f"Unknown LLM_BACKEND '{LLM_BACKEND}'")
+            _backend = _backend_factories[LLM_BACKEND]()
+        return _backend
+
+
+def set_backend(backend: LLMBackend):
+    """Swap the active backend at runtime (benchmarks, tooling)."""
+    global _backend
+    with _lock:
+        _backend = backend
@@ -0,0 +1,365 @@
+# gateway.py
+# Single entry point for every LLM call in the project.
+#
+#  - process-wide token buckets (requests + tokens per minute)
+#  - separate quota lanes for interactive and background work
+#  - honours `retry-after` and `x-ratelimit-*` response headers
+#  - jittered exponential backoff, shared cooldown after a 429
+#  - optional persistent response cache, policy chosen per call site
+#  - prompt/completion token accounting per call, per caller and per process
+#  - sync and async entry points (achat_completion + run_sync for sync callers)
+import os
+import re
+import time
+import asyncio
+import random
+import threading
+
+import httpx
+from groq import APIConnectionError
+from dotenv import load_dotenv
+
+from LLM.rate_limiter import (
+    RateLimiter,
+    GROQ_REQUESTS_PER_MINUTE,
+    GROQ_TOKENS_PER_MINUTE,
+)
+from LLM.cache import get_cache, make_cache_key, cache_allowed, CACHE_POLICIES
+from LLM.client import get_backend
+from LLM.tokens import count_message_tokens, count_tokens, check_prompt_compaction, process_usage
+
+load_dotenv()
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+
+# ----------------------------
+# Quota lanes
+# ----------------------------
+INTERACTIVE = "interactive"   # HTTP requests a user is waiting on
+BACKGROUND = "background"     # scheduler / batch work
+
+INTERACTIVE_SHARE = float(os.getenv("LLM_INTERACTIVE_SHARE", "0.6"))
+LANE_SHARES = {
+    INTERACTIVE: INTERACTIVE_SHARE,
+    BACKGROUND: 1.0 - INTERACTIVE_SHARE,
+}
+
+# Tokens reserved for the completion when the caller sets no max_tokens
+DEFAULT_COMPLETION_RESERVE = 1024
+
+# ----------------------------
+# Backoff
+# ----------------------------
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+# Status codes worth retrying; other 4xx errors are returned to the caller
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Transport failures (incl. connect/read timeouts) are always retried
+RETRYABLE_EXCEPTIONS = (APIConnectionError, httpx.TransportError, ConnectionError, TimeoutError)
+
+
+# ============================================================
+# Lane limiters + shared cooldown
+# ============================================================
+_lane_limiters = {
+    lane: RateLimiter(
+        max(1, int(GROQ_REQUESTS_PER_MINUTE * share)),
+        max(1, int(GROQ_TOKENS_PER_MINUTE * share)),
+    )
+    for lane, share in LANE_SHARES.items()
+}
+
+_cooldown_until = 0.0
+_cooldown_lock = threading.Lock()
+
+
+def _extend_cooldown(seconds: float):
+    """Pause every caller in the process until the provider's window resets."""
+    global _cooldown_until
+    with _cooldown_lock:
+        _cooldown_until = max(_cooldown_until, time.monotonic() + seconds)
+
+
+def _cooldown_remaining() -> float:
+    with _cooldown_lock:
+        return _cooldown_until - time.monotonic()
+
+
+def _wait_for_cooldown():
+    while (remaining := _cooldown_remaining()) > 0:
+        time.sleep(remaining)
+
+
+# ============================================================
+# Header parsing
+# ============================================================
+_DURATION_PART = re.compile(r"([\d.]+)(ms|h|m|s)")
+
+
+def parse_duration(value) -> float:
+    """Parse `retry-after` / `x-ratelimit-reset-*` values ('7.66s', '2m59.56s', '120ms', '3')."""
+    if value is None:
+        return 0.0
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    seconds = 0.0
+    for amount, unit in _DURATION_PART.findall(value):
+        amount = float(amount)
+        if unit == "h":
+            seconds += amount * 3600
+        elif unit == "m":
+            seconds += amount * 60
+        elif unit == "ms":
+            seconds += amount / 1000
+        else:
+            seconds += amount
+    return seconds
+
+
+def _apply_rate_limit_headers(headers, lane):
+    """Sync local pacing with what the provider says is left in the window."""
+    if not headers:
+        return
+
+    limiter = _lane_limiters[lane]
+    share = LANE_SHARES[lane]
+
+    remaining_requests = headers.get("x-ratelimit-remaining-requests")
+    if remaining_requests is not None:
+        try:
+            remaining_requests = int(float(remaining_requests))
+            limiter.requests.drain_to(remaining_requests * share)
+            if remaining_requests <= 0:
+                _extend_cooldown(parse_duration(headers.get("x-ratelimit-reset-requests")))
+        except ValueError:
+            pass
+
+    remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+    if remaining_tokens is not None:
+        try:
+            remaining_tokens = int(float(remaining_tokens))
+            limiter.tokens.drain_to(remaining_tokens * share)
+            if remaining_tokens <= 0:
+                _extend_cooldown(parse_duration(headers.get("x-ratelimit-reset-tokens")))
+        except ValueError:
+            pass
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+
+def _error_headers(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None) if response is not None else None
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff so concurrent retries don't line up."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+# ============================================================
+# Shared call plumbing (sync + async)
+# ============================================================
+def _cache_lookup(messages, model, temperature, max_tokens, cache_site, trackers, kwargs):
+    """Returns (cache, key, cached_content); cache is None when the site may not be cached."""
+    if not cache_allowed(cache_site, temperature):
+        return None, None, None
+    cache = get_cache()
+    cache_key = make_cache_key(model, messages, temperature, max_tokens, **kwargs)
+    cached = cache.get(cache_key, site=cache_site)
+    if cached is not None:
+        for tracker in trackers:
+            tracker.record(cache_site, 0, 0, cached=True)
+    return cache, cache_key, cached
+
+
+def _record_usage(response, prompt_tokens, max_tokens, cache_site, trackers):
+    # Provider-reported usage when available, local counts otherwise
+    prompt_used = response.usage.get("prompt_tokens") or prompt_tokens
+    completion_used = response.usage.get("completion_tokens") or count_tokens(response.content or "")
+    for tracker in trackers:
+        tracker.record(cache_site, prompt_used, completion_used, max_tokens=max_tokens)
+    print(f"🔢 LLM tokens ({cache_site or 'unnamed'}): prompt={prompt_used}, "
+          f"completion={completion_used}/{max_tokens or DEFAULT_COMPLETION_RESERVE}")
+
+
+def _build_request(messages, model, temperature, max_tokens, kwargs):
+    request = {"model": model, "messages": messages, "temperature": temperature, **kwargs}
+    if max_tokens is not None:
+        request["max_tokens"] = max_tokens
+    return request
+
+
+def _retry_wait(error, attempt, max_retries, lane) -> float:
+    """Seconds to sleep before the next attempt; re-raises when the error is final."""
+    status = _status_code(error)
+    retryable = isinstance(error, RETRYABLE_EXCEPTIONS) or status in RETRYABLE_STATUS_CODES
+
+    if not retryable or attempt >= max_retries:
+        print(f"❌ LLM call failed ({lane}, status={status}): {error}")
+        raise error
+
+    if status == 429:
+        headers = _error_headers(error) or {}
+        retry_after = parse_duration(headers.get("retry-after"))
+        wait_time = (retry_after or _backoff_delay(attempt + 1)) + random.uniform(0, 1)
+        # Everyone in the process backs off, not just this caller
+        _extend_cooldown(wait_time)
+        print(f"⚠️ Rate limited ({lane}). Cooling down {wait_time:.1f}s before retry {attempt + 1}/{max_retries}...")
+        return 0.0
+
+    wait_time = _backoff_delay(attempt)
+    print(f"⚠️ LLM error ({lane}, status={status}): {error}. Retrying in {wait_time:.1f}s...")
+    return wait_time
+
+
+# ============================================================
+# Public API
+# ============================================================
+def chat_completion(messages, model=DEFAULT_MODEL, temperature=0.3, max_tokens=None,
+                    lane=INTERACTIVE, max_retries=3, cache_site=None, validate=None, usage=None, **kwargs):
+    """
+    Rate-limited, retrying chat completion. Returns the message content.
+
+    `lane` selects the quota share the call is paced against; extra keyword
+    arguments (e.g. `response_format`) are passed through to the provider.
+    `cache_site` names the call site whose policy in CACHE_POLICIES decides
+    whether the response may be served from / stored in the cache; `validate`
+    can veto caching of a response the caller would not be able to use.
+    Token counts are added to `process_usage` and, if given, to `usage`
+    (a TokenUsage collecting e.g. one quiz's calls).
+    """
+    if lane not in _lane_limiters:
+        raise ValueError(f"Unknown LLM lane: {lane}")
+
+    trackers = [process_usage] + ([usage] if usage is not None else [])
+    cache, cache_key, cached = _cache_lookup(messages, model, temperature, max_tokens, cache_site, trackers, kwargs)
+    if cached is not None:
+        return cached
+
+    prompt_tokens = count_message_tokens(messages)
+    check_prompt_compaction(messages, cache_site, prompt_tokens)
+
+    response = _call_with_retries(messages, model, temperature, max_tokens, lane, max_retries,
+                                  prompt_tokens=prompt_tokens, **kwargs)
+    _record_usage(response, prompt_tokens, max_tokens, cache_site, trackers)
+
+    content = response.content
+    if cache is not None and (validate is None or validate(content)):
+        cache.set(cache_key, content, CACHE_POLICIES[cache_site]["ttl"], site=cache_site)
+
+    return content
+
+
+def _call_with_retries(messages, model, temperature, max_tokens, lane, max_retries, prompt_tokens=None, **kwargs):
+    limiter = _lane_limiters[lane]
+    if prompt_tokens is None:
+        prompt_tokens = count_message_tokens(messages)
+    reserved_tokens = prompt_tokens + (max_tokens or DEFAULT_COMPLETION_RESERVE)
+    request = _build_request(messages, model, temperature, max_tokens, kwargs)
+
+    for attempt in range(max_retries + 1):
+        _wait_for_cooldown()
+        limiter.acquire(reserved_tokens)
+
+        try:
+            response = get_backend().chat(request)
+            _apply_rate_limit_headers(response.headers, lane)
+            return response
+        except Exception as e:
+            wait_time = _retry_wait(e, attempt, max_retries, lane)
+            if wait_time:
+                time.sleep(wait_time)
+
+    raise RuntimeError(f"Failed to complete LLM call after {max_retries} retries")
+
+
+def complete(prompt, **kwargs):
+    """Convenience wrapper for a single user-message prompt."""
+    return chat_completion([{"role": "user", "content": prompt}], **kwargs)
+
+
+# ============================================================
+# Async API
+# ============================================================
+async def achat_completion(messages, model=DEFAULT_MODEL, temperature=0.3, max_tokens=None,
+                           lane=INTERACTIVE, max_retries=3, cache_site=None, validate=None, usage=None,
+                           timeout=None, **kwargs):
+    """
+    Async counterpart of chat_completion on the backend's async client.
+    Pacing, retries, caching and accounting are shared with the sync path;
+    `timeout` bounds each attempt (a timed-out attempt is retried like any
+    transport error).
+    """
+    if lane not in _lane_limiters:
+        raise ValueError(f"Unknown LLM lane: {lane}")
+
+    trackers = [process_usage] + ([usage] if usage is not None else [])
+    cache, cache_key, cached = _cache_lookup(messages, model, temperature, max_tokens, cache_site, trackers, kwargs)
+    if cached is not None:
+        return cached
+
+    prompt_tokens = count_message_tokens(messages)
+    check_prompt_compaction(messages, cache_site, prompt_tokens)
+
+    limiter = _lane_limiters[lane]
+    reserved_tokens = prompt_tokens + (max_tokens or DEFAULT_COMPLETION_RESERVE)
+    request = _build_request(messages, model, temperature, max_tokens, kwargs)
+
+    for attempt in range(max_retries + 1):
+        while (remaining := _cooldown_remaining()) > 0:
+            await asyncio.sleep(remaining)
+        wait_time = limiter.reserve(reserved_tokens)
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+        try:
+            response = await asyncio.wait_for(get_backend().achat(request), timeout)
+            _apply_rate_limit_headers(response.headers, lane)
+            break
+        except Exception as e:
+            wait_time = _retry_wait(e, attempt, max_retries, lane)
+            if wait_time:
+                await asyncio.sleep(wait_time)
+    else:
+        raise RuntimeError(f"Failed to complete LLM call after {max_retries} retries")
+
+    _record_usage(response, prompt_tokens, max_tokens, cache_site, trackers)
+
+    content = response.content
+    if cache is not None and (validate is None or validate(content)):
+        cache.set(cache_key, content, CACHE_POLICIES[cache_site]["ttl"], site=cache_site)
+
+    return content
+
+
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop():
+    """One long-lived event loop thread per process, so async connection pools are reused."""
+    global _loop, _loop_pid
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(target=_loop.run_forever, name="llm-async-loop", daemon=True).start()
+        return _loop
+
+
+def run_sync(coro):
+    """Run a coroutine from sync code (Flask routes, APScheduler jobs) and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
@@ -0,0 +1,86 @@
+# rate_limiter.py
+import os
+import time
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ----------------------------
+# Quota (match the Groq account limits)
+# ----------------------------
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "20000"))
+
+
+# ============================================================
+# Token Bucket
+# ============================================================
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    `reserve()` takes the requested amount immediately (the bucket may go
+    into debt) and returns how long the caller must wait before using it,
+    so concurrent callers are served in the order they arrived.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._available = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._available = min(self.capacity, self._available + elapsed * self.refill_per_second)
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Reserve `amount` tokens and return the wait time in seconds."""
+        # A single request larger than the bucket can never fit; cap it
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            self._refill()
+            self._available -= amount
+            if self._available >= 0:
+                return 0.0
+            return -self._available / self.refill_per_second
+
+    def drain_to(self, amount: float):
+        """Lower the available balance to `amount` (e.g. provider-reported remaining quota)."""
+        with self._lock:
+            self._refill()
+            self._available = min(self._available, float(amount))
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Block until `amount` tokens are available. Returns seconds waited."""
+        wait_time = self.reserve(amount)
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+
+# ============================================================
+# Requests + Tokens per Minute Limiter
+# ============================================================
+class RateLimiter:
+    """Paces calls against both a requests-per-minute and a tokens-per-minute quota."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+    def reserve(self, tokens: int = 0) -> float:
+        wait_requests = self.requests.reserve(1)
+        wait_tokens = self.tokens.reserve(tokens) if tokens else 0.0
+        return max(wait_requests, wait_tokens)
+
+    def acquire(self, tokens: int = 0) -> float:
+        wait_time = self.reserve(tokens)
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
@@ -0,0 +1,289 @@
+# stub_server.py
+# Offline Groq/OpenAI-compatible stand-in for benchmarks and air-gapped development.
+#
+#   python -m LLM.stub_server --port 8090 --latency-ms 800 --jitter-ms 300 \
+#       --error-rate 0.02 --rate-limit-rate 0.05 --cassette LLM/cache/cassette.jsonl
+#
+# Point the app at it with LLM_BASE_URL=http://127.0.0.1:8090 (no API key needed).
+#
+# Modes:
+#   synthetic  answer every request with a generated response of the right shape
+#   replay     serve recorded responses from the cassette, synthetic on a miss
+#   record     forward to the real provider (GROQ_API_KEY) and append to the cassette
+import os
+import re
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from LLM.cache import make_cache_key
+
+CHAT_PATH = "/openai/v1/chat/completions"
+UPSTREAM_URL = "https://api.groq.com"
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+# ============================================================
+# Synthetic responses
+# ============================================================
+def _synthetic_structured_quiz(prompt):
+    clusters = []
+    for cluster_id, num_saq, num_mcq in re.findall(
+        r"\[cluster_id: (\w+)\] SAQs: up to (\d+) \| MCQs: up to (\d+)", prompt
+    ):
+        clusters.append({
+            "cluster_id": cluster_id,
+            "saqs": [
+                {
+                    "question": f"Stub SAQ {i + 1} for {cluster_id}: explain the core idea behind the topic?",
+                    "answer": f"Reference answer {i + 1} for {cluster_id}.",
+                    "explanation": "Synthetic explanation."
+                }
+                for i in range(int(num_saq))
+            ],
+            "mcqs": [
+                {
+                    "question": f"Stub MCQ {i + 1} for {cluster_id}: which statement is correct?",
+                    "options": {"A": "Correct statement", "B": "Wrong one", "C": "Wrong two", "D": "Wrong three"},
+                    "correct_answer": "A",
+                    "explanation": "Synthetic explanation."
+                }
+                for i in range(int(num_mcq))
+            ],
+        })
+    return json.dumps({"clusters": clusters})
+
+
+def _synthetic_text_quiz(prompt, mcq):
+    match = re.search(r"generate up to (\d+)", prompt)
+    count = int(match.group(1)) if match else 2
+    blocks = []
+    for i in range(1, count + 1):
+        if mcq:
+            blocks.append(
+                f"Q{i}. Stub MCQ {i}: which statement is correct?\n"
+                "   A) Correct statement\n   B) Wrong one\n   C) Wrong two\n   D) Wrong three\n"
+                "Correct Answer: A\nExplanation: Synthetic explanation."
+            )
+        else:
+            blocks.append(
+                f"Q{i}. Stub SAQ {i}: explain the core idea behind the topic?\n"
+                f"Answer: Reference answer {i}.\nExplanation: Synthetic explanation."
+            )
+    return "\n\n".join(blocks)
+
+
+def _synthetic_grade(seed):
+    score = round(random.Random(seed).uniform(0, 10), 1)
+    verdict = "CORRECT" if score >= 7 else "PARTIALLY_CORRECT" if score >= 4 else "INCORRECT"
+    return {"verdict": verdict, "score": score, "reason": "Synthetic grade."}
+
+
+def synthetic_response(messages):
+    prompt = "\n".join(m.get("content", "") for m in messages)
+
+    if "[cluster_id:" in prompt:
+        return _synthetic_structured_quiz(prompt)
+    if "Multiple Choice Questions (MCQs) from the provided cluster" in prompt:
+        return _synthetic_text_quiz(prompt, mcq=True)
+    if "Short Answer Questions (SAQs) from the provided cluster" in prompt:
+        return _synthetic_text_quiz(prompt, mcq=False)
+    if "[item_id:" in prompt:
+        grades = []
+        for item_id in re.findall(r"\[item_id: (\w+)\]", prompt):
+            grades.append({"item_id": item_id, **_synthetic_grade(prompt + item_id)})
+        return json.dumps({"grades": grades})
+    if "expert quiz evaluator" in prompt:
+        return json.dumps(_synthetic_grade(prompt))
+    if "interview evaluator" in prompt:
+        ids = re.findall(r"['\"]id['\"]\s*:\s*(\d+)", prompt)
+        return json.dumps([{"id": int(i), "its_score": random.randint(0, 10)} for i in ids])
+    return "Stub response."
+
+
+# ============================================================
+# Server
+# ============================================================
+class StubState:
+    def __init__(self, mode="synthetic", cassette=None, latency_ms=0, jitter_ms=0,
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=1.0, upstream=UPSTREAM_URL):
+        self.mode = mode
+        self.cassette = cassette
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.upstream = upstream
+        self.recorded = {}
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "errors": 0, "rate_limited": 0, "replayed": 0, "recorded": 0}
+        self._load_cassette()
+
+    def _load_cassette(self):
+        if not self.cassette or not os.path.exists(self.cassette):
+            return
+        with open(self.cassette, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.recorded[entry["key"]] = entry["content"]
+
+    def record(self, key, content):
+        with self.lock:
+            self.recorded[key] = content
+            self.counters["recorded"] += 1
+            if self.cassette:
+                os.makedirs(os.path.dirname(os.path.abspath(self.cassette)), exist_ok=True)
+                with open(self.cassette, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key, "content": content}, ensure_ascii=False) + "\n")
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+
+def _forward_upstream(state, body):
+    request = urllib.request.Request(
+        state.upstream.rstrip("/") + CHAT_PATH,
+        data=json.dumps(body).encode("utf-8"),
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {os.getenv('GROQ_API_KEY', '')}",
+        },
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=120) as response:
+        payload = json.loads(response.read().decode("utf-8"))
+    return payload["choices"][0]["message"]["content"]
+
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                with state.lock:
+                    return self._send_json(200, dict(state.counters))
+            self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if self.path.rstrip("/") != CHAT_PATH:
+                return self._send_json(404, {"error": {"message": "not found"}})
+
+            length = int(self.headers.get("Content-Length", "0"))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            state.count("requests")
+
+            delay = max(0.0, random.gauss(state.latency_ms, state.jitter_ms) / 1000) if state.latency_ms else 0.0
+            if delay:
+                time.sleep(delay)
+
+            roll = random.random()
+            if roll < state.rate_limit_rate:
+                state.count("rate_limited")
+                return self._send_json(429, {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_exceeded"}},
+                                       headers={"retry-after": str(state.retry_after)})
+            if roll < state.rate_limit_rate + state.error_rate:
+                state.count("errors")
+                return self._send_json(503, {"error": {"message": "Service unavailable (stub)"}})
+
+            messages = body.get("messages", [])
+            key = make_cache_key(
+                body.get("model"), messages, body.get("temperature"), body.get("max_tokens"),
+                **({"response_format": body["response_format"]} if "response_format" in body else {})
+            )
+
+            if state.mode in ("replay", "record") and key in state.recorded:
+                state.count("replayed")
+                content = state.recorded[key]
+            elif state.mode == "record":
+                content = _forward_upstream(state, body)
+                state.record(key, content)
+            else:
+                content = synthetic_response(messages)
+
+            prompt_tokens = sum(_estimate_tokens(m.get("content", "")) for m in messages)
+            completion_tokens = _estimate_tokens(content)
+            self._send_json(200, {
+                "id": f"stub-{key[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }, headers={
+                "x-ratelimit-remaining-requests": "1000",
+                "x-ratelimit-remaining-tokens": "1000000",
+            })
+
+    return StubHandler
+
+
+def start_stub_server(host="127.0.0.1", port=8090, **options):
+    """Start the stub in a background thread. Returns (server, state); call server.shutdown() to stop."""
+    state = StubState(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Groq/OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--mode", choices=["synthetic", "replay", "record"], default="synthetic")
+    parser.add_argument("--cassette", help="JSONL file used by replay/record modes")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="latency standard deviation")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after seconds sent with 429s")
+    parser.add_argument("--upstream", default=UPSTREAM_URL, help="provider used in record mode")
+    args = parser.parse_args()
+
+    server, state = start_stub_server(
+        host=args.host, port=args.port, mode=args.mode, cassette=args.cassette,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after, upstream=args.upstream,
+    )
+    print(f"🧪 LLM stub ({args.mode}) listening on http://{args.host}:{args.port}  —  set LLM_BASE_URL to use it")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
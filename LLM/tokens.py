@@ -0,0 +1,172 @@
+# tokens.py
+# Token counting, completion budgets and per-call / per-quiz usage accounting.
+import os
+import re
+import threading
+from collections import defaultdict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# HuggingFace tokenizer.json for the served model (e.g. Llama 3.1); optional
+LLM_TOKENIZER_PATH = os.getenv("LLM_TOKENIZER_PATH")
+
+# Prompts above this size are flagged for review
+PROMPT_TOKEN_WARN = int(os.getenv("LLM_PROMPT_TOKEN_WARN", "1500"))
+# Flag prompts where collapsing whitespace alone would save this fraction
+COMPACTION_SAVING_WARN = 0.10
+
+# ----------------------------
+# Completion budgets (tokens per generated item, measured on llama-3.1-8b output)
+# ----------------------------
+SAQ_TOKENS = 90
+MCQ_TOKENS = 160
+GRADE_TOKENS = 70               # one {"item_id", "verdict", "score", "reason"} entry
+RESPONSE_OVERHEAD_TOKENS = 60
+JSON_OVERHEAD_FACTOR = 1.25     # keys, quotes and braces in structured output
+BUDGET_SAFETY_FACTOR = 1.3
+MIN_COMPLETION_TOKENS = 256
+MAX_COMPLETION_TOKENS = 4000
+
+
+# ============================================================
+# Tokenizer
+# ============================================================
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def _load_tokenizer():
+    """Best local tokenizer available: tokenizer.json → tiktoken → heuristic."""
+    if LLM_TOKENIZER_PATH and os.path.exists(LLM_TOKENIZER_PATH):
+        try:
+            from tokenizers import Tokenizer
+            tokenizer = Tokenizer.from_file(LLM_TOKENIZER_PATH)
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+        except Exception as e:
+            print(f"⚠️ Could not load tokenizer from {LLM_TOKENIZER_PATH}: {e}")
+
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:
+        pass
+
+    # Words count ~1.3 tokens on average for English BPE vocabularies; punctuation ~1
+    def heuristic(text):
+        tokens = 0
+        for piece in _TOKEN_PIECES.findall(text):
+            tokens += 1 + len(piece) // 6 if piece[0].isalnum() else 1
+        return tokens
+
+    return heuristic
+
+
+def count_tokens(text: str) -> int:
+    global _tokenizer
+    if not text:
+        return 0
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                _tokenizer = _load_tokenizer()
+    return _tokenizer(text)
+
+
+def count_message_tokens(messages) -> int:
+    # ~4 tokens of chat-template framing per message
+    return sum(count_tokens(m.get("content", "")) + 4 for m in messages)
+
+
+# ============================================================
+# Budgets
+# ============================================================
+def completion_budget(num_saq: int, num_mcq: int, structured: bool = False) -> int:
+    """max_tokens scaled to the number of questions requested."""
+    expected = num_saq * SAQ_TOKENS + num_mcq * MCQ_TOKENS
+    if structured:
+        expected *= JSON_OVERHEAD_FACTOR
+    budget = int((expected + RESPONSE_OVERHEAD_TOKENS) * BUDGET_SAFETY_FACTOR)
+    return max(MIN_COMPLETION_TOKENS, min(MAX_COMPLETION_TOKENS, budget))
+
+
+def grading_budget(num_items: int) -> int:
+    """max_tokens for grading `num_items` answers in one structured call."""
+    budget = int((num_items * GRADE_TOKENS + RESPONSE_OVERHEAD_TOKENS) * BUDGET_SAFETY_FACTOR)
+    return max(MIN_COMPLETION_TOKENS, min(MAX_COMPLETION_TOKENS, budget))
+
+
+_flagged = set()
+_flagged_lock = threading.Lock()
+
+
+def check_prompt_compaction(messages, site, prompt_tokens=None):
+    """Log (once per site and reason) prompts that look worth compacting."""
+    prompt = "\n".join(m.get("content", "") for m in messages)
+    prompt_tokens = prompt_tokens if prompt_tokens is not None else count_tokens(prompt)
+    reasons = {}
+
+    if prompt_tokens > PROMPT_TOKEN_WARN:
+        reasons["size"] = f"{prompt_tokens} prompt tokens (> {PROMPT_TOKEN_WARN})"
+
+    compact_tokens = count_tokens(" ".join(prompt.split()))
+    if prompt_tokens and (prompt_tokens - compact_tokens) / prompt_tokens >= COMPACTION_SAVING_WARN:
+        reasons["whitespace"] = f"whitespace alone is {prompt_tokens - compact_tokens} tokens"
+
+    for kind, reason in reasons.items():
+        with _flagged_lock:
+            if (site, kind) in _flagged:
+                continue
+            _flagged.add((site, kind))
+        print(f"✂️ Prompt for '{site or 'unnamed'}' could be compacted: {reason}")
+    return list(reasons.values())
+
+
+# ============================================================
+# Usage accounting
+# ============================================================
+class TokenUsage:
+    """Thread-safe prompt/completion token totals, broken down by call site."""
+
+    def __init__(self, label=""):
+        self.label = label
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.cached_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.reserved_completion_tokens = 0
+        self.by_site = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+
+    def record(self, site, prompt_tokens, completion_tokens, max_tokens=None, cached=False):
+        with self._lock:
+            self.calls += 1
+            if cached:
+                self.cached_calls += 1
+                return
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.reserved_completion_tokens += max_tokens or 0
+            site_usage = self.by_site[site or "unnamed"]
+            site_usage["calls"] += 1
+            site_usage["prompt_tokens"] += prompt_tokens
+            site_usage["completion_tokens"] += completion_tokens
+
+    def summary(self):
+        with self._lock:
+            return {
+                "label": self.label,
+                "calls": self.calls,
+                "cached_calls": self.cached_calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": self.prompt_tokens + self.completion_tokens,
+                "reserved_completion_tokens": self.reserved_completion_tokens,
+                "by_site": {site: dict(u) for site, u in self.by_site.items()},
+            }
+
+
+# Totals for the whole process
+process_usage = TokenUsage("process")
@@ -0,0 +1,224 @@
+# answer_similarity.py
+# Local embedding pre-grader for SAQ answers.
+#
+# Answers that are clearly the reference answer (or clearly unrelated to it) are
+# settled with the sentence-transformer already loaded for clustering; only the
+# ambiguous middle band goes to the LLM.
+#
+#   python -m Quiz.answer_similarity --calibrate              (attempt store)
+#   python -m Quiz.answer_similarity --calibrate Quiz/user_quizzes
+#
+# prints how LLM verdicts are spread over similarity bands, to tune the thresholds.
+import os
+import glob
+import json
+import argparse
+from collections import defaultdict
+
+import numpy as np
+from dotenv import load_dotenv
+
+from Quiz.persistence import read_json
+from Quiz.attempt_store import PENDING_VERDICT
+
+load_dotenv()
+
+SAQ_SIMILARITY_ENABLED = os.getenv("SAQ_SIMILARITY_ENABLED", "1") == "1"
+# cosine similarity at or above → CORRECT locally
+SAQ_ACCEPT_SIMILARITY = float(os.getenv("SAQ_ACCEPT_SIMILARITY", "0.85"))
+# cosine similarity below → INCORRECT locally
+SAQ_REJECT_SIMILARITY = float(os.getenv("SAQ_REJECT_SIMILARITY", "0.20"))
+
+# Stored embeddings are rounded; cosine scores are unaffected at this precision
+EMBEDDING_DECIMALS = 4
+
+GRADED_BY_SIMILARITY = "similarity"
+
+
+# ============================================================
+# Embeddings
+# ============================================================
+def _model():
+    # Same model instance as clustering: no second copy in memory
+    from Cluster.cluster import embedding_model
+    return embedding_model
+
+
+def embed_texts(texts):
+    """Unit-length embeddings, one row per text."""
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.asarray(_model().encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+
+
+def reference_embeddings(quiz):
+    """
+    {question_id: embedding} for every SAQ reference answer in `quiz`,
+    stored next to the quiz so submissions only need to embed the answers.
+    """
+    refs = {}
+    for idx, q in enumerate(quiz):
+        if isinstance(q, dict) and q.get("type") == "SAQ" and q.get("answer"):
+            refs[q.get("id") or f"q_{idx}"] = q["answer"]
+    if not refs:
+        return {}
+
+    vectors = embed_texts(list(refs.values()))
+    return {
+        qid: [round(float(x), EMBEDDING_DECIMALS) for x in vector]
+        for qid, vector in zip(refs, vectors)
+    }
+
+
+def similarities(items):
+    """
+    Cosine similarity between each item's user_answer and its reference answer.
+    Items may carry a precomputed "reference_embedding"; the rest are embedded here.
+    """
+    texts = []
+    slots = []
+    for item in items:
+        answer_slot = len(texts)
+        texts.append(item["user_answer"])
+        if item.get("reference_embedding"):
+            slots.append((answer_slot, None))
+        else:
+            slots.append((answer_slot, len(texts)))
+            texts.append(item["correct_answer"])
+
+    vectors = embed_texts(texts)
+    scores = []
+    for item, (answer_slot, ref_slot) in zip(items, slots):
+        if ref_slot is None:
+            reference = np.asarray(item["reference_embedding"], dtype=np.float32)
+            reference /= max(float(np.linalg.norm(reference)), 1e-12)
+        else:
+            reference = vectors[ref_slot]
+        scores.append(float(np.dot(vectors[answer_slot], reference)))
+    return scores
+
+
+# ============================================================
+# Pre-grading
+# ============================================================
+def settle(similarity):
+    """Local grade for a similarity score, or None when the LLM has to decide."""
+    if similarity >= SAQ_ACCEPT_SIMILARITY:
+        score = round(min(10.0, 10.0 * similarity), 2)
+        return {
+            "is_correct": True,
+            "score": score,
+            "verdict": "CORRECT",
+            "reason": f"Answer matches the reference answer (similarity {similarity:.2f}).",
+            "graded_by": GRADED_BY_SIMILARITY
+        }
+    if similarity < SAQ_REJECT_SIMILARITY:
+        return {
+            "is_correct": False,
+            "score": 0.0,
+            "verdict": "INCORRECT",
+            "reason": f"Answer is unrelated to the reference answer (similarity {similarity:.2f}).",
+            "graded_by": GRADED_BY_SIMILARITY
+        }
+    return None
+
+
+def pre_grade(items):
+    """One local grade (or None) per item, in order. Never raises: on failure everything goes to the LLM."""
+    if not SAQ_SIMILARITY_ENABLED or not items:
+        return [None] * len(items)
+    try:
+        return [settle(s) for s in similarities(items)]
+    except Exception as e:
+        print(f"⚠️ Similarity pre-grading unavailable ({e}); sending all answers to the LLM")
+        return [None] * len(items)
+
+
+# ============================================================
+# Calibration
+# ============================================================
+BAND_WIDTH = 0.05
+
+
+def _attempt_items(attempts):
+    """LLM-graded SAQ answers from saved user attempts (fully graded attempts only)."""
+    for attempt in attempts:
+        # Pending attempts carry placeholder verdicts; failed ones may be half graded
+        if attempt.get("grading_status", "complete") != "complete":
+            continue
+        for q in attempt.get("evaluated_quiz", []):
+            if q.get("type") != "SAQ" or not q.get("user_answer") or q.get("verdict") in (None, "", PENDING_VERDICT):
+                continue
+            if q.get("graded_by") == GRADED_BY_SIMILARITY:
+                continue
+            yield {
+                "user_answer": q["user_answer"],
+                "correct_answer": q.get("correct_answer", ""),
+                "verdict": q["verdict"],
+            }
+
+
+def calibration_report(attempts, accept=None, reject=None):
+    """`attempts`: saved attempt dicts (attempt store rows or parsed attempt files)."""
+    accept = SAQ_ACCEPT_SIMILARITY if accept is None else accept
+    reject = SAQ_REJECT_SIMILARITY if reject is None else reject
+
+    items = list(_attempt_items(attempts))
+    if not items:
+        return {"items": 0}
+    scores = similarities(items)
+
+    bands = defaultdict(lambda: defaultdict(int))
+    accepted = defaultdict(int)
+    rejected = defaultdict(int)
+    for item, s in zip(items, scores):
+        band = min(int(max(s, 0.0) / BAND_WIDTH), int(1 / BAND_WIDTH) - 1)
+        bands[band][item["verdict"]] += 1
+        if s >= accept:
+            accepted[item["verdict"]] += 1
+        elif s < reject:
+            rejected[item["verdict"]] += 1
+
+    n_accepted = sum(accepted.values())
+    n_rejected = sum(rejected.values())
+    return {
+        "items": len(items),
+        "accept_threshold": accept,
+        "reject_threshold": reject,
+        "settled_locally": round((n_accepted + n_rejected) / len(items), 3),
+        # share of local decisions the LLM would have agreed with
+        "accept_agreement": round(accepted["CORRECT"] / n_accepted, 3) if n_accepted else None,
+        "reject_agreement": round(rejected["INCORRECT"] / n_rejected, 3) if n_rejected else None,
+        "bands": [
+            {
+                "similarity": f"{band * BAND_WIDTH:.2f}-{(band + 1) * BAND_WIDTH:.2f}",
+                "n": sum(verdicts.values()),
+                **dict(verdicts),
+            }
+            for band, verdicts in sorted(bands.items())
+        ],
+    }
+
+
+def main():
+    from Quiz.saving_quiz import ATTEMPT_SUFFIXES
+    from Quiz.attempt_store import get_attempt_store
+
+    parser = argparse.ArgumentParser(description="Calibrate SAQ similarity bands against LLM verdicts")
+    parser.add_argument("--calibrate", nargs="?", const="", default="",
+                        help="folder of saved attempt files (default: the attempt store)")
+    parser.add_argument("--accept", type=float, help="accept threshold to evaluate")
+    parser.add_argument("--reject", type=float, help="reject threshold to evaluate")
+    args = parser.parse_args()
+
+    if args.calibrate:
+        paths = sorted(p for suffix in ATTEMPT_SUFFIXES for p in glob.glob(os.path.join(args.calibrate, f"*{suffix}")))
+        attempts = (read_json(p) for p in paths)
+    else:
+        attempts = get_attempt_store().iter_attempts()
+    report = calibration_report(attempts, accept=args.accept, reject=args.reject)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
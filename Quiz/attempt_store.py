@@ -0,0 +1,491 @@
+# attempt_store.py
+# SQLite attempt store: one row per attempt, one row per answered question,
+# and per-quiz / per-question rollups kept up to date on every write.
+#
+# Attempts are saved twice (SAQs pending, then graded); a re-save retracts
+# the old rows' contribution to the rollups before adding the new one, so
+# totals never double count.
+#
+#   python -m Quiz.attempt_store --migrate Quiz/user_quizzes
+#   python -m Quiz.attempt_store --rebuild-rollups
+import os
+import glob
+import gzip
+import time
+import sqlite3
+import argparse
+import threading
+from dotenv import load_dotenv
+
+from Quiz.persistence import dumps, loads, read_json, GZIP_LEVEL
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ATTEMPT_STORE_PATH = os.getenv("ATTEMPT_STORE_PATH", os.path.join(BASE_DIR, "attempt_store", "attempts.sqlite3"))
+ATTEMPT_STORE_ENABLED = os.getenv("ATTEMPT_STORE_ENABLED", "1") == "1"
+
+# Attempts per transaction when migrating JSON files
+MIGRATION_BATCH_SIZE = 500
+
+# Placeholder verdict of SAQs still being graded; not counted in rollups
+PENDING_VERDICT = "PENDING"
+# SAQ scores (0-10) at or above this count as correct
+SAQ_PASS_SCORE = 7.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    attempt_id TEXT PRIMARY KEY,
+    quiz_key TEXT NOT NULL,
+    pdf_names TEXT,
+    attempted_at TEXT,
+    grading_status TEXT,
+    total_questions INTEGER NOT NULL,
+    total_correct INTEGER NOT NULL,
+    percentage REAL NOT NULL,
+    saq_average REAL,
+    record BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_quiz ON attempts (quiz_key, attempted_at);
+
+CREATE TABLE IF NOT EXISTS question_results (
+    attempt_id TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    quiz_key TEXT NOT NULL,
+    type TEXT,
+    is_correct INTEGER,
+    score REAL,
+    verdict TEXT,
+    graded_by TEXT,
+    PRIMARY KEY (attempt_id, question_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_results_question ON question_results (quiz_key, question_id);
+
+CREATE TABLE IF NOT EXISTS quiz_rollups (
+    quiz_key TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    total_questions INTEGER NOT NULL DEFAULT 0,
+    total_correct INTEGER NOT NULL DEFAULT 0,
+    percentage_sum REAL NOT NULL DEFAULT 0,
+    updated_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS question_rollups (
+    quiz_key TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    type TEXT,
+    answered INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    score_n INTEGER NOT NULL DEFAULT 0,
+    score_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (quiz_key, question_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS verdict_rollups (
+    quiz_key TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    verdict TEXT NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (quiz_key, question_id, verdict)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS score_rollups (
+    quiz_key TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (quiz_key, question_id, bucket)
+) WITHOUT ROWID;
+"""
+
+# Bumped when the rollup rules change; older stores are rebuilt when opened
+# (1: SAQ correctness from the score, quiz sums over completed attempts only)
+ROLLUP_VERSION = 1
+
+# SAQ scores (0-10) are counted in unit-wide buckets: 0 = [0, 1), ..., 9 = [9, 10]
+SCORE_BUCKETS = 10
+
+
+# ============================================================
+# Row building
+# ============================================================
+def score_bucket(score):
+    return min(max(int(score), 0), SCORE_BUCKETS - 1)
+
+
+def attempt_quiz_key(attempt):
+    # Attempts saved before quiz keys were recorded are grouped by their PDF names
+    return attempt.get("quiz_key") or f"pdf:{attempt.get('pdf_names', '')}"
+
+
+def _attempt_row(attempt):
+    return (
+        attempt["user_id"],
+        attempt_quiz_key(attempt),
+        attempt.get("pdf_names"),
+        attempt.get("attempted_at"),
+        attempt.get("grading_status", "complete"),
+        int(attempt.get("total_questions") or 0),
+        int(attempt.get("total_correct") or 0),
+        float(attempt.get("percentage_correct") or 0.0),
+        attempt.get("saq_average_score"),
+        gzip.compress(dumps(attempt), compresslevel=GZIP_LEVEL),
+    )
+
+
+def _result_rows(attempt):
+    attempt_id = attempt["user_id"]
+    quiz_key = attempt_quiz_key(attempt)
+    rows = []
+    for idx, q in enumerate(attempt.get("evaluated_quiz", [])):
+        is_correct = q.get("is_correct")
+        verdict = q.get("verdict")
+        if q.get("type") == "SAQ" and q.get("score") is not None:
+            # Correctness from the score, also for attempts graded before the pass mark was fixed
+            is_correct = q["score"] >= SAQ_PASS_SCORE
+        rows.append((
+            attempt_id,
+            q.get("question_id") or f"q_{idx}",
+            quiz_key,
+            q.get("type"),
+            None if is_correct is None else int(bool(is_correct)),
+            q.get("score"),
+            None if verdict == PENDING_VERDICT else verdict,
+            q.get("graded_by"),
+        ))
+    return rows
+
+
+# ============================================================
+# SQLite store
+# ============================================================
+class AttemptStore:
+    def __init__(self, path=ATTEMPT_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self._connection()
+        had_scores = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'score_rollups'"
+        ).fetchone()
+        had_results = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'question_results'"
+        ).fetchone()
+        conn.executescript(SCHEMA)
+        stored_version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if had_results and stored_version < ROLLUP_VERSION:
+            # Rollups written under older counting rules: recompute them all
+            self.rebuild_rollups()
+        elif had_results and not had_scores:
+            # Store created before score histograms: fill them from the stored results
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._rebuild_score_rollups(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if stored_version < ROLLUP_VERSION:
+            conn.execute(f"PRAGMA user_version = {ROLLUP_VERSION}")
+
+    def _connection(self):
+        # One connection per thread; WAL lets several processes share the file.
+        # Autocommit mode: writes open their own BEGIN IMMEDIATE transactions.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ----------------------------
+    # Rollups
+    # ----------------------------
+    def _apply(self, conn, attempt_rows, result_rows, sign):
+        """Add (sign=1) or retract (sign=-1) attempts and their question results from the rollups."""
+        now = time.time()
+        conn.executemany("""
+            INSERT INTO quiz_rollups (quiz_key, attempts, completed, total_questions, total_correct, percentage_sum, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (quiz_key) DO UPDATE SET
+                attempts = attempts + excluded.attempts,
+                completed = completed + excluded.completed,
+                total_questions = total_questions + excluded.total_questions,
+                total_correct = total_correct + excluded.total_correct,
+                percentage_sum = percentage_sum + excluded.percentage_sum,
+                updated_at = excluded.updated_at
+        """, [
+            # Pending and failed attempts count as attempts; only graded ones enter the sums
+            (quiz_key, sign, sign * complete, sign * complete * total_questions, sign * complete * total_correct,
+             sign * complete * percentage, now)
+            for _, quiz_key, _, _, status, total_questions, total_correct, percentage, *_ in attempt_rows
+            for complete in [int(status == "complete")]
+        ])
+
+        conn.executemany("""
+            INSERT INTO question_rollups (quiz_key, question_id, type, answered, correct, score_n, score_sum)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (quiz_key, question_id) DO UPDATE SET
+                type = COALESCE(excluded.type, type),
+                answered = answered + excluded.answered,
+                correct = correct + excluded.correct,
+                score_n = score_n + excluded.score_n,
+                score_sum = score_sum + excluded.score_sum
+        """, [
+            (quiz_key, question_id, qtype,
+             sign * (is_correct is not None), sign * (is_correct or 0),
+             sign * (score is not None), sign * (score or 0.0))
+            for _, question_id, quiz_key, qtype, is_correct, score, _, _ in result_rows
+        ])
+
+        conn.executemany("""
+            INSERT INTO verdict_rollups (quiz_key, question_id, verdict, n) VALUES (?, ?, ?, ?)
+            ON CONFLICT (quiz_key, question_id, verdict) DO UPDATE SET n = n + excluded.n
+        """, [
+            (quiz_key, question_id, verdict, sign)
+            for _, question_id, quiz_key, _, _, _, verdict, _ in result_rows
+            if verdict
+        ])
+
+        conn.executemany("""
+            INSERT INTO score_rollups (quiz_key, question_id, bucket, n) VALUES (?, ?, ?, ?)
+            ON CONFLICT (quiz_key, question_id, bucket) DO UPDATE SET n = n + excluded.n
+        """, [
+            (quiz_key, question_id, score_bucket(score), sign)
+            for _, question_id, quiz_key, _, _, score, _, _ in result_rows
+            if score is not None
+        ])
+
+    # ----------------------------
+    # Writes
+    # ----------------------------
+    def record_many(self, attempts):
+        """Insert or replace attempts (dicts as saved by save_user_attempt) in one transaction."""
+        # Last write wins for an attempt repeated within the batch
+        attempts = list({a["user_id"]: a for a in attempts}.values())
+        if not attempts:
+            return
+        attempt_rows = [_attempt_row(a) for a in attempts]
+        result_rows = [row for a in attempts for row in _result_rows(a)]
+        ids = list({row[0] for row in attempt_rows})
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            old_attempts, old_results = [], []
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                old_attempts += conn.execute(
+                    f"SELECT * FROM attempts WHERE attempt_id IN ({marks})", chunk
+                ).fetchall()
+                old_results += conn.execute(
+                    f"SELECT attempt_id, question_id, quiz_key, type, is_correct, score, verdict, graded_by "
+                    f"FROM question_results WHERE attempt_id IN ({marks})", chunk
+                ).fetchall()
+                conn.execute(f"DELETE FROM question_results WHERE attempt_id IN ({marks})", chunk)
+            if old_attempts:
+                self._apply(conn, old_attempts, old_results, -1)
+
+            conn.executemany("INSERT OR REPLACE INTO attempts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", attempt_rows)
+            conn.executemany("INSERT OR REPLACE INTO question_results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", result_rows)
+            self._apply(conn, attempt_rows, result_rows, 1)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def record(self, attempt):
+        self.record_many([attempt])
+
+    def rebuild_rollups(self):
+        """Recompute every rollup from the attempt and question tables."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM quiz_rollups")
+            conn.execute("DELETE FROM question_rollups")
+            conn.execute("DELETE FROM verdict_rollups")
+            conn.execute(
+                "UPDATE question_results SET is_correct = score >= ? WHERE type = 'SAQ' AND score IS NOT NULL",
+                (SAQ_PASS_SCORE,)
+            )
+            conn.execute("""
+                INSERT INTO quiz_rollups
+                SELECT quiz_key, COUNT(*), SUM(grading_status = 'complete'),
+                       SUM(CASE WHEN grading_status = 'complete' THEN total_questions ELSE 0 END),
+                       SUM(CASE WHEN grading_status = 'complete' THEN total_correct ELSE 0 END),
+                       SUM(CASE WHEN grading_status = 'complete' THEN percentage ELSE 0 END), ?
+                FROM attempts GROUP BY quiz_key
+            """, (time.time(),))
+            conn.execute("""
+                INSERT INTO question_rollups
+                SELECT quiz_key, question_id, MAX(type), COUNT(is_correct), COALESCE(SUM(is_correct), 0),
+                       COUNT(score), COALESCE(SUM(score), 0)
+                FROM question_results GROUP BY quiz_key, question_id
+            """)
+            conn.execute("""
+                INSERT INTO verdict_rollups
+                SELECT quiz_key, question_id, verdict, COUNT(*)
+                FROM question_results WHERE verdict IS NOT NULL GROUP BY quiz_key, question_id, verdict
+            """)
+            self._rebuild_score_rollups(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _rebuild_score_rollups(self, conn):
+        conn.execute("DELETE FROM score_rollups")
+        conn.execute(f"""
+            INSERT INTO score_rollups
+            SELECT quiz_key, question_id, MIN(MAX(CAST(score AS INTEGER), 0), {SCORE_BUCKETS - 1}) AS bucket, COUNT(*)
+            FROM question_results WHERE score IS NOT NULL GROUP BY quiz_key, question_id, bucket
+        """)
+
+    # ----------------------------
+    # Reads
+    # ----------------------------
+    def get_attempt(self, attempt_id):
+        """The attempt dict as saved, or None."""
+        row = self._connection().execute(
+            "SELECT record FROM attempts WHERE attempt_id = ?", (attempt_id,)
+        ).fetchone()
+        return loads(row[0]) if row else None
+
+    def iter_attempts(self, quiz_key=None, batch_size=500):
+        """Saved attempt dicts, oldest first (optionally for one quiz)."""
+        conn = self._connection()
+        sql = "SELECT rowid, record FROM attempts WHERE rowid > ?"
+        if quiz_key:
+            sql += " AND quiz_key = ?"
+        sql += " ORDER BY rowid LIMIT ?"
+        last_rowid = 0
+        while True:
+            args = [last_rowid, quiz_key, batch_size] if quiz_key else [last_rowid, batch_size]
+            rows = conn.execute(sql, args).fetchall()
+            if not rows:
+                return
+            for rowid, record in rows:
+                yield loads(record)
+            last_rowid = rows[-1][0]
+
+    def quiz_rollup(self, quiz_key):
+        row = self._connection().execute(
+            "SELECT attempts, completed, total_questions, total_correct, percentage_sum FROM quiz_rollups WHERE quiz_key = ?",
+            (quiz_key,)
+        ).fetchone()
+        if not row or not row[0]:
+            return None
+        attempts, completed, total_questions, total_correct, percentage_sum = row
+        return {
+            "quiz_key": quiz_key,
+            "attempts": attempts,
+            "completed": completed,
+            # Averages over graded attempts only
+            "average_percentage": round(percentage_sum / completed, 2) if completed else None,
+            "correct_rate": round(total_correct / total_questions, 4) if total_questions else None,
+        }
+
+    def question_rollups(self, quiz_key):
+        """[{question_id, type, answered, correct, correct_rate, average_score, verdicts, score_distribution}] for a quiz."""
+        conn = self._connection()
+        verdicts = {}
+        for question_id, verdict, n in conn.execute(
+            "SELECT question_id, verdict, n FROM verdict_rollups WHERE quiz_key = ? AND n > 0", (quiz_key,)
+        ):
+            verdicts.setdefault(question_id, {})[verdict] = n
+
+        # score_distribution[i] = number of scores in [i, i + 1)
+        distributions = {}
+        for question_id, bucket, n in conn.execute(
+            "SELECT question_id, bucket, n FROM score_rollups WHERE quiz_key = ? AND n > 0", (quiz_key,)
+        ):
+            distributions.setdefault(question_id, [0] * SCORE_BUCKETS)[bucket] = n
+
+        questions = []
+        for question_id, qtype, answered, correct, score_n, score_sum in conn.execute(
+            "SELECT question_id, type, answered, correct, score_n, score_sum FROM question_rollups WHERE quiz_key = ?",
+            (quiz_key,)
+        ):
+            questions.append({
+                "question_id": question_id,
+                "type": qtype,
+                "answered": answered,
+                "correct": correct,
+                "correct_rate": round(correct / answered, 4) if answered else None,
+                "average_score": round(score_sum / score_n, 2) if score_n else None,
+                "verdicts": verdicts.get(question_id, {}),
+                "score_distribution": distributions.get(question_id),
+            })
+        return questions
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_attempt_store() -> AttemptStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AttemptStore()
+        return _store
+
+
+# ============================================================
+# Migration
+# ============================================================
+def migrate_folder(folder, batch_size=MIGRATION_BATCH_SIZE):
+    """Load every <quiz>_<id>.json(.gz) attempt file in `folder`; re-running is safe."""
+    from Quiz.saving_quiz import ATTEMPT_SUFFIXES
+
+    paths = sorted(p for suffix in ATTEMPT_SUFFIXES for p in glob.glob(os.path.join(folder, f"*{suffix}")))
+    store = get_attempt_store()
+    migrated = skipped = 0
+    batch = []
+    for path in paths:
+        try:
+            attempt = read_json(path)
+        except (ValueError, OSError) as e:
+            print(f"⚠️ Skipping unreadable attempt file {path}: {e}")
+            skipped += 1
+            continue
+        if not isinstance(attempt, dict) or not attempt.get("user_id"):
+            skipped += 1
+            continue
+        batch.append(attempt)
+        if len(batch) >= batch_size:
+            store.record_many(batch)
+            migrated += len(batch)
+            batch = []
+    store.record_many(batch)
+    migrated += len(batch)
+    return {"files": len(paths), "migrated": migrated, "skipped": skipped}
+
+
+def main():
+    from Quiz.saving_quiz import USER_ATTEMPTS_FOLDER
+
+    parser = argparse.ArgumentParser(description="Attempt store maintenance")
+    parser.add_argument("--migrate", nargs="?", const=USER_ATTEMPTS_FOLDER, help="folder of JSON attempt files to import")
+    parser.add_argument("--rebuild-rollups", action="store_true", help="recompute rollups from stored attempts")
+    args = parser.parse_args()
+
+    if args.migrate:
+        start = time.perf_counter()
+        result = migrate_folder(args.migrate)
+        print(f"✅ Migrated {result['migrated']} attempt(s) from {args.migrate} "
+              f"({result['skipped']} skipped) in {time.perf_counter() - start:.1f}s")
+    if args.rebuild_rollups:
+        get_attempt_store().rebuild_rollups()
+        print("✅ Rollups rebuilt")
+    if not args.migrate and not args.rebuild_rollups:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
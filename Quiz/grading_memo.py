@@ -0,0 +1,135 @@
+# grading_memo.py
+# Persistent SAQ grading memo (SQLite), shared by every worker process.
+#
+# Many candidates get the same cached quiz and give near-identical answers;
+# temperature-0 grading of the same (question, reference, answer) is
+# deterministic enough that a stored verdict can be reused as is.
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GRADING_MEMO_PATH = os.getenv("GRADING_MEMO_PATH", os.path.join(BASE_DIR, "grading_memo", "grading_memo.sqlite3"))
+GRADING_MEMO_ENABLED = os.getenv("GRADING_MEMO_ENABLED", "1") == "1"
+
+# Bump when the grading prompt or model changes so old verdicts are not reused
+GRADING_MEMO_VERSION = "llama-3.1-8b-instant:v1"
+
+GRADED_BY_MEMO = "memo"
+
+
+# ============================================================
+# Keys
+# ============================================================
+def _sha(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def normalize_answer(text):
+    """Fold case, punctuation and whitespace: 'The  Cell-wall.' → 'the cell wall'."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = "".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def memo_key(question, correct_answer, user_answer):
+    """
+    Question id is the hash of the question text (generated ids like `q_3`
+    repeat across quizzes), plus the reference-answer hash and the
+    normalized answer.
+    """
+    return "|".join((
+        GRADING_MEMO_VERSION,
+        _sha(" ".join((question or "").split())),
+        _sha(correct_answer),
+        _sha(normalize_answer(user_answer)),
+    ))
+
+
+# ============================================================
+# SQLite store
+# ============================================================
+class GradingMemo:
+    def __init__(self, path=GRADING_MEMO_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS saq_grades (
+                    key TEXT PRIMARY KEY,
+                    verdict TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    reason TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    def _connection(self):
+        # One connection per thread; WAL lets several processes share the file
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys):
+        """{key: {"verdict", "score", "reason"}} for the keys that have a stored grade."""
+        keys = list(set(keys))
+        found = {}
+        conn = self._connection()
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = conn.execute(
+                f"SELECT key, verdict, score, reason FROM saq_grades WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            for key, verdict, score, reason in rows:
+                found[key] = {"verdict": verdict, "score": score, "reason": reason or ""}
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, grades):
+        """Store {key: grade dict}."""
+        if not grades:
+            return
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO saq_grades (key, verdict, score, reason, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(key, g["verdict"], g["score"], g.get("reason", ""), now) for key, g in grades.items()]
+            )
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+_memo = None
+_memo_lock = threading.Lock()
+
+
+def get_grading_memo() -> GradingMemo:
+    global _memo
+    with _memo_lock:
+        if _memo is None:
+            _memo = GradingMemo()
+        return _memo
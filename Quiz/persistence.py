@@ -0,0 +1,119 @@
+# persistence.py
+# JSON file persistence for quizzes and attempts:
+#
+#  - atomic writes (temp file in the same folder + os.replace), so readers
+#    never see a half-written file
+#  - cross-process file locks (filelock) for read-modify-write and
+#    check-then-write sections; per-path thread locks if filelock is missing
+#  - compact encoding, with orjson when it is installed
+#  - optional gzip (".json.gz"), detected on read by its magic bytes
+import os
+import gzip
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from filelock import FileLock
+    FILELOCK_AVAILABLE = True
+except ImportError:
+    FILELOCK_AVAILABLE = False
+
+# Pretty-printed files are ~2x larger and slower to encode; keep for debugging only
+PERSIST_PRETTY_JSON = os.getenv("PERSIST_PRETTY_JSON", "0") == "1"
+# fsync before rename: survives power loss, costs a few ms per write
+PERSIST_FSYNC = os.getenv("PERSIST_FSYNC", "0") == "1"
+# Seconds to wait for another writer's lock
+PERSIST_LOCK_TIMEOUT = float(os.getenv("PERSIST_LOCK_TIMEOUT", "30"))
+
+GZIP_MAGIC = b"\x1f\x8b"
+GZIP_LEVEL = 6
+
+
+# ============================================================
+# Encoding
+# ============================================================
+def dumps(obj, pretty=None) -> bytes:
+    pretty = PERSIST_PRETTY_JSON if pretty is None else pretty
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, indent=4, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes):
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
+# ============================================================
+# Locks
+# ============================================================
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock for `path` (a sibling `.lock` file), across processes when filelock is installed."""
+    lock_path = f"{path}.lock"
+    if FILELOCK_AVAILABLE:
+        with FileLock(lock_path, timeout=PERSIST_LOCK_TIMEOUT):
+            yield
+        return
+
+    with _thread_locks_guard:
+        lock = _thread_locks.setdefault(os.path.abspath(lock_path), threading.Lock())
+    with lock:
+        yield
+
+
+# ============================================================
+# Files
+# ============================================================
+def atomic_write(path, data: bytes):
+    """Write `data` to a temp file next to `path`, then rename it over `path`."""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if PERSIST_FSYNC:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_json(path, obj, compress=False, pretty=None):
+    data = dumps(obj, pretty=pretty)
+    if compress:
+        data = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    atomic_write(path, data)
+    return len(data)
+
+
+def read_json(path):
+    """Parse a JSON (or gzipped JSON) file."""
+    with open(path, "rb") as f:
+        return loads(f.read())
@@ -1,11 +1,24 @@
 import os
 import json
-from groq import Groq
-from dotenv import load_dotenv
+import asyncio
 
-load_dotenv()
+from LLM.gateway import chat_completion, achat_completion, run_sync, INTERACTIVE
+from LLM.tokens import grading_budget
+from Quiz.answer_similarity import pre_grade
+from Quiz.attempt_store import SAQ_PASS_SCORE
+from Quiz.grading_memo import GRADING_MEMO_ENABLED, GRADED_BY_MEMO, get_grading_memo, memo_key
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Answers graded per LLM call by evaluate_saq_batch (1 → one call per answer)
+SAQ_GRADING_BATCH_SIZE = int(os.getenv("SAQ_GRADING_BATCH_SIZE", "15"))
+# Grading calls in flight at once; pacing is left to the LLM gateway
+SAQ_GRADING_CONCURRENCY = int(os.getenv("SAQ_GRADING_CONCURRENCY", "8"))
+# Seconds each grading attempt may take before it is retried
+SAQ_GRADING_TIMEOUT = float(os.getenv("SAQ_GRADING_TIMEOUT", "30"))
+
+VERDICTS = ("CORRECT", "PARTIALLY_CORRECT", "INCORRECT")
+
+# Reason prefix of fallback results; these are never memoized
+EVALUATION_ERROR = "Evaluation error"
 
 # =============================
 # Quick rejection rules
@@ -26,24 +39,40 @@ def quick_reject(user_answer, question):
     return None
 
 
+def is_valid_json(text):
+    try:
+        json.loads(text.strip())
+        return True
+    except ValueError:
+        return False
+
+
+def _rejected(reason):
+    return {
+        "is_correct": False,
+        "score": 0.0,
+        "verdict": "INCORRECT",
+        "reason": reason
+    }
+
+
+def _grade_result(result):
+    score = float(result.get("score", 0.0))
+    verdict = result.get("verdict", "INCORRECT")
+
+    return {
+        "is_correct": score >= SAQ_PASS_SCORE,
+        "score": round(score, 2),
+        "verdict": verdict,
+        "reason": result.get("reason", "")
+    }
+
+
 # =============================
 # LLM-based SAQ evaluation
 # =============================
-def evaluate_saq(user_answer, correct_answer, question):
-    """
-    Evaluate short-answer questions using LLM-based factual reasoning
-    """
-
-    rejection_reason = quick_reject(user_answer, question)
-    if rejection_reason:
-        return {
-            "is_correct": False,
-            "score": 0.0,
-            "verdict": "INCORRECT",
-            "reason": rejection_reason
-        }
-
-    prompt = f"""
+def _saq_prompt(user_answer, correct_answer, question):
+    return f"""
 You are an expert quiz evaluator.
 
 Your job is to correctly evaluate the student's submitted answer to a question
@@ -76,32 +105,265 @@ Return ONLY valid JSON in this exact format:
 }}
 """
 
+
+def evaluate_saq(user_answer, correct_answer, question, lane=INTERACTIVE):
+    """
+    Evaluate short-answer questions using LLM-based factual reasoning
+    """
+
+    rejection_reason = quick_reject(user_answer, question)
+    if rejection_reason:
+        return _rejected(rejection_reason)
+
+    prompt = _saq_prompt(user_answer, correct_answer, question)
+
     try:
-        response = client.chat.completions.create(
+        raw = chat_completion(
+            [{"role": "user", "content": prompt}],
             model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
             temperature=0,
-            max_tokens=200
+            max_tokens=200,
+            lane=lane,
+            cache_site="saq_grading",
+            validate=is_valid_json
+        ).strip()
+        return _grade_result(json.loads(raw))
+
+    except Exception as e:
+        # Safe fallback
+        return _rejected(f"{EVALUATION_ERROR}: {str(e)}")
+
+
+async def aevaluate_saq(user_answer, correct_answer, question, lane=INTERACTIVE, timeout=None):
+    """Async evaluate_saq: same prompt, same result dict."""
+    rejection_reason = quick_reject(user_answer, question)
+    if rejection_reason:
+        return _rejected(rejection_reason)
+
+    prompt = _saq_prompt(user_answer, correct_answer, question)
+
+    try:
+        raw = await achat_completion(
+            [{"role": "user", "content": prompt}],
+            model="llama-3.1-8b-instant",
+            temperature=0,
+            max_tokens=200,
+            lane=lane,
+            cache_site="saq_grading",
+            validate=is_valid_json,
+            timeout=timeout or SAQ_GRADING_TIMEOUT
         )
+        return _grade_result(json.loads(raw.strip()))
 
-        raw = response.choices[0].message.content.strip()
-        result = json.loads(raw)
+    except Exception as e:
+        # asyncio timeouts carry no message
+        return _rejected(f"{EVALUATION_ERROR}: {str(e) or type(e).__name__}")
 
-        score = float(result.get("score", 0.0))
-        verdict = result.get("verdict", "INCORRECT")
 
-        return {
-            "is_correct": score >= 0.7,
-            "score": round(score, 2),
-            "verdict": verdict,
-            "reason": result.get("reason", "")
-        }
+# =============================
+# Batched SAQ evaluation
+# =============================
+def parse_grades_json(raw_text, item_ids):
+    """
+    Parse a batch grading response into {item_id: grade}.
+    Entries that are missing, duplicated or malformed are left out so the
+    caller can re-grade just those items.
+    """
+    data = json.loads(raw_text.strip())
+    entries = data.get("grades") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError("Batch grading response has no 'grades' list")
+
+    grades = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        item_id = str(entry.get("item_id", "")).strip()
+        if item_id not in item_ids or item_id in grades:
+            continue
+        try:
+            score = float(entry.get("score"))
+        except (TypeError, ValueError):
+            continue
+        verdict = str(entry.get("verdict", "")).strip().upper()
+        if not 0.0 <= score <= 10.0 or verdict not in VERDICTS:
+            continue
+        grades[item_id] = {"verdict": verdict, "score": score, "reason": entry.get("reason", "")}
+    return grades
 
+
+def _has_grades(text, item_ids):
+    try:
+        return len(parse_grades_json(text, item_ids)) == len(item_ids)
+    except ValueError:
+        return False
+
+
+def _batch_prompt(chunk):
+    items_text = "\n\n".join(
+        f"[item_id: {item_id}]\n"
+        f"Question:\n{item['question']}\n"
+        f"Correct Answer:\n{item['correct_answer']}\n"
+        f"Student Answer:\n{item['user_answer']}"
+        for item_id, item in chunk
+    )
+
+    return f"""
+You are an expert quiz evaluator.
+
+Your job is to correctly evaluate each student's submitted answer to its question
+using your own general knowledge base and logical reasoning.
+Every item is independent: grade it only against its own question and correct answer.
+
+Important rules:
+- Do NOT hallucinate facts.
+- Do NOT assume missing information.
+- The answer must be factually correct.
+- Do NOT reward answers that repeat or paraphrase the question.
+- Do NOT reward vague, circular, or keyword-stuffed answers.
+- Partial correctness should receive partial credit.
+- Use general knowledge only, NOT the source document.
+- Ignore grammar and wording style.
+
+ITEMS:
+{items_text}
+
+Return ONLY valid JSON in this exact format, with one entry per item_id:
+{{
+  "grades": [
+    {{
+      "item_id": "S1",
+      "verdict": "CORRECT | PARTIALLY_CORRECT | INCORRECT",
+      "score": 0.0 to 10.0,
+      "reason": "one short sentence explaining why"
+    }}
+  ]
+}}
+"""
+
+
+async def _agrade_chunk(chunk, lane, timeout):
+    """Grade up to SAQ_GRADING_BATCH_SIZE items in one call → {item_id: grade}."""
+    item_ids = {item_id for item_id, _ in chunk}
+    try:
+        raw = await achat_completion(
+            [{"role": "user", "content": _batch_prompt(chunk)}],
+            model="llama-3.1-8b-instant",
+            temperature=0,
+            max_tokens=grading_budget(len(chunk)),
+            lane=lane,
+            cache_site="saq_grading",
+            validate=lambda text: _has_grades(text, item_ids),
+            response_format={"type": "json_object"},
+            timeout=timeout
+        )
+        return parse_grades_json(raw, item_ids)
     except Exception as e:
-        # Safe fallback
-        return {
-            "is_correct": False,
-            "score": 0.0,
-            "verdict": "INCORRECT",
-            "reason": f"Evaluation error: {str(e)}"
+        print(f"⚠️ Batch grading failed for {len(chunk)} answer(s): {e}")
+        return {}
+
+
+async def aevaluate_saq_batch(items, lane=INTERACTIVE, batch_size=None, concurrency=None, timeout=None):
+    """
+    Evaluate many short answers concurrently.
+
+    `items` is a list of {"question", "correct_answer", "user_answer"} dicts,
+    possibly from several quizzes. Returns one result per item, in order,
+    shaped like evaluate_saq's. Answers are sent `batch_size` per call; items
+    whose grade is missing or malformed in a batch response are re-graded one
+    by one. At most `concurrency` calls are in flight, each attempt bounded
+    by `timeout` seconds. Items may carry a precomputed "reference_embedding";
+    answers already in the grading memo or settled by the similarity
+    pre-grader never reach the LLM.
+    """
+    batch_size = batch_size or SAQ_GRADING_BATCH_SIZE
+    timeout = timeout or SAQ_GRADING_TIMEOUT
+    semaphore = asyncio.Semaphore(concurrency or SAQ_GRADING_CONCURRENCY)
+    results = [None] * len(items)
+    pending = []
+
+    for idx, item in enumerate(items):
+        rejection_reason = quick_reject(item.get("user_answer") or "", item.get("question") or "")
+        if rejection_reason:
+            results[idx] = _rejected(rejection_reason)
+        else:
+            pending.append(idx)
+
+    # Same question, reference and (normalized) answer graded before → reuse it
+    memo_keys = {}
+    if GRADING_MEMO_ENABLED and pending:
+        memo_keys = {
+            idx: memo_key(items[idx]["question"], items[idx]["correct_answer"], items[idx]["user_answer"])
+            for idx in pending
         }
+        memo = get_grading_memo()
+        stored = memo.get_many(memo_keys.values())
+        for idx in pending:
+            grade = stored.get(memo_keys[idx])
+            if grade:
+                results[idx] = {**_grade_result(grade), "graded_by": GRADED_BY_MEMO}
+        if stored:
+            print(f"📒 {sum(1 for idx in pending if results[idx])} SAQ answer(s) found in the grading memo")
+        pending = [idx for idx in pending if results[idx] is None]
+
+    # Clear matches / clear misses are decided locally (CPU-bound → worker thread)
+    local_grades = await asyncio.to_thread(pre_grade, [items[idx] for idx in pending])
+    for idx, grade in zip(pending, local_grades):
+        results[idx] = grade
+    if any(local_grades):
+        print(f"⚡ {sum(1 for g in local_grades if g)} SAQ answer(s) settled by similarity")
+    pending = [idx for idx in pending if results[idx] is None]
+
+    async def grade_one(idx):
+        item = items[idx]
+        async with semaphore:
+            results[idx] = await aevaluate_saq(
+                user_answer=item["user_answer"],
+                correct_answer=item["correct_answer"],
+                question=item["question"],
+                lane=lane,
+                timeout=timeout
+            )
+
+    async def grade_chunk(chunk):
+        async with semaphore:
+            grades = await _agrade_chunk([(item_id, items[idx]) for item_id, idx in chunk], lane, timeout)
+        retry = []
+        for item_id, idx in chunk:
+            if item_id in grades:
+                results[idx] = _grade_result(grades[item_id])
+            else:
+                retry.append(idx)
+        if retry:
+            print(f"🔁 Re-grading {len(retry)} answer(s) individually")
+            await asyncio.gather(*(grade_one(idx) for idx in retry))
+
+    if batch_size <= 1:
+        if pending:
+            print(f"📝 Grading {len(pending)} SAQ answer(s) concurrently")
+        await asyncio.gather(*(grade_one(idx) for idx in pending))
+    else:
+        chunks = [
+            [(f"S{n}", idx) for n, idx in enumerate(pending[i:i + batch_size], 1)]
+            for i in range(0, len(pending), batch_size)
+        ]
+        if chunks:
+            print(f"📝 Grading {len(pending)} SAQ answer(s) in {len(chunks)} batch call(s)")
+        await asyncio.gather(*(grade_chunk(chunk) for chunk in chunks))
+
+    if memo_keys:
+        memo.set_many({
+            memo_keys[idx]: results[idx]
+            for idx in pending
+            if not results[idx]["reason"].startswith(EVALUATION_ERROR)
+        })
+
+    return results
+
+
+def evaluate_saq_batch(items, lane=INTERACTIVE, batch_size=None, concurrency=None, timeout=None):
+    """Sync wrapper around aevaluate_saq_batch for Flask routes and scheduler jobs."""
+    if not items:
+        return []
+    return run_sync(aevaluate_saq_batch(items, lane=lane, batch_size=batch_size,
+                                        concurrency=concurrency, timeout=timeout))
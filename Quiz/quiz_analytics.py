@@ -0,0 +1,79 @@
+# quiz_analytics.py
+# Per-quiz analytics from the attempt store rollups: question difficulty,
+# SAQ score distributions, verdict mixes and per-cluster correctness.
+# Reads only aggregate rows, so cost does not grow with the number of attempts.
+import os
+from collections import defaultdict
+from dotenv import load_dotenv
+
+from Quiz.attempt_store import get_attempt_store
+from Quiz.saving_quiz import load_quiz_with_index
+
+load_dotenv()
+
+# Questions with fewer graded answers get no difficulty label
+ANALYTICS_MIN_ANSWERS = int(os.getenv("ANALYTICS_MIN_ANSWERS", "5"))
+TOO_EASY_RATE = 0.9
+TOO_HARD_RATE = 0.3
+
+
+def difficulty(correct, answered):
+    if answered < ANALYTICS_MIN_ANSWERS:
+        return None
+    rate = correct / answered
+    if rate >= TOO_EASY_RATE:
+        return "too_easy"
+    if rate <= TOO_HARD_RATE:
+        return "too_hard"
+    return "ok"
+
+
+def _rate(correct, answered):
+    return round(correct / answered, 4) if answered else None
+
+
+def quiz_analytics(quiz_key):
+    """Analytics for one quiz, or None if it has no stored attempts."""
+    store = get_attempt_store()
+    summary = store.quiz_rollup(quiz_key)
+    if summary is None:
+        return None
+
+    # Question text and source cluster come from the (cached) quiz file
+    loaded = load_quiz_with_index(quiz_key)
+    questions_by_id = loaded[1] if loaded else {}
+    order = {qid: position for position, qid in enumerate(questions_by_id)}
+
+    questions = store.question_rollups(quiz_key)
+    questions.sort(key=lambda q: (order.get(q["question_id"], len(order)), q["question_id"]))
+
+    clusters = defaultdict(lambda: {"questions": 0, "answered": 0, "correct": 0, "mcq_answered": 0, "mcq_correct": 0})
+    for q in questions:
+        meta = questions_by_id.get(q["question_id"], {})
+        q["question"] = meta.get("question")
+        q["source_cluster"] = meta.get("source_cluster")
+        q["source_pdf"] = meta.get("source_pdf")
+        q["difficulty"] = difficulty(q["correct"], q["answered"])
+
+        cluster = clusters[q["source_cluster"] or "unknown"]
+        cluster["questions"] += 1
+        cluster["answered"] += q["answered"]
+        cluster["correct"] += q["correct"]
+        if q["type"] == "MCQ":
+            cluster["mcq_answered"] += q["answered"]
+            cluster["mcq_correct"] += q["correct"]
+
+    return {
+        **summary,
+        "questions": questions,
+        "clusters": [
+            {
+                "source_cluster": name,
+                "questions": c["questions"],
+                "answered": c["answered"],
+                "correct_rate": _rate(c["correct"], c["answered"]),
+                "mcq_correct_rate": _rate(c["mcq_correct"], c["mcq_answered"]),
+            }
+            for name, c in sorted(clusters.items())
+        ],
+    }
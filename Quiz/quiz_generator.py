@@ -1,72 +1,53 @@
 # quiz_generator.py (CLUSTER-BASED VERSION - NO MIXING)
 import os
-from groq import Groq
 from dotenv import load_dotenv
+from groq import APIStatusError
 import random
 import textwrap
 from collections import defaultdict
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # ----------------------------
 # Correct import path
 # ----------------------------
 #sys.path.append(r"C:\BLS\EvalAI8\Cluster")
 from Cluster.cluster import get_clusters
-from Quiz.saving_quiz import parse_quiz, save_quiz, load_existing_quiz
+from Quiz.saving_quiz import parse_quiz, parse_quiz_json, save_quiz, load_existing_quiz
+from LLM.gateway import complete, INTERACTIVE
+from LLM.tokens import TokenUsage, completion_budget
 
 # ----------------------------
-# Load API Key
+# Load environment (GROQ_API_KEY is checked by the LLM gateway on first call)
 # ----------------------------
 load_dotenv()
-API_KEY = os.getenv("GROQ_API_KEY")
-if API_KEY is None:
-    raise ValueError("GROQ_API_KEY environment variable not set")
 
-client = Groq(api_key=API_KEY)
+# Clusters generated in parallel; pacing is left to the LLM gateway
+GENERATION_CONCURRENCY = int(os.getenv("QUIZ_GENERATION_CONCURRENCY", "4"))
+
+# "json": one structured call per cluster (or pack of small clusters)
+# "text": legacy two calls per cluster (SAQ + MCQ), regex-parsed
+GENERATION_MODE = os.getenv("QUIZ_GENERATION_MODE", "json")
+
+# Clusters asking for this many questions or fewer are packed together
+SMALL_CLUSTER_QUESTIONS = int(os.getenv("QUIZ_SMALL_CLUSTER_QUESTIONS", "4"))
+CLUSTERS_PER_REQUEST = int(os.getenv("QUIZ_CLUSTERS_PER_REQUEST", "3"))
+
+# Share of each quiz that is SAQs; the rest are MCQs
+SAQ_RATIO = 0.7
+
+QUIZ_MODEL = "llama-3.1-8b-instant"
+# Bump when prompts or parsing change so cached quizzes are regenerated
+QUIZ_PROMPT_VERSION = "3"
 
-# ============================================================
-# API Call with Retry Logic
-# ============================================================
-def call_groq_with_retry(prompt, model="llama-3.1-8b-instant", temperature=0.3, max_tokens=2500, max_retries=3):
-    """
-    Make Groq API call with exponential backoff retry logic.
-    Handles rate limits and transient errors.
-    """
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            error_msg = str(e)
-            
-            # Check if it's a rate limit error
-            if "rate" in error_msg.lower() or "429" in error_msg:
-                wait_time = (2 ** attempt) * 2  # Exponential backoff: 2s, 4s, 8s
-                print(f"⚠️ Rate limit hit. Waiting {wait_time}s before retry {attempt + 1}/{max_retries}...")
-                time.sleep(wait_time)
-                
-            # Check if it's an auth error
-            elif "401" in error_msg or "invalid" in error_msg.lower():
-                print(f"❌ Authentication error: {error_msg}")
-                raise  # Don't retry auth errors
-                
-            # Other errors
-            else:
-                if attempt < max_retries - 1:
-                    wait_time = 2 ** attempt
-                    print(f"⚠️ API error: {error_msg}. Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    print(f"❌ Failed after {max_retries} attempts: {error_msg}")
-                    raise
-    
-    raise Exception(f"Failed to complete API call after {max_retries} retries")
+
+def generation_params(max_questions):
+    """Everything besides the PDFs' content that changes the generated quiz (part of its cache key)."""
+    return {
+        "max_questions": max_questions,
+        "model": QUIZ_MODEL,
+        "prompt_version": QUIZ_PROMPT_VERSION,
+        "mode": GENERATION_MODE,
+    }
 
 # ============================================================
 # 🔥 NEW: Format Single Cluster for Prompt
@@ -83,12 +64,12 @@ def format_cluster_for_prompt(theme: str, keywords: list, pdf_name: str) -> str:
 # ============================================================
 # 🔥 NEW: Generate Questions from Single Cluster
 # ============================================================
-def generate_questions_from_cluster(cluster_info: dict, num_saq: int, num_mcq: int):
-    print(f" generate_questions_from_cluster  Asad  23/01/26  ➡ Generating {num_saq} SAQs and {num_mcq} MCQs ")
+def generate_questions_from_cluster(cluster_info: dict, num_saq: int, num_mcq: int, lane=INTERACTIVE, usage=None):
     """
     Generate questions from a SINGLE cluster only.
     No mixing with other clusters.
     """
+    print(f" generate_questions_from_cluster  ➡ Generating {num_saq} SAQs and {num_mcq} MCQs ")
     theme = cluster_info['theme']
     keywords = cluster_info['keywords']
     pdf_name = cluster_info['pdf_name']
@@ -140,12 +121,14 @@ Explanation: <Short explanation>
 """
         
         print(f"    🤖 Generating {num_saq} SAQs from cluster '{theme}'...")
-        saq_text = call_groq_with_retry(
-            prompt=saq_prompt,
-            model="llama-3.1-8b-instant",
+        saq_text = complete(
+            saq_prompt,
+            model=QUIZ_MODEL,
             temperature=0.3,
-            max_tokens=2000,
-            max_retries=3
+            max_tokens=completion_budget(num_saq, 0),
+            lane=lane,
+            cache_site="quiz_generation",
+            usage=usage
         )
         
         saq_list = parse_quiz(saq_text)
@@ -154,10 +137,6 @@ Explanation: <Short explanation>
             q["source_cluster"] = theme
             q["source_pdf"] = pdf_name
     
-    # Small delay between calls
-    if num_saq > 0 and num_mcq > 0:
-        time.sleep(1)
-    
     # Generate MCQs if needed
     mcq_list = []
     if num_mcq > 0:
@@ -200,12 +179,14 @@ Q2. ...
 """
         
         print(f"    🤖 Generating {num_mcq} MCQs from cluster '{theme}'...")
-        mcq_text = call_groq_with_retry(
-            prompt=mcq_prompt,
-            model="llama-3.1-8b-instant",
+        mcq_text = complete(
+            mcq_prompt,
+            model=QUIZ_MODEL,
             temperature=0.2,
-            max_tokens=2000,
-            max_retries=3
+            max_tokens=completion_budget(0, num_mcq),
+            lane=lane,
+            cache_site="quiz_generation",
+            usage=usage
         )
         
         mcq_list = parse_quiz(mcq_text)
@@ -216,6 +197,146 @@ Q2. ...
     
     return saq_list + mcq_list
 
+# ============================================================
+# Structured Generation: SAQs + MCQs in One JSON Call
+# ============================================================
+def generate_questions_from_clusters_json(batch, lane=INTERACTIVE, usage=None):
+    """
+    Generate SAQs and MCQs for one or more clusters in a single JSON-mode call.
+    Each cluster is labelled with its own id and its questions are kept separate.
+
+    `batch` is a list of distribution entries ({'cluster_info', 'num_saq', 'num_mcq'}).
+    Returns one question list per entry, in the same order.
+    """
+    cluster_limits = {}
+    cluster_blocks = []
+    for i, d in enumerate(batch, 1):
+        cluster_id = f"C{i}"
+        info = d['cluster_info']
+        cluster_limits[cluster_id] = (d['num_saq'], d['num_mcq'])
+        cluster_blocks.append(
+            f"[cluster_id: {cluster_id}] SAQs: up to {d['num_saq']} | MCQs: up to {d['num_mcq']}\n"
+            + format_cluster_for_prompt(info['theme'], info['keywords'], info['pdf_name'])
+        )
+    clusters_text = "\n\n".join(cluster_blocks)
+
+    prompt = f"""
+You are a highly skilled Quiz Generation expert with strong domain knowledge.
+
+Your task is to generate Short Answer Questions (SAQs) and Multiple Choice Questions (MCQs)
+for each cluster listed below. Every cluster is independent.
+
+🚨 CRITICAL REQUIREMENTS:
+- Generate each cluster's questions ONLY from that cluster's keywords and topic
+- Do NOT mix information between clusters, topics or documents
+- Use the keywords ONLY to identify the topic
+- Do not use keywords or pdf as single source of truth
+- Use you own verified knowledge base to generate high-quality questions from the keywords
+- If a keyword seems ambiguous, poorly defined, illogical or incorrect, then do NOT use it to generate questions
+- Each question must be distinct and test different aspects
+- Never generate more SAQs or MCQs for a cluster than its limit; if there is not enough information, generate fewer
+- Do not use keywords in the question, answer or options directly
+
+QUESTION QUALITY RULES:
+- Questions must test conceptual understanding and real-world knowledge
+- Avoid trivial or purely definitional questions
+- Questions should be appropriate for the topic complexity
+
+SAQ RULES:
+- Answers must be factually correct and concise (1–2 lines)
+- Provide a short explanation
+
+MCQ CONSTRAINTS:
+1. Each MCQ should have exactly 4 options (A, B, C, D)
+2. Each MCQ MUST have EXACTLY ONE correct option
+3. The correct option must be fully correct and unambiguous and remaining all 3 options should be clearly incorrect. (Critical)
+4. All incorrect options must be clearly wrong and must not be partially correct or acceptable under any circumstances. (Very Important for every mcq)
+5. Provide a concise explanation
+
+CLUSTERS:
+{clusters_text}
+
+OUTPUT FORMAT (STRICT JSON, no markdown, one entry per cluster_id):
+{{
+  "clusters": [
+    {{
+      "cluster_id": "C1",
+      "saqs": [{{"question": "...", "answer": "...", "explanation": "..."}}],
+      "mcqs": [{{"question": "...", "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}}, "correct_answer": "A", "explanation": "..."}}]
+    }}
+  ]
+}}
+"""
+
+    themes = ", ".join(d['cluster_info']['theme'] for d in batch)
+    print(f"    🤖 Generating SAQs + MCQs for {len(batch)} cluster(s) in one call: {themes}")
+    raw = complete(
+        prompt,
+        model=QUIZ_MODEL,
+        temperature=0.3,
+        max_tokens=completion_budget(
+            sum(d['num_saq'] for d in batch), sum(d['num_mcq'] for d in batch), structured=True
+        ),
+        lane=lane,
+        cache_site="quiz_generation",
+        usage=usage,
+        validate=lambda text: _is_structured_quiz(text, cluster_limits),
+        response_format={"type": "json_object"}
+    )
+
+    per_cluster = parse_quiz_json(raw, cluster_limits)
+
+    results = []
+    for i, d in enumerate(batch, 1):
+        info = d['cluster_info']
+        questions = per_cluster[f"C{i}"]
+        for q in questions:
+            q["source_cluster"] = info['theme']
+            q["source_pdf"] = info['pdf_name']
+        results.append(questions)
+    return results
+
+
+def _is_structured_quiz(text, cluster_limits):
+    try:
+        parse_quiz_json(text, cluster_limits)
+        return True
+    except (ValueError, TypeError, AttributeError):
+        return False
+
+
+def _structured_output_failed(error):
+    """True for errors that mean JSON mode did not produce a usable quiz (worth the text fallback)."""
+    if isinstance(error, (ValueError, TypeError, AttributeError)):
+        return True
+    # Groq rejects JSON-mode output it cannot validate with a 400 (json_validate_failed)
+    return isinstance(error, APIStatusError) and error.status_code == 400
+
+
+def plan_generation_batches(jobs):
+    """
+    Group (idx, distribution) jobs into LLM requests.
+    Small clusters are packed up to CLUSTERS_PER_REQUEST per request; larger
+    clusters get a request of their own. Order within the plan is preserved.
+    """
+    if GENERATION_MODE != "json":
+        return [[job] for job in jobs]
+
+    batches = []
+    pending_small = []
+    for job in jobs:
+        d = job[1]
+        if d['num_saq'] + d['num_mcq'] <= SMALL_CLUSTER_QUESTIONS:
+            pending_small.append(job)
+            if len(pending_small) == CLUSTERS_PER_REQUEST:
+                batches.append(pending_small)
+                pending_small = []
+        else:
+            batches.append([job])
+    if pending_small:
+        batches.append(pending_small)
+    return batches
+
 # ============================================================
 # Clean & Validate Parsed Questions
 # ============================================================
@@ -268,63 +389,95 @@ def clean_parsed_questions(questions):
 # ============================================================
 # 🔥 NEW: Distribute Questions Across Clusters
 # ============================================================
+def _largest_remainder(total, weights, caps=None):
+    """
+    Split `total` into integers proportional to `weights` (Hamilton method).
+    Floors first, then hands the leftover units to the largest fractional parts.
+    `caps` bounds each share; units a capped share cannot take go to the others.
+    """
+    shares = [0] * len(weights)
+    caps = caps or [None] * len(weights)
+    remaining = total
+    open_idx = [i for i, w in enumerate(weights) if w > 0 and caps[i] != 0]
+
+    while remaining > 0 and open_idx:
+        weight_sum = sum(weights[i] for i in open_idx)
+        quotas = {i: remaining * weights[i] / weight_sum for i in open_idx}
+        floors = {i: int(quotas[i]) for i in open_idx}
+        leftover = remaining - sum(floors.values())
+        for i in sorted(open_idx, key=lambda i: quotas[i] - floors[i], reverse=True)[:leftover]:
+            floors[i] += 1
+
+        for i in open_idx:
+            room = floors[i] if caps[i] is None else min(floors[i], caps[i] - shares[i])
+            shares[i] += room
+            remaining -= room
+        open_idx = [i for i in open_idx if caps[i] is None or shares[i] < caps[i]]
+
+    return shares
+
+
 def distribute_questions_across_clusters(all_clusters_info, max_questions, min_per_cluster=2, max_per_cluster=None):
     """
-    Distribute questions more fairly across clusters.
-    - Ensures each cluster gets at least `min_per_cluster` questions.
-    - Caps dominant clusters if `max_per_cluster` is set.
+    Plan exactly `max_questions` questions across clusters.
+    - Clusters too small to earn a question on their keyword share are dropped.
+    - Each kept cluster gets at least `min_per_cluster` questions; if there are more
+      clusters than the budget allows, only the largest are kept.
+    - Shares are rounded with the largest-remainder method, so the plan sums to
+      `max_questions` (unless `max_per_cluster` caps every cluster first).
+    - SAQs are exactly int(max_questions * SAQ_RATIO) overall, MCQs the rest.
+    Only clusters that receive questions are returned.
     """
-    total_keywords = sum(len(c['keywords']) for c in all_clusters_info)
-    if total_keywords == 0 or len(all_clusters_info) == 0:
+    clusters = [c for c in all_clusters_info if c['keywords']]
+    if max_questions <= 0 or not clusters:
         return []
 
-    # Step 1: initial proportional allocation
-    distribution = []
-    total_saq = int(max_questions * 0.7)
-    total_mcq = max_questions - total_saq
-
-    for c in all_clusters_info:
-        weight = len(c['keywords']) / total_keywords
-        saq_for_cluster = max(min_per_cluster, round(total_saq * weight))
-        mcq_for_cluster = max(0, round(total_mcq * weight))
-
-        # Apply max cap if needed
-        if max_per_cluster:
-            saq_for_cluster = min(saq_for_cluster, max_per_cluster)
-            mcq_for_cluster = min(mcq_for_cluster, max_per_cluster)
-
-        distribution.append({
-            'cluster_info': c,
-            'num_saq': saq_for_cluster,
-            'num_mcq': mcq_for_cluster
-        })
-
-    # Step 2: Adjust if we allocated too many questions
-    total_allocated = sum(d['num_saq'] + d['num_mcq'] for d in distribution)
-    remaining = max_questions - total_allocated
-
-    if remaining > 0:
-        # Round-robin distribute leftover questions to clusters
-        idx = 0
-        while remaining > 0:
-            d = distribution[idx % len(distribution)]
-            d['num_saq'] += 1
-            remaining -= 1
-            idx += 1
-
-    elif remaining < 0:
-        # Scale down proportionally
-        scale = max_questions / total_allocated
-        for d in distribution:
-            d['num_saq'] = max(min_per_cluster, round(d['num_saq'] * scale))
-            d['num_mcq'] = max(0, round(d['num_mcq'] * scale))
-
-    return distribution
+    min_per_cluster = max(1, min(min_per_cluster, max_questions))
+    total_keywords = sum(len(c['keywords']) for c in clusters)
+
+    # Step 1: keep the clusters that can carry their own share of the quiz
+    ranked = sorted(clusters, key=lambda c: len(c['keywords']), reverse=True)
+    kept = [c for c in ranked if max_questions * len(c['keywords']) / total_keywords >= 1] or ranked[:1]
+    kept = kept[:max(1, max_questions // min_per_cluster)]
+    if len(kept) < len(clusters):
+        print(f"  ✂️ Dropping {len(clusters) - len(kept)} small cluster(s) to stay within {max_questions} questions")
+    # Back to the original cluster order
+    kept = [c for c in clusters if any(c is k for k in kept)]
+
+    # Step 2: per-cluster totals = minimum + largest-remainder share of the rest
+    floor = min_per_cluster if max_per_cluster is None else min(min_per_cluster, max_per_cluster)
+    weights = [len(c['keywords']) for c in kept]
+    caps = None if max_per_cluster is None else [max_per_cluster - floor] * len(kept)
+    extra = _largest_remainder(max_questions - floor * len(kept), weights, caps)
+    totals = [floor + e for e in extra]
+
+    # Step 3: split the SAQ budget across clusters in proportion to their totals
+    total_saq = min(int(max_questions * SAQ_RATIO), sum(totals))
+    saqs = _largest_remainder(total_saq, totals, caps=totals)
+
+    return [
+        {'cluster_info': c, 'num_saq': saq, 'num_mcq': total - saq}
+        for c, total, saq in zip(kept, totals, saqs)
+    ]
 
 # ============================================================
 # 🔥 NEW: Full PDF → Quiz Pipeline (Cluster-Based)
 # ============================================================
-def generate_quiz_from_pdf(pdf_path, max_questions=20, save=True):
+def generate_quiz_from_pdf(pdf_path, max_questions=20, save=True, lane=INTERACTIVE):
+    for event in iter_quiz_generation(pdf_path, max_questions=max_questions, save=save, lane=lane):
+        if event["event"] == "done":
+            return event["result"]
+
+
+def iter_quiz_generation(pdf_path, max_questions=20, save=True, lane=INTERACTIVE):
+    """
+    Run the PDF → quiz pipeline, yielding progress events as it goes:
+
+        {"event": "progress", "stage": ...}       extraction / clustering / distribution / generation
+        {"event": "questions", "questions": [..]} one cleaned cluster batch, ids already assigned
+        {"event": "done", "result": {...}}       final (shuffled) quiz, same shape as generate_quiz_from_pdf,
+                                                  plus "token_usage" for the LLM calls this run made
+    """
     # ----------------------------------
     # Normalize input
     # ----------------------------------
@@ -337,10 +490,14 @@ def generate_quiz_from_pdf(pdf_path, max_questions=20, save=True):
         print(f"  {i}. {os.path.basename(p)}")
 
     # Check cache
-    existing = load_existing_quiz(pdf_paths)
+    params = generation_params(max_questions)
+    existing = load_existing_quiz(pdf_paths, params)
     if existing is not None:
         print("✅ Using cached quiz")
-        return existing
+        yield {"event": "progress", "stage": "cache_hit"}
+        yield {"event": "questions", "questions": existing.get("quiz", [])}
+        yield {"event": "done", "result": existing}
+        return
 
     # ----------------------------------
     # Step 1: Extract Clusters from Each PDF
@@ -352,6 +509,7 @@ def generate_quiz_from_pdf(pdf_path, max_questions=20, save=True):
     for idx, path in enumerate(pdf_paths, 1):
         pdf_name = os.path.basename(path).replace('.pdf', '')
         print(f"\n  Processing PDF {idx}/{num_pdfs}: {pdf_name}")
+        yield {"event": "progress", "stage": "extraction", "pdf": pdf_name, "index": idx, "total": num_pdfs}
         
         clusters = get_clusters(path)
         per_pdf_clusters[path] = clusters
@@ -368,6 +526,7 @@ def generate_quiz_from_pdf(pdf_path, max_questions=20, save=True):
     
     total_clusters = len(all_clusters_info)
     print(f"\n  📊 Total clusters across all PDFs: {total_clusters}")
+    yield {"event": "progress", "stage": "clustering", "clusters": total_clusters}
 
     # ----------------------------------
     # Step 2: Distribute Questions Across Clusters
@@ -379,35 +538,78 @@ def generate_quiz_from_pdf(pdf_path, max_questions=20, save=True):
     for d in question_distribution:
         cluster = d['cluster_info']
         print(f"  • {cluster['pdf_name']} - {cluster['theme']}: {d['num_saq']} SAQs, {d['num_mcq']} MCQs")
+    yield {
+        "event": "progress",
+        "stage": "distribution",
+        "planned_questions": sum(d['num_saq'] + d['num_mcq'] for d in question_distribution)
+    }
 
     # ----------------------------------
     # Step 3: Generate Questions Per Cluster
     # ----------------------------------
     print(f"\n🎯 Step 3: Generating questions from each cluster independently...")
-    
+    usage = TokenUsage(label=", ".join(os.path.basename(p) for p in pdf_paths))
+
+    def generate_for_batch(batch):
+        for idx, d in batch:
+            cluster_info = d['cluster_info']
+            print(f"\n  [{idx}/{len(question_distribution)}] Cluster: {cluster_info['theme']} ({cluster_info['pdf_name']})")
+
+        entries = [d for _, d in batch]
+        if GENERATION_MODE == "json":
+            try:
+                per_cluster = generate_questions_from_clusters_json(entries, lane=lane, usage=usage)
+            except Exception as e:
+                # Unusable structured output → fall back to the two-prompt text path
+                if not _structured_output_failed(e):
+                    raise
+                print(f"    ⚠️ Structured output invalid ({e}); falling back to text generation")
+                per_cluster = [
+                    generate_questions_from_cluster(d['cluster_info'], d['num_saq'], d['num_mcq'], lane=lane, usage=usage)
+                    for d in entries
+                ]
+        else:
+            per_cluster = [
+                generate_questions_from_cluster(d['cluster_info'], d['num_saq'], d['num_mcq'], lane=lane, usage=usage)
+                for d in entries
+            ]
+
+        cleaned = []
+        for (idx, d), questions in zip(batch, per_cluster):
+            questions = clean_parsed_questions(questions)
+            print(f"    ✓ Generated {len(questions)} valid questions for '{d['cluster_info']['theme']}'")
+            cleaned.append((idx, questions))
+        return cleaned
+
+    # Requests run concurrently; the LLM gateway paces the Groq calls
+    jobs = [
+        (idx, d) for idx, d in enumerate(question_distribution, 1)
+        if d['num_saq'] > 0 or d['num_mcq'] > 0
+    ]
+    batches = plan_generation_batches(jobs)
     all_questions = []
-    
-    for idx, d in enumerate(question_distribution, 1):
-        cluster_info = d['cluster_info']
-        num_saq = d['num_saq']
-        num_mcq = d['num_mcq']
 
-        print("nahi    ja  rhy  ",num_saq,num_mcq)
-        
-        if num_saq == 0 and num_mcq == 0:
-            continue
-        
-        print(f"\n  [{idx}/{len(question_distribution)}] Cluster: {cluster_info['theme']} ({cluster_info['pdf_name']})")
-        
-        questions = generate_questions_from_cluster(cluster_info, num_saq, num_mcq)
-        questions = clean_parsed_questions(questions)
-        
-        print(f"    ✓ Generated {len(questions)} valid questions")
-        all_questions.extend(questions)
-        
-        # Delay between clusters to avoid rate limits
-        if idx < len(question_distribution):
-            time.sleep(1.5)
+    if batches:
+        print(f"  {len(jobs)} cluster(s) → {len(batches)} LLM request(s) ({GENERATION_MODE} mode)")
+        yield {"event": "progress", "stage": "generation", "clusters": len(jobs), "requests": len(batches)}
+
+        results = {}
+        next_id = 0
+        with ThreadPoolExecutor(max_workers=min(GENERATION_CONCURRENCY, len(batches))) as executor:
+            futures = [executor.submit(generate_for_batch, batch) for batch in batches]
+            # Emit each batch as soon as it is validated; ids follow emission order
+            for future in as_completed(futures):
+                for idx, questions in future.result():
+                    for q in questions:
+                        q["id"] = f"q_{next_id}"
+                        next_id += 1
+                    results[idx] = questions
+                    if questions:
+                        yield {"event": "questions", "questions": questions}
+
+        # Merge in distribution order so the pre-shuffle list is deterministic
+        for idx, _ in jobs:
+            all_questions.extend(results[idx])
     
     # ----------------------------------
     # Step 4: Shuffle and Finalize
@@ -427,6 +629,10 @@ def generate_quiz_from_pdf(pdf_path, max_questions=20, save=True):
     print(f"  • Total Questions: {len(all_questions)}")
     print(f"  • SAQs: {saq_count}")
     print(f"  • MCQs: {mcq_count}")
+
+    token_usage = usage.summary()
+    print(f"  • LLM tokens: {token_usage['prompt_tokens']} prompt + {token_usage['completion_tokens']} completion "
+          f"over {token_usage['calls']} call(s) ({token_usage['cached_calls']} cached)")
     
     # Show distribution by PDF
     pdf_distribution = defaultdict(int)
@@ -442,12 +648,16 @@ def generate_quiz_from_pdf(pdf_path, max_questions=20, save=True):
     # ----------------------------------
     if save:
         print("\n💾 Step 5: Saving quiz...")
-        save_quiz(pdf_paths, all_questions)
-
-    return {
-        "pdf_path": pdf_paths,
-        "clusters": per_pdf_clusters,
-        "quiz": all_questions
+        save_quiz(pdf_paths, all_questions, params)
+
+    yield {
+        "event": "done",
+        "result": {
+            "pdf_path": pdf_paths,
+            "clusters": per_pdf_clusters,
+            "quiz": all_questions
+        },
+        "token_usage": token_usage
     }
 
 
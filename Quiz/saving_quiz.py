@@ -1,15 +1,25 @@
 # saving_quiz.py
 import os
 import re
+import glob
 import json
 import hashlib
 import datetime
+import threading
+from collections import OrderedDict
+from Quiz.persistence import file_lock, read_json, write_json
+from Quiz.attempt_store import ATTEMPT_STORE_ENABLED, get_attempt_store
 # ----------------------------
 # Ensure quizzes folder exists
 # ----------------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 QUIZZES_FOLDER =  os.path.join(BASE_DIR, "quizzes")
 USER_ATTEMPTS_FOLDER =  os.path.join(BASE_DIR, "user_quizzes")
+# Attempts also go to the SQLite attempt store; USER_ATTEMPT_FILES=0 skips the per-attempt JSON file
+USER_ATTEMPT_FILES = os.getenv("USER_ATTEMPT_FILES", "1") == "1"
+# Store attempt files as .json.gz (readers accept both)
+USER_ATTEMPT_GZIP = os.getenv("USER_ATTEMPT_GZIP", "0") == "1"
+ATTEMPT_SUFFIXES = (".json", ".json.gz")
 os.makedirs(QUIZZES_FOLDER, exist_ok=True)
 os.makedirs(USER_ATTEMPTS_FOLDER, exist_ok=True)
 
@@ -82,6 +92,102 @@ def parse_quiz(raw_text):
 
     return quiz_items
 
+# ============================================================
+# Structured (JSON) quiz output
+# ============================================================
+MCQ_OPTION_KEYS = ["A", "B", "C", "D"]
+
+
+def _clean_text(value):
+    return " ".join(str(value).split()) if value is not None else ""
+
+
+def _validate_saq_item(item):
+    if not isinstance(item, dict):
+        return None
+    question = _clean_text(item.get("question"))
+    answer = _clean_text(item.get("answer"))
+    if not question or not answer:
+        return None
+    return {
+        "question": question,
+        "answer": answer,
+        "explanation": _clean_text(item.get("explanation")),
+        "type": "SAQ"
+    }
+
+
+def _validate_mcq_item(item):
+    if not isinstance(item, dict):
+        return None
+    question = _clean_text(item.get("question"))
+    options = item.get("options")
+
+    # Accept ["..", "..", "..", ".."] as well as {"A": .., "B": ..}
+    if isinstance(options, list):
+        options = dict(zip(MCQ_OPTION_KEYS, options))
+    if not isinstance(options, dict):
+        return None
+    options = {str(k).strip().upper()[:1]: _clean_text(v) for k, v in options.items()}
+    if sorted(options) != MCQ_OPTION_KEYS or not all(options.values()):
+        return None
+
+    correct_answer = str(item.get("correct_answer", "")).strip().upper()[:1]
+    if not question or correct_answer not in MCQ_OPTION_KEYS:
+        return None
+
+    return {
+        "question": question,
+        "options": {k: options[k] for k in MCQ_OPTION_KEYS},
+        "correct_answer": correct_answer,
+        "explanation": _clean_text(item.get("explanation")),
+        "type": "MCQ"
+    }
+
+
+def parse_quiz_json(raw_text, cluster_limits):
+    """
+    Converts structured LLM output into per-cluster quiz items.
+
+    Expected shape:
+        {"clusters": [{"cluster_id": "C1",
+                       "saqs": [{"question", "answer", "explanation"}],
+                       "mcqs": [{"question", "options": {"A".."D"}, "correct_answer", "explanation"}]}]}
+
+    `cluster_limits` maps cluster_id → (num_saq, num_mcq); items beyond the
+    requested counts (across repeated entries for the same cluster_id) and
+    clusters that were not asked for are dropped.
+    Returns {cluster_id: [items]} with items shaped like `parse_quiz` output.
+    Raises ValueError if the payload is not valid JSON of that shape.
+    """
+    data = json.loads(raw_text)
+    if not isinstance(data, dict) or not isinstance(data.get("clusters"), list):
+        raise ValueError("Structured quiz output is missing a 'clusters' list")
+
+    result = {cluster_id: [] for cluster_id in cluster_limits}
+    # SAQ / MCQ slots still open per cluster; a cluster_id may appear more than once
+    remaining = {cluster_id: list(limits) for cluster_id, limits in cluster_limits.items()}
+
+    for cluster in data["clusters"]:
+        if not isinstance(cluster, dict):
+            continue
+        cluster_id = str(cluster.get("cluster_id", "")).strip()
+        if cluster_id not in cluster_limits:
+            continue
+        num_saq, num_mcq = remaining[cluster_id]
+
+        saqs = cluster.get("saqs") or []
+        mcqs = cluster.get("mcqs") or []
+        if not isinstance(saqs, list) or not isinstance(mcqs, list):
+            raise ValueError(f"Structured quiz output for {cluster_id} has non-list 'saqs'/'mcqs'")
+        saqs = [q for q in map(_validate_saq_item, saqs) if q]
+        mcqs = [q for q in map(_validate_mcq_item, mcqs) if q]
+        saqs, mcqs = saqs[:num_saq], mcqs[:num_mcq]
+        result[cluster_id].extend(saqs + mcqs)
+        remaining[cluster_id] = [num_saq - len(saqs), num_mcq - len(mcqs)]
+
+    return result
+
 # ============================================================
 # Helper to build safe PDF base name
 # ============================================================
@@ -116,27 +222,120 @@ def build_pdf_base_name(pdf_list):
     return "_".join(sorted(base_names))
 
 # ============================================================
-# Save or retrieve quiz from cache
+# Content-addressed quiz cache
 # ============================================================
-def save_quiz(pdf_paths, quiz_data):
+# Quizzes are keyed by the sorted SHA-256 of the PDFs' bytes plus the generation
+# parameters, so a renamed copy of a paper reuses its quiz and a changed file
+# with the same name does not. quizzes/index.json maps keys to quiz files.
+QUIZ_INDEX_FILE = "index.json"
+_QUIZ_KEY = re.compile(r"[0-9a-f]{64}")
+
+_hash_lock = threading.Lock()
+_file_hashes = {}   # (path, size, mtime_ns) → sha256
+
+
+def file_sha256(path):
+    """Content hash of a file, remembered while its size and mtime are unchanged."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        if memo_key in _file_hashes:
+            return _file_hashes[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    with _hash_lock:
+        _file_hashes[memo_key] = digest.hexdigest()
+    return _file_hashes[memo_key]
+
+
+def quiz_cache_key(pdf_paths, params=None):
+    """
+    Cache key for a quiz: sorted content hashes of the PDFs + generation
+    parameters (max_questions, model, prompt version, ...).
+    """
+    if isinstance(pdf_paths, str):
+        pdf_paths = [pdf_paths]
+    payload = {
+        "pdfs": sorted(file_sha256(p) for p in pdf_paths),
+        "params": params or {},
+    }
+    encoded = json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _index_path():
+    return os.path.join(QUIZZES_FOLDER, QUIZ_INDEX_FILE)
+
+
+def _read_index():
+    try:
+        return read_json(_index_path())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _add_to_index(quiz_key, entry):
+    # Caller holds file_lock(_index_path())
+    index = _read_index()
+    index[quiz_key] = entry
+    write_json(_index_path(), index)
+
+
+def _quiz_file_path(quiz_key):
+    return os.path.join(QUIZZES_FOLDER, f"{quiz_key}.json")
+
+
+def save_quiz(pdf_paths, quiz_data, params=None):
+    """Store a quiz under its content key. Returns the quiz file path."""
     os.makedirs(QUIZZES_FOLDER, exist_ok=True)
 
+    pdf_paths = [pdf_paths] if isinstance(pdf_paths, str) else list(pdf_paths)
+    quiz_key = quiz_cache_key(pdf_paths, params)
     quiz_base = build_pdf_base_name(pdf_paths)
-    quiz_file_path = os.path.join(QUIZZES_FOLDER, f"{quiz_base}.json")
+    quiz_file_path = _quiz_file_path(quiz_key)
 
-    # Cache check
+    # Cache check (again under the lock below: another worker may be saving it)
     if os.path.exists(quiz_file_path):
         print(f"⚠️ Quiz already exists: {quiz_file_path}")
         return quiz_file_path
 
     data = {
+        "quiz_key": quiz_key,
         "pdf_names": quiz_base,  # no .pdf, combined if multiple
+        "pdf_hashes": sorted(file_sha256(p) for p in pdf_paths),
+        "generation": params or {},
         "quiz": quiz_data,
         "created_at": datetime.datetime.now().isoformat()
     }
 
-    with open(quiz_file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    # Reference-answer embeddings for the similarity pre-grader, keyed by question id
+    from Quiz.answer_similarity import SAQ_SIMILARITY_ENABLED, reference_embeddings
+    if SAQ_SIMILARITY_ENABLED:
+        try:
+            data["reference_embeddings"] = reference_embeddings(quiz_data)
+        except Exception as e:
+            print(f"⚠️ Could not embed reference answers: {e}")
+
+    # One lock for the quiz folder: the existence check, quiz write and index
+    # update happen as a unit across worker processes
+    with file_lock(_index_path()):
+        if os.path.exists(quiz_file_path):
+            print(f"⚠️ Quiz already exists: {quiz_file_path}")
+            return quiz_file_path
+
+        write_json(quiz_file_path, data)
+        _cache_quiz(quiz_key, quiz_file_path, data)
+        _add_to_index(quiz_key, {
+            "file": os.path.basename(quiz_file_path),
+            "pdf_names": quiz_base,
+            "pdf_hashes": data["pdf_hashes"],
+            "generation": data["generation"],
+            "created_at": data["created_at"],
+        })
 
     print(f"✅ Quiz saved: {quiz_file_path}")
     return quiz_file_path
@@ -153,7 +352,7 @@ def save_user_attempt(user_id, pdf_paths, attempt_record):
     os.makedirs(USER_ATTEMPTS_FOLDER, exist_ok=True)
 
     quiz_base = build_pdf_base_name(pdf_paths)
-    filename = f"{quiz_base}_{user_id}.json"
+    filename = f"{quiz_base}_{user_id}{ATTEMPT_SUFFIXES[1] if USER_ATTEMPT_GZIP else ATTEMPT_SUFFIXES[0]}"
     filepath = os.path.join(USER_ATTEMPTS_FOLDER, filename)
 
     # Calculate detailed statistics
@@ -172,6 +371,7 @@ def save_user_attempt(user_id, pdf_paths, attempt_record):
 
     data = {
         "user_id": user_id,
+        "quiz_key": attempt_record.get("quiz_key"),
         "pdf_names": quiz_base,
         "attempted_at": str(datetime.datetime.now()),
         
@@ -187,37 +387,146 @@ def save_user_attempt(user_id, pdf_paths, attempt_record):
         
         # Full evaluated quiz with new LLM fields
         "evaluated_quiz": evaluated_quiz,
+
+        # "pending" while SAQs are still being graded in the background
+        "grading_status": attempt_record.get("grading_status", "complete"),
     }
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    if ATTEMPT_STORE_ENABLED:
+        get_attempt_store().record(data)
+    if USER_ATTEMPT_FILES:
+        # Whole-file replace: pending → graded rewrites never leave a torn file
+        write_json(filepath, data, compress=USER_ATTEMPT_GZIP)
 
-    print(f"✅ User attempt saved: {filepath}")
+    print(f"✅ User attempt saved: {filepath if USER_ATTEMPT_FILES else user_id}")
     print(f"   Score: {total_correct}/{total_questions} ({percentage:.1f}%)")
     print(f"   SAQ Average Score: {avg_saq_score:.1f}%")
 
     return {
         "status": "success",
-        "file_saved": filename,
+        # Without a file, the attempt's id in the attempt store
+        "file_saved": filename if USER_ATTEMPT_FILES else user_id,
         "score": f"{total_correct}/{total_questions}",
         "percentage": percentage,
         "saq_average": avg_saq_score
     }
 
-def load_existing_quiz(pdf_paths):
-    quiz_base = build_pdf_base_name(pdf_paths)
-    quiz_file_path = os.path.join(QUIZZES_FOLDER, f"{quiz_base}.json")
+# ============================================================
+# Parsed-quiz LRU
+# ============================================================
+# /submit_quiz/ hits the same few quizzes over and over; keep them parsed.
+# Entries are checked against the file's (mtime, size) on every hit and
+# refreshed by save_quiz. Cached dicts are shared: treat them as read-only.
+QUIZ_CACHE_SIZE = int(os.getenv("QUIZ_CACHE_SIZE", "128"))
+
+_quiz_cache = OrderedDict()     # quiz_key → (path, mtime_ns, size, data, questions_by_id)
+_quiz_cache_lock = threading.Lock()
+
+
+def questions_by_id(quiz):
+    """{question_id: question} in quiz order, with the same `q_<index>` fallback ids as submit."""
+    return {
+        q.get("id") or f"q_{idx}": q
+        for idx, q in enumerate(quiz)
+        if isinstance(q, dict)
+    }
+
+
+def _cache_quiz(quiz_key, path, data):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return
+    with _quiz_cache_lock:
+        _quiz_cache[quiz_key] = (path, stat.st_mtime_ns, stat.st_size, data, questions_by_id(data["quiz"]))
+        _quiz_cache.move_to_end(quiz_key)
+        while len(_quiz_cache) > QUIZ_CACHE_SIZE:
+            _quiz_cache.popitem(last=False)
+
+
+def _cached_quiz(quiz_key):
+    with _quiz_cache_lock:
+        cached = _quiz_cache.get(quiz_key)
+    if cached is None:
+        return None
+
+    path, mtime_ns, size, data, by_id = cached
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        stat = None
+    if stat is None or (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+        with _quiz_cache_lock:
+            if _quiz_cache.get(quiz_key) is cached:
+                del _quiz_cache[quiz_key]
+        return None
+
+    with _quiz_cache_lock:
+        if quiz_key in _quiz_cache:
+            _quiz_cache.move_to_end(quiz_key)
+    return data, by_id
+
+
+def load_quiz_with_index(quiz_key):
+    """(quiz data, {question_id: question}) for a cache key, or None."""
+    if not quiz_key or not _QUIZ_KEY.fullmatch(quiz_key):
+        return None
+
+    cached = _cached_quiz(quiz_key)
+    if cached is not None:
+        return cached
+
+    entry = _read_index().get(quiz_key)
+    quiz_file_path = os.path.join(QUIZZES_FOLDER, entry["file"]) if entry else _quiz_file_path(quiz_key)
 
     print(f"🔎 Looking for quiz file: {quiz_file_path}")
 
     if not os.path.exists(quiz_file_path):
-        return None   # 🔥 THIS IS THE FIX
+        return None
 
-    with open(quiz_file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = read_json(quiz_file_path)
 
     # Extra safety: reject empty quizzes
     if not data.get("quiz"):
         return None
 
-    return data
+    _cache_quiz(quiz_key, quiz_file_path, data)
+    return data, questions_by_id(data["quiz"])
+
+
+def load_quiz_by_key(quiz_key):
+    """Quiz data for a cache key (as returned by upload), or None."""
+    loaded = load_quiz_with_index(quiz_key)
+    return loaded[0] if loaded else None
+
+
+def load_user_attempt(user_id):
+    """A saved attempt (attempt store first, then attempt files), or None."""
+    if ATTEMPT_STORE_ENABLED:
+        attempt = get_attempt_store().get_attempt(user_id)
+        if attempt is not None:
+            return attempt
+    path = find_user_attempt(user_id)
+    return read_json(path) if path else None
+
+
+def find_user_attempt(user_id):
+    """Path of a saved attempt (.json or .json.gz) for this user/submission id, or None."""
+    for suffix in ATTEMPT_SUFFIXES:
+        matches = glob.glob(os.path.join(USER_ATTEMPTS_FOLDER, f"*_{glob.escape(user_id)}{suffix}"))
+        if matches:
+            return matches[0]
+    return None
+
+
+def existing_quiz_key(pdf_paths, params=None):
+    """Cache key for these PDF files, or None if any of them is missing."""
+    pdf_paths = [pdf_paths] if isinstance(pdf_paths, str) else list(pdf_paths)
+    if not pdf_paths or not all(os.path.isfile(p) for p in pdf_paths):
+        return None
+    return quiz_cache_key(pdf_paths, params)
+
+
+def load_existing_quiz(pdf_paths, params=None):
+    """Cached quiz for these PDF files (by content) and generation parameters, or None."""
+    return load_quiz_by_key(existing_quiz_key(pdf_paths, params))
@@ -0,0 +1,189 @@
+# persistence_benchmark.py
+# Write / read latency and file size of quiz and attempt files, per storage format.
+#
+#   python -m benchmarks.persistence_benchmark --questions 20 --repeats 200
+#
+# Formats: "legacy" (json.dump indent=4, written in place), "compact" (the
+# current writer: atomic + compact, orjson when installed) and "compact_gzip".
+# A concurrent pass then has several threads rewrite the same attempt file
+# while readers parse it, and counts torn reads.
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+
+from benchmarks.pipeline_benchmark import summarize
+from Quiz import persistence
+
+EMBEDDING_DIM = 384
+
+
+def synthetic_quiz(num_questions):
+    quiz = []
+    for i in range(num_questions):
+        if i % 10 < 7:
+            quiz.append({
+                "id": f"q_{i}",
+                "question": f"Explain concept number {i} and why it matters in the paper.",
+                "answer": "A reference answer of a couple of sentences. " * 3,
+                "explanation": "Why the reference answer is right, as generated by the model.",
+                "type": "SAQ",
+            })
+        else:
+            quiz.append({
+                "id": f"q_{i}",
+                "question": f"Which statement about topic {i} is correct?",
+                "options": {k: f"Option {k} for question {i}" for k in "ABCD"},
+                "correct_answer": random.choice("ABCD"),
+                "explanation": "Short explanation of the correct option.",
+                "type": "MCQ",
+            })
+    return {
+        "quiz_key": "0" * 64,
+        "pdf_names": "bench_paper",
+        "pdf_hashes": ["0" * 64],
+        "generation": {"max_questions": num_questions},
+        "quiz": quiz,
+        "created_at": "2026-01-01T00:00:00",
+        "reference_embeddings": {
+            q["id"]: [round(random.uniform(-0.2, 0.2), 4) for _ in range(EMBEDDING_DIM)]
+            for q in quiz if q["type"] == "SAQ"
+        },
+    }
+
+
+def synthetic_attempt(quiz):
+    evaluated = []
+    for q in quiz["quiz"]:
+        entry = dict(q, user_answer="A candidate answer of a sentence or two.", is_correct=random.random() < 0.5)
+        if q["type"] == "SAQ":
+            entry.update(score=round(random.random(), 2), verdict="PARTIALLY_CORRECT", graded_by="llm")
+        evaluated.append(entry)
+    return {
+        "user_id": "00000000-0000-0000-0000-000000000000",
+        "pdf_names": quiz["pdf_names"],
+        "total_questions": len(evaluated),
+        "total_correct": sum(1 for q in evaluated if q["is_correct"]),
+        "evaluated_quiz": evaluated,
+        "grading_status": "complete",
+    }
+
+
+# ============================================================
+# Formats
+# ============================================================
+def _legacy_write(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+
+
+def _legacy_read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+FORMATS = {
+    "legacy": (".json", _legacy_write, _legacy_read),
+    "compact": (".json", lambda p, d: persistence.write_json(p, d), persistence.read_json),
+    "compact_gzip": (".json.gz", lambda p, d: persistence.write_json(p, d, compress=True), persistence.read_json),
+}
+
+
+def bench_format(workdir, name, data, repeats):
+    suffix, write, read = FORMATS[name]
+    path = os.path.join(workdir, f"{name}{suffix}")
+    writes, reads = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        write(path, data)
+        writes.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        read(path)
+        reads.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "bytes": os.path.getsize(path),
+        "write_ms": summarize(writes),
+        "read_ms": summarize(reads),
+    }
+
+
+def bench_concurrent(workdir, name, data, writers, readers, seconds):
+    """Rewrite one file from several threads while others read it; count unreadable reads."""
+    suffix, write, read = FORMATS[name]
+    path = os.path.join(workdir, f"concurrent_{name}{suffix}")
+    write(path, data)
+    stop = time.monotonic() + seconds
+    counts = {"writes": 0, "reads": 0, "torn_reads": 0}
+    lock = threading.Lock()
+
+    def writer():
+        while time.monotonic() < stop:
+            write(path, data)
+            with lock:
+                counts["writes"] += 1
+
+    def reader():
+        while time.monotonic() < stop:
+            try:
+                ok = read(path) == data
+            except (ValueError, EOFError, OSError):
+                ok = False
+            with lock:
+                counts["reads"] += 1
+                counts["torn_reads"] += 0 if ok else 1
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quiz / attempt file persistence benchmark")
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--concurrent-seconds", type=float, default=2.0)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    random.seed(0)
+    quiz = synthetic_quiz(args.questions)
+    attempt = synthetic_attempt(quiz)
+
+    workdir = tempfile.mkdtemp(prefix="persistence_bench_")
+    report = {"orjson": persistence.ORJSON_AVAILABLE, "filelock": persistence.FILELOCK_AVAILABLE}
+    try:
+        for label, data in (("quiz", quiz), ("attempt", attempt)):
+            report[label] = {}
+            for name in FORMATS:
+                report[label][name] = result = bench_format(workdir, name, data, args.repeats)
+                print(f"⏱️ {label:<8} {name:<13} {result['bytes']:>9} B   "
+                      f"write p50 {result['write_ms']['p50']:.3f} ms   read p50 {result['read_ms']['p50']:.3f} ms")
+
+        report["concurrent"] = {}
+        for name in FORMATS:
+            report["concurrent"][name] = counts = bench_concurrent(
+                workdir, name, attempt, args.writers, args.readers, args.concurrent_seconds
+            )
+            print(f"🔀 concurrent {name:<13} {counts}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+# pipeline_benchmark.py
+# End-to-end pipeline benchmark against the offline LLM stub (no Groq key needed).
+#
+#   python -m benchmarks.pipeline_benchmark --pdf-dir Uploads --latency-ms 800 --jitter-ms 250
+#
+# Each sub-folder of --pdf-dir is one PDF set (a multi-PDF quiz); loose PDFs
+# are benchmarked one per set. Reports per-stage latency for generation,
+# /submit_quiz/ latency (response and fully graded) + throughput, and scheduler generation/scoring time.
+import os
+import sys
+import json
+import time
+import glob
+import random
+import shutil
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+STUB_PORT = 8090
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def summarize(values):
+    return {
+        "n": len(values),
+        "mean": round(statistics.mean(values), 3) if values else 0.0,
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "max": round(max(values), 3) if values else 0.0,
+    }
+
+
+def find_pdf_sets(pdf_dir):
+    sets = []
+    for entry in sorted(os.listdir(pdf_dir)):
+        path = os.path.join(pdf_dir, entry)
+        if os.path.isdir(path):
+            pdfs = sorted(glob.glob(os.path.join(path, "*.pdf")))
+            if pdfs:
+                sets.append(pdfs)
+        elif entry.lower().endswith(".pdf"):
+            sets.append([path])
+    return sets
+
+
+# ============================================================
+# Stage 1: quiz generation (per-stage timings from pipeline events)
+# ============================================================
+def bench_generation(pdf_sets, max_questions):
+    from Quiz.quiz_generator import iter_quiz_generation
+
+    runs = []
+    for pdf_paths in pdf_sets:
+        start = time.perf_counter()
+        last = start
+        stage = "startup"
+        stages = {}
+        first_question = None
+        quiz = []
+
+        for event in iter_quiz_generation(pdf_paths, max_questions=max_questions, save=False):
+            now = time.perf_counter()
+            # Progress events mark the start of a stage; time since the last event belongs to the current one
+            stages[stage] = stages.get(stage, 0.0) + (now - last)
+            last = now
+
+            if event["event"] == "progress":
+                stage = event["stage"]
+            elif event["event"] == "questions" and first_question is None:
+                first_question = now - start
+            elif event["event"] == "done":
+                quiz = event["result"]["quiz"]
+
+        total = time.perf_counter() - start
+        runs.append({
+            "pdfs": [os.path.basename(p) for p in pdf_paths],
+            "total_s": round(total, 3),
+            "time_to_first_question_s": round(first_question or total, 3),
+            "stages_s": {k: round(v, 3) for k, v in stages.items()},
+            "questions": len(quiz),
+            "quiz": quiz,
+            "pdf_paths": pdf_paths,
+        })
+        print(f"  • {', '.join(runs[-1]['pdfs'])}: {total:.2f}s total, "
+              f"first question after {runs[-1]['time_to_first_question_s']:.2f}s, {len(quiz)} questions")
+    return runs
+
+
+# ============================================================
+# Stage 2: /submit_quiz/ through the Flask test client
+# ============================================================
+def synthetic_answers(quiz):
+    mcq_answers = {}
+    saq_answers = {}
+    for q in quiz:
+        if q.get("type") == "MCQ":
+            mcq_answers[q["id"]] = random.choice(["A", "B", "C", "D"])
+        else:
+            saq_answers[q["id"]] = random.choice([q.get("answer", ""), "I am not sure.", ""])
+    return mcq_answers, saq_answers
+
+
+def bench_submit(app_module, generation_runs, submissions, concurrency):
+    from Quiz.saving_quiz import save_quiz
+    from Quiz.quiz_generator import generation_params
+
+    client = app_module.app.test_client()
+    payloads = []
+    for run in generation_runs:
+        save_quiz(run["pdf_paths"], run["quiz"], generation_params(app_module.MAX_QUESTIONS))
+        quiz_key = app_module.make_quiz_key(run["pdf_paths"])
+        names = [os.path.basename(p) for p in run["pdf_paths"]]
+        for _ in range(submissions):
+            mcq, saq = synthetic_answers(run["quiz"])
+            payloads.append({"quiz_key": quiz_key, "pdf_names": names, "mcq_answers": mcq, "saq_answers": saq})
+
+    def submit(payload):
+        start = time.perf_counter()
+        response = client.post("/submit_quiz/", json=payload)
+        accepted = time.perf_counter() - start
+        if response.status_code != 200:
+            return accepted, accepted, response.status_code
+
+        # SAQs are graded in the background; poll until the attempt is final
+        body = response.get_json()
+        while body.get("status") == "pending":
+            time.sleep(0.05)
+            body = client.get(f"/submissions/{body['submission_id']}").get_json()
+        status = 200 if body.get("status") == "complete" else 500
+        return accepted, time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(submit, payloads))
+    wall = time.perf_counter() - start
+
+    failures = sum(1 for r in results if r[2] != 200)
+    return {
+        "latency_s": summarize([r[0] for r in results]),
+        "graded_latency_s": summarize([r[1] for r in results]),
+        "throughput_rps": round(len(results) / wall, 3) if wall else 0.0,
+        "failures": failures,
+    }
+
+
+# ============================================================
+# Stage 3: scheduler (generation + scoring) on a throwaway SQLite DB
+# ============================================================
+def bench_scheduler(app_module, pdf_sets, worker_concurrency=0):
+    """Sequential scheduler job, or a Backend.worker pool when `worker_concurrency` > 0."""
+    import Backend.jobs as jobs
+    from Backend.worker import Worker
+    from Backend.extensions import db
+    from Backend.models.candidate_models import CandidateResearch, CandidateEvalAI, CandidateQuizQuestion
+
+    research_root = tempfile.mkdtemp(prefix="evalai_research_")
+    jobs.RESEARCH_FILES_ROOT = research_root
+
+    def run_jobs():
+        if worker_concurrency > 0:
+            Worker(app_module.app, evaluation_concurrency=worker_concurrency,
+                   generation_concurrency=worker_concurrency, poll_seconds=0.1).run(once=True)
+        else:
+            app_module.process_candidate_eval()
+
+    with app_module.app.app_context():
+        db.create_all()
+        for candidate_id, pdf_paths in enumerate(pdf_sets, 1):
+            for path in pdf_paths:
+                # Prefix with the candidate id so file names never collide across sets
+                target = f"{candidate_id}_{os.path.basename(path)}"
+                shutil.copy(path, os.path.join(research_root, target))
+                db.session.add(CandidateResearch(candidate_id=candidate_id, title=target, file=target))
+            db.session.add(CandidateEvalAI(candidate_id=candidate_id, to_pickup=True, obt_score=0))
+        db.session.commit()
+
+    start = time.perf_counter()
+    run_jobs()
+    generation_s = time.perf_counter() - start
+
+    with app_module.app.app_context():
+        for record in CandidateEvalAI.query.all():
+            for q in CandidateQuizQuestion.query.filter_by(quiz_id=record.id).all():
+                if q.question_type == "SAQ":
+                    q.user_answer = random.choice([q.answer_text, "I am not sure."])
+            record.candidate_attempted = True
+        db.session.commit()
+
+    start = time.perf_counter()
+    run_jobs()
+    scoring_s = time.perf_counter() - start
+
+    shutil.rmtree(research_root, ignore_errors=True)
+    return {
+        "candidates": len(pdf_sets),
+        "generation_s": round(generation_s, 3),
+        "scoring_s": round(scoring_s, 3),
+        "generation_per_candidate_s": round(generation_s / max(1, len(pdf_sets)), 3),
+        "scoring_per_candidate_s": round(scoring_s / max(1, len(pdf_sets)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--pdf-dir", default="Uploads", help="folder of PDFs / PDF-set sub-folders")
+    parser.add_argument("--max-questions", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--jitter-ms", type=float, default=250.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--cassette", help="replay recorded responses from this JSONL cassette")
+    parser.add_argument("--submissions", type=int, default=5, help="submissions per generated quiz")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent /submit_quiz/ requests")
+    parser.add_argument("--skip-scheduler", action="store_true")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="run scheduler jobs on a Backend.worker with this concurrency per lane (0: sequential job)")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    pdf_sets = find_pdf_sets(args.pdf_dir)
+    if not pdf_sets:
+        sys.exit(f"No PDFs found under {args.pdf_dir}")
+
+    # Everything below must be configured before the app modules are imported
+    workdir = tempfile.mkdtemp(prefix="evalai_bench_")
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}"
+    os.environ["LLM_CACHE_ENABLED"] = "0"
+    os.environ["EVALAI_RUN_SCHEDULER"] = "0"
+    os.environ.setdefault("GROQ_REQUESTS_PER_MINUTE", "100000")
+    os.environ.setdefault("GROQ_TOKENS_PER_MINUTE", "100000000")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    os.environ["ATTEMPT_STORE_PATH"] = os.path.join(workdir, "attempts.sqlite3")
+
+    from LLM.stub_server import start_stub_server
+    server, stub_state = start_stub_server(
+        port=STUB_PORT,
+        mode="replay" if args.cassette else "synthetic",
+        cassette=args.cassette,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+    )
+
+    import Quiz.saving_quiz as saving_quiz
+    saving_quiz.QUIZZES_FOLDER = os.path.join(workdir, "quizzes")
+    saving_quiz.USER_ATTEMPTS_FOLDER = os.path.join(workdir, "user_quizzes")
+
+    report = {"config": vars(args), "pdf_sets": len(pdf_sets)}
+    try:
+        print(f"\n⏱️ Generation ({len(pdf_sets)} PDF set(s))")
+        runs = bench_generation(pdf_sets, args.max_questions)
+        totals = [r["total_s"] for r in runs]
+        report["generation"] = {
+            "total_s": summarize(totals),
+            "time_to_first_question_s": summarize([r["time_to_first_question_s"] for r in runs]),
+            "quizzes_per_minute": round(60 * len(runs) / sum(totals), 3) if sum(totals) else 0.0,
+            "runs": [{k: v for k, v in r.items() if k not in ("quiz", "pdf_paths")} for r in runs],
+        }
+
+        import Backend.flaask as app_module
+
+        print(f"\n⏱️ /submit_quiz/ ({args.submissions} per quiz, concurrency {args.concurrency})")
+        report["submit"] = bench_submit(app_module, runs, args.submissions, args.concurrency)
+        print(f"  {report['submit']}")
+
+        if not args.skip_scheduler:
+            print("\n⏱️ Scheduler (generation + scoring)")
+            saving_quiz.QUIZZES_FOLDER = os.path.join(workdir, "scheduler_quizzes")
+            report["scheduler"] = bench_scheduler(app_module, pdf_sets, args.workers)
+            print(f"  {report['scheduler']}")
+
+        report["stub"] = dict(stub_state.counters)
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n" + json.dumps({k: v for k, v in report.items() if k != "config"}, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# conftest.py
+# Shared fixtures: a Flask app on a throwaway SQLite database with the
+# CandidateEvalAI tables, as Backend/worker.py's create_app() builds it.
+import pytest
+from flask import Flask
+
+from Backend.extensions import db
+from Backend.models.candidate_models import CandidateEvalAI
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask("evalai_tests")
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'evalai.sqlite3'}"
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"connect_args": {"timeout": 30}}
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def add_generation_rows(app, n):
+    """`n` candidates waiting for a quiz; returns their CandidateEvalAI ids."""
+    with app.app_context():
+        rows = [CandidateEvalAI(candidate_id=i + 1, to_pickup=True, obt_score=0) for i in range(n)]
+        db.session.add_all(rows)
+        db.session.commit()
+        return [row.id for row in rows]
+
+
+def add_evaluation_rows(app, n, first_candidate_id=1):
+    """`n` attempted quizzes waiting for scoring; returns their CandidateEvalAI ids."""
+    with app.app_context():
+        rows = [CandidateEvalAI(candidate_id=first_candidate_id + i, candidate_attempted=True, obt_score=0) for i in range(n)]
+        db.session.add_all(rows)
+        db.session.commit()
+        return [row.id for row in rows]
@@ -0,0 +1,24 @@
+# test_answer_similarity.py
+# Calibration input: only LLM verdicts from fully graded attempts are used.
+from Quiz.answer_similarity import GRADED_BY_SIMILARITY, _attempt_items
+from Quiz.attempt_store import PENDING_VERDICT
+
+
+def _saq(verdict, graded_by="llm"):
+    return {"type": "SAQ", "user_answer": "an answer", "correct_answer": "the answer",
+            "verdict": verdict, "graded_by": graded_by}
+
+
+def test_only_graded_llm_verdicts_are_used():
+    attempts = [
+        {"grading_status": "complete", "evaluated_quiz": [
+            _saq("CORRECT"), _saq("INCORRECT", graded_by=GRADED_BY_SIMILARITY), _saq(PENDING_VERDICT),
+            {"type": "MCQ", "user_answer": "A", "verdict": "CORRECT"},
+        ]},
+        {"grading_status": "pending", "evaluated_quiz": [_saq(PENDING_VERDICT), _saq("PARTIALLY_CORRECT")]},
+        {"grading_status": "failed", "evaluated_quiz": [_saq("INCORRECT")]},
+        # Attempts saved before background grading have no status and were graded inline
+        {"evaluated_quiz": [_saq("PARTIALLY_CORRECT")]},
+    ]
+
+    assert [item["verdict"] for item in _attempt_items(attempts)] == ["CORRECT", "PARTIALLY_CORRECT"]
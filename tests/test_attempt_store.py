@@ -0,0 +1,150 @@
+# test_attempt_store.py
+# Incremental rollups (record / record_many, including re-saves that retract
+# the old contribution) must match a full rebuild_rollups().
+import random
+import sqlite3
+
+from Quiz.attempt_store import AttemptStore, PENDING_VERDICT, SAQ_PASS_SCORE
+
+ROLLUP_QUERIES = {
+    "quiz_rollups": "SELECT quiz_key, attempts, completed, total_questions, total_correct, ROUND(percentage_sum, 6) "
+                    "FROM quiz_rollups WHERE attempts != 0",
+    "question_rollups": "SELECT quiz_key, question_id, type, answered, correct, score_n, ROUND(score_sum, 6) "
+                        "FROM question_rollups WHERE answered != 0 OR score_n != 0",
+    "verdict_rollups": "SELECT quiz_key, question_id, verdict, n FROM verdict_rollups WHERE n != 0",
+    "score_rollups": "SELECT quiz_key, question_id, bucket, n FROM score_rollups WHERE n != 0",
+}
+
+
+def _rollups(path):
+    # Retracted keys keep zero-count rows incrementally; a rebuild drops them
+    conn = sqlite3.connect(path)
+    try:
+        return {name: sorted(conn.execute(sql).fetchall()) for name, sql in ROLLUP_QUERIES.items()}
+    finally:
+        conn.close()
+
+
+def _attempt(rng, attempt_id, quiz_key, graded):
+    quiz = []
+    for idx in range(6):
+        if idx % 2:
+            quiz.append({"question_id": f"q_{idx}", "type": "MCQ", "is_correct": rng.random() < 0.6})
+        elif graded:
+            score = round(rng.uniform(0, 10), 1)
+            quiz.append({
+                "question_id": f"q_{idx}", "type": "SAQ", "is_correct": score >= SAQ_PASS_SCORE, "score": score,
+                "verdict": rng.choice(["CORRECT", "PARTIALLY_CORRECT", "INCORRECT"]), "graded_by": "llm",
+            })
+        else:
+            quiz.append({"question_id": f"q_{idx}", "type": "SAQ", "verdict": PENDING_VERDICT})
+    correct = sum(1 for q in quiz if q.get("is_correct"))
+    return {
+        "user_id": attempt_id,
+        "quiz_key": quiz_key,
+        "pdf_names": quiz_key,
+        "attempted_at": "2026-01-01 00:00:00",
+        "total_questions": len(quiz),
+        "total_correct": correct,
+        "percentage_correct": round(correct / len(quiz) * 100, 2),
+        "saq_average_score": None,
+        "evaluated_quiz": quiz,
+        "grading_status": "complete" if graded else "pending",
+    }
+
+
+def test_incremental_rollups_match_rebuild(tmp_path):
+    path = str(tmp_path / "attempts.sqlite3")
+    store = AttemptStore(path)
+    rng = random.Random(43)
+
+    # Pending saves, then the graded re-saves (retract-then-reapply), some in batches with repeats
+    ids = [f"user-{i}" for i in range(60)]
+    for attempt_id in ids:
+        store.record(_attempt(rng, attempt_id, rng.choice(["quiz-a", "quiz-b", "quiz-c"]), graded=False))
+    for i in range(0, len(ids), 7):
+        batch = [_attempt(rng, attempt_id, "quiz-a" if attempt_id < "user-3" else "quiz-b", graded=True)
+                 for attempt_id in ids[i:i + 7]]
+        store.record_many(batch + batch[:2])
+    for attempt_id in rng.sample(ids, 15):
+        store.record(_attempt(rng, attempt_id, "quiz-c", graded=True))
+
+    incremental = _rollups(path)
+    store.rebuild_rollups()
+    rebuilt = _rollups(path)
+
+    assert incremental == rebuilt
+    assert sum(row[1] for row in rebuilt["quiz_rollups"]) == len(ids)
+
+
+def test_resave_replaces_attempt(tmp_path):
+    store = AttemptStore(str(tmp_path / "attempts.sqlite3"))
+    rng = random.Random(7)
+
+    store.record(_attempt(rng, "user-1", "quiz-a", graded=False))
+    graded = _attempt(rng, "user-1", "quiz-a", graded=True)
+    store.record(graded)
+
+    rollup = store.quiz_rollup("quiz-a")
+    assert rollup["attempts"] == 1
+    assert rollup["completed"] == 1
+    assert store.get_attempt("user-1")["grading_status"] == "complete"
+    saq = [q for q in store.question_rollups("quiz-a") if q["type"] == "SAQ"]
+    assert all(sum(q["score_distribution"]) == 1 for q in saq)
+
+
+def test_saq_correctness_follows_score(tmp_path):
+    path = str(tmp_path / "attempts.sqlite3")
+    store = AttemptStore(path)
+    rng = random.Random(3)
+    attempt = _attempt(rng, "user-1", "quiz-a", graded=True)
+    q_0 = attempt["evaluated_quiz"][0]
+    # Graded before the pass mark was fixed: a 3/10 answer saved as correct
+    q_0.update(score=3.0, is_correct=True)
+    store.record(attempt)
+
+    assert {q["question_id"]: q for q in store.question_rollups("quiz-a")}["q_0"]["correct"] == 0
+
+    # Rows written by older versions are corrected by a rebuild
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE question_results SET is_correct = 1 WHERE question_id = 'q_0'")
+    conn.commit()
+    conn.close()
+    store.rebuild_rollups()
+    assert {q["question_id"]: q for q in store.question_rollups("quiz-a")}["q_0"]["correct"] == 0
+
+
+def test_quiz_rollup_sums_only_graded_attempts(tmp_path):
+    path = str(tmp_path / "attempts.sqlite3")
+    store = AttemptStore(path)
+    rng = random.Random(11)
+    graded = _attempt(rng, "user-1", "quiz-a", graded=True)
+    pending = _attempt(rng, "user-2", "quiz-a", graded=False)
+    failed = {**_attempt(rng, "user-3", "quiz-a", graded=True), "grading_status": "failed"}
+    store.record_many([graded, pending, failed])
+
+    rollup = store.quiz_rollup("quiz-a")
+    assert (rollup["attempts"], rollup["completed"]) == (3, 1)
+    assert rollup["average_percentage"] == graded["percentage_correct"]
+    assert rollup["correct_rate"] == round(graded["total_correct"] / graded["total_questions"], 4)
+
+    store.rebuild_rollups()
+    assert store.quiz_rollup("quiz-a") == rollup
+
+
+def test_old_store_rollups_are_rebuilt_on_open(tmp_path):
+    path = str(tmp_path / "attempts.sqlite3")
+    rng = random.Random(5)
+    store = AttemptStore(path)
+    store.record_many([_attempt(rng, f"user-{i}", "quiz-a", graded=i % 2 == 0) for i in range(6)])
+    expected = _rollups(path)
+    # A store written under the old rules: pending attempts in the sums, no rollup version
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE quiz_rollups SET total_questions = total_questions + 18, percentage_sum = percentage_sum + 50")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+
+    AttemptStore(path)
+
+    assert _rollups(path) == expected
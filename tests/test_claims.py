@@ -0,0 +1,128 @@
+# test_claims.py
+# CandidateEvalAI claims on SQLite: concurrent claimers never share a row,
+# leases expire, and running jobs renew their leases. `app` is in conftest.py.
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import Backend.claims as claims
+from Backend.claims import claim_evaluation_records, claim_generation_records, renew_leases, queue_stats
+from Backend.extensions import db
+from Backend.models.candidate_models import CandidateEvalAI
+from tests.conftest import add_generation_rows
+
+
+def _age(app, record_id, minutes):
+    with app.app_context():
+        record = db.session.get(CandidateEvalAI, record_id)
+        db.session.query(CandidateEvalAI).filter_by(id=record.id).update(
+            {CandidateEvalAI.updated_at: datetime.now(timezone.utc) - timedelta(minutes=minutes)},
+            synchronize_session=False,
+        )
+        db.session.commit()
+
+
+def test_concurrent_claimers_never_share_rows(app):
+    ids = add_generation_rows(app, 40)
+    claimed = []
+    lock = threading.Lock()
+
+    def claimer():
+        with app.app_context():
+            while True:
+                records = claim_generation_records(batch_size=3)
+                if not records:
+                    break
+                with lock:
+                    claimed.extend(record.id for record in records)
+            db.session.remove()
+
+    threads = [threading.Thread(target=claimer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == ids
+    with app.app_context():
+        assert queue_stats()["generation"]["pending"] == 0
+        assert all(r.picked_up for r in CandidateEvalAI.query.all())
+
+
+def test_expired_lease_is_reclaimed(app):
+    record_id = add_generation_rows(app, 1)[0]
+    with app.app_context():
+        assert [r.id for r in claim_generation_records()] == [record_id]
+        assert claim_generation_records() == []
+
+    _age(app, record_id, claims.CLAIM_LEASE_MINUTES + 1)
+    with app.app_context():
+        assert [r.id for r in claim_generation_records()] == [record_id]
+
+
+def test_renewed_lease_is_not_reclaimed(app):
+    record_id = add_generation_rows(app, 1)[0]
+    with app.app_context():
+        claim_generation_records()
+
+    _age(app, record_id, claims.CLAIM_LEASE_MINUTES - 1)
+    with app.app_context():
+        assert renew_leases("generation", [record_id]) == 1
+    _age(app, record_id, 0)
+    with app.app_context():
+        assert claim_generation_records() == []
+
+
+def test_finished_rows_are_not_renewed(app):
+    record_id = add_generation_rows(app, 1)[0]
+    with app.app_context():
+        claim_generation_records()
+        db.session.get(CandidateEvalAI, record_id).completed = True
+        db.session.commit()
+        assert renew_leases("generation", [record_id]) == 0
+        assert claim_evaluation_records() == []
+
+
+def test_running_job_keeps_its_lease(app, monkeypatch):
+    jobs = pytest.importorskip("Backend.jobs")
+    # 0.6 s leases renewed every 0.1 s; the job runs for several leases
+    monkeypatch.setattr(claims, "CLAIM_LEASE_MINUTES", 0.01)
+    monkeypatch.setattr(claims, "CLAIM_RENEW_SECONDS", 0.1)
+    record_id = add_generation_rows(app, 1)[0]
+    stolen = []
+
+    def job(arg):
+        deadline = time.monotonic() + 2.0
+        while time.monotonic() < deadline:
+            with app.app_context():
+                stolen.extend(r.id for r in claim_generation_records())
+                db.session.remove()
+            time.sleep(0.05)
+
+    with app.app_context():
+        [claimed] = claim_generation_records()
+        jobs.run_job(jobs.GENERATION_LANE, job, claimed.id, [claimed.id])
+
+    assert stolen == []
+    # Without renewals the lease runs out
+    time.sleep(0.7)
+    with app.app_context():
+        assert [r.id for r in claim_generation_records()] == [record_id]
+
+
+def test_record_without_research_leaves_the_queue(app):
+    jobs = pytest.importorskip("Backend.jobs")
+    record_id = add_generation_rows(app, 1)[0]
+    with app.app_context():
+        [claimed] = claim_generation_records()
+        assert jobs.generate_for_record(claimed.id) is False
+
+        record = db.session.get(CandidateEvalAI, record_id)
+        assert record.progress_error_occured and not record.picked_up and not record.to_pickup
+    # Not even once its lease would have run out
+    _age(app, record_id, claims.CLAIM_LEASE_MINUTES + 1)
+    with app.app_context():
+        assert claim_generation_records() == []
+        assert queue_stats()["generation"]["pending"] == 0
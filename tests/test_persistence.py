@@ -0,0 +1,118 @@
+# test_persistence.py
+# Atomic writes, encoding round trips (json / orjson, plain / gzip) and the
+# file lock of Quiz/persistence.py.
+import os
+import threading
+
+import pytest
+
+import Quiz.persistence as persistence
+from Quiz.persistence import GZIP_MAGIC, atomic_write, file_lock, read_json, write_json
+
+SAMPLE = {
+    "pdf_names": "paper_ünïcode",
+    "quiz": [
+        {"id": f"q_{i}", "type": "MCQ" if i % 2 else "SAQ", "question": f"Question {i} — “quoted”?",
+         "options": {"A": "1", "B": "2"}, "score": i / 3, "is_correct": bool(i % 3), "verdict": None}
+        for i in range(50)
+    ],
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson" and not persistence.ORJSON_AVAILABLE:
+        pytest.skip("orjson is not installed")
+    if request.param == "json":
+        monkeypatch.setattr(persistence, "ORJSON_AVAILABLE", False)
+    return request.param
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("pretty", [False, True])
+def test_round_trip(tmp_path, encoder, compress, pretty):
+    path = tmp_path / ("quiz.json.gz" if compress else "quiz.json")
+
+    write_json(str(path), SAMPLE, compress=compress, pretty=pretty)
+
+    assert (path.read_bytes()[:2] == GZIP_MAGIC) == compress
+    assert read_json(str(path)) == SAMPLE
+
+
+def test_atomic_write_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "quiz.json"
+    write_json(str(path), SAMPLE)
+    write_json(str(path), {"quiz": []})
+
+    assert sorted(os.listdir(tmp_path)) == ["quiz.json"]
+    assert read_json(str(path)) == {"quiz": []}
+
+
+def test_readers_never_see_partial_files(tmp_path):
+    # Two documents of very different sizes, rewritten over and over while readers parse
+    path = str(tmp_path / "attempt.json")
+    small = {"grading_status": "pending", "quiz": []}
+    large = {"grading_status": "complete", "quiz": SAMPLE["quiz"] * 40}
+    write_json(path, small)
+
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        for i in range(300):
+            write_json(path, large if i % 2 else small, compress=i % 3 == 0)
+        stop.set()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                data = read_json(path)
+            except Exception as e:  # a torn file fails to parse
+                errors.append(e)
+                return
+            if data not in (small, large):
+                errors.append(ValueError("unexpected content"))
+                return
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+
+def test_failed_write_keeps_old_file(tmp_path, monkeypatch):
+    path = tmp_path / "quiz.json"
+    write_json(str(path), SAMPLE)
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(persistence.os, "replace", fail)
+    with pytest.raises(OSError):
+        atomic_write(str(path), b"{}")
+
+    assert read_json(str(path)) == SAMPLE
+    assert sorted(os.listdir(tmp_path)) == ["quiz.json"]
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "index.json")
+    counter = {"value": 0}
+
+    def bump():
+        for _ in range(50):
+            with file_lock(path):
+                value = counter["value"]
+                threading.Event().wait(0.0001)
+                counter["value"] = value + 1
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter["value"] == 200
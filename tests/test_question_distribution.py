@@ -0,0 +1,77 @@
+# test_question_distribution.py
+# Property test for the question planner: seeded random cluster sets and
+# budgets, checked against the invariants distribute_questions_across_clusters
+# promises.
+import random
+
+from Quiz.quiz_generator import SAQ_RATIO, _largest_remainder, distribute_questions_across_clusters
+
+CASES = 5000
+
+
+def _random_case(rng):
+    clusters = [
+        {"theme": f"Theme_{i}", "keywords": [f"kw{i}_{k}" for k in range(rng.choice([0, 1, 2, 3, 5, 8, 13, 40]))],
+         "pdf_name": "paper"}
+        for i in range(rng.randint(0, 12))
+    ]
+    max_questions = rng.randint(0, 60)
+    min_per_cluster = rng.randint(0, 6)
+    max_per_cluster = rng.choice([None, None, rng.randint(1, 15)])
+    return clusters, max_questions, min_per_cluster, max_per_cluster
+
+
+def test_distribution_invariants():
+    rng = random.Random(34)
+    for _ in range(CASES):
+        clusters, max_questions, min_per_cluster, max_per_cluster = _random_case(rng)
+        case = (len(clusters), [len(c["keywords"]) for c in clusters], max_questions, min_per_cluster, max_per_cluster)
+
+        plan = distribute_questions_across_clusters(clusters, max_questions, min_per_cluster, max_per_cluster)
+
+        if max_questions <= 0 or not any(c["keywords"] for c in clusters):
+            assert plan == [], case
+            continue
+
+        totals = [d["num_saq"] + d["num_mcq"] for d in plan]
+        planned = sum(totals)
+        floor = max(1, min(min_per_cluster, max_questions))
+        if max_per_cluster is not None:
+            floor = min(floor, max_per_cluster)
+
+        if max_per_cluster is None:
+            assert planned == max_questions, case
+        else:
+            assert planned <= max_questions, case
+        assert sum(d["num_saq"] for d in plan) == min(int(max_questions * SAQ_RATIO), planned), case
+        for d, total in zip(plan, totals):
+            assert d["num_saq"] >= 0 and d["num_mcq"] >= 0, case
+            assert d["cluster_info"]["keywords"], case
+            assert total >= floor, case
+            if max_per_cluster is not None:
+                assert total <= max_per_cluster, case
+        # Kept clusters stay in their original order, each at most once
+        kept = [id(d["cluster_info"]) for d in plan]
+        assert kept == [id(c) for c in clusters if id(c) in set(kept)], case
+
+
+def test_largest_remainder_invariants():
+    rng = random.Random(383)
+    for _ in range(CASES):
+        weights = [rng.choice([0, 0.5, 1, 2, 3, 7, 20]) for _ in range(rng.randint(1, 10))]
+        caps = rng.choice([None, [rng.randint(0, 8) for _ in weights]])
+        total = rng.randint(0, 80)
+        case = (total, weights, caps)
+
+        shares = _largest_remainder(total, weights, caps)
+
+        assert len(shares) == len(weights), case
+        assert all(s >= 0 for s in shares), case
+        assert all(s == 0 for s, w in zip(shares, weights) if w <= 0), case
+        open_room = sum(w > 0 and (caps is None or caps[i] > 0) for i, w in enumerate(weights))
+        if caps is None:
+            assert sum(shares) == (total if open_room else 0), case
+        else:
+            assert all(s <= c for s, c in zip(shares, caps)), case
+            capacity = sum(c for c, w in zip(caps, weights) if w > 0)
+            assert sum(shares) == min(total, capacity), case
@@ -0,0 +1,89 @@
+# test_quiz_analytics.py
+# /analytics/quiz/<key> data: difficulty labels, per-cluster rates and SAQ
+# score histograms, built from attempt store rollups.
+import sqlite3
+
+import pytest
+
+import Quiz.quiz_analytics as quiz_analytics_module
+from Quiz.attempt_store import AttemptStore, SAQ_PASS_SCORE, SCORE_BUCKETS
+from Quiz.quiz_analytics import quiz_analytics
+
+QUIZ = [
+    {"id": "q_0", "type": "MCQ", "question": "Easy MCQ", "source_cluster": "Theme_1"},
+    {"id": "q_1", "type": "MCQ", "question": "Hard MCQ", "source_cluster": "Theme_2"},
+    {"id": "q_2", "type": "SAQ", "question": "An SAQ", "source_cluster": "Theme_1"},
+]
+
+
+def _attempt(attempt_id, easy_correct, hard_correct, saq_score):
+    quiz = [
+        {"question_id": "q_0", "type": "MCQ", "is_correct": easy_correct},
+        {"question_id": "q_1", "type": "MCQ", "is_correct": hard_correct},
+        {"question_id": "q_2", "type": "SAQ", "is_correct": saq_score >= SAQ_PASS_SCORE, "score": saq_score,
+         "verdict": "CORRECT" if saq_score >= SAQ_PASS_SCORE else "INCORRECT"},
+    ]
+    correct = sum(q["is_correct"] for q in quiz)
+    return {
+        "user_id": attempt_id, "quiz_key": "quiz-a", "pdf_names": "paper", "attempted_at": "2026-01-01",
+        "total_questions": 3, "total_correct": correct, "percentage_correct": correct / 3 * 100,
+        "evaluated_quiz": quiz, "grading_status": "complete",
+    }
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = AttemptStore(str(tmp_path / "attempts.sqlite3"))
+    monkeypatch.setattr(quiz_analytics_module, "get_attempt_store", lambda: store)
+    monkeypatch.setattr(quiz_analytics_module, "load_quiz_with_index",
+                        lambda key: ({"quiz": QUIZ}, {q["id"]: q for q in QUIZ}) if key == "quiz-a" else None)
+    return store
+
+
+def test_quiz_analytics(store):
+    store.record_many([_attempt(f"user-{i}", True, i < 5, saq_score=i) for i in range(10)])
+
+    analytics = quiz_analytics("quiz-a")
+
+    assert analytics["attempts"] == 10
+    by_id = {q["question_id"]: q for q in analytics["questions"]}
+    assert [q["question_id"] for q in analytics["questions"]] == ["q_0", "q_1", "q_2"]
+    assert by_id["q_0"]["difficulty"] == "too_easy"
+    assert by_id["q_1"]["difficulty"] == "ok"
+    # SAQ scores 0-9: only 7, 8 and 9 reach the pass mark
+    assert by_id["q_2"]["difficulty"] == "too_hard"
+    assert by_id["q_2"]["score_distribution"] == [1] * SCORE_BUCKETS
+    assert by_id["q_2"]["verdicts"] == {"CORRECT": 3, "INCORRECT": 7}
+
+    clusters = {c["source_cluster"]: c for c in analytics["clusters"]}
+    assert clusters["Theme_1"]["correct_rate"] == 0.65
+    assert clusters["Theme_1"]["mcq_correct_rate"] == 1.0
+    assert clusters["Theme_2"]["correct_rate"] == 0.5
+
+
+def test_regraded_attempt_moves_histogram_bucket(store):
+    store.record(_attempt("user-1", True, False, saq_score=2))
+    store.record(_attempt("user-1", True, False, saq_score=8.5))
+
+    q_2 = {q["question_id"]: q for q in quiz_analytics("quiz-a")["questions"]}["q_2"]
+    expected = [0] * SCORE_BUCKETS
+    expected[8] = 1
+    assert q_2["score_distribution"] == expected
+    assert q_2["average_score"] == 8.5
+
+
+def test_unknown_quiz(store):
+    assert quiz_analytics("missing") is None
+
+
+def test_old_store_gets_score_histograms(tmp_path):
+    path = str(tmp_path / "attempts.sqlite3")
+    AttemptStore(path).record(_attempt("user-1", True, False, saq_score=3.2))
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE score_rollups")
+    conn.commit()
+    conn.close()
+
+    q_2 = {q["question_id"]: q for q in AttemptStore(path).question_rollups("quiz-a")}["q_2"]
+
+    assert q_2["score_distribution"][3] == 1
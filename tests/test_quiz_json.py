@@ -0,0 +1,81 @@
+# test_quiz_json.py
+# JSON-mode quiz output: parse_quiz_json shape checks and per-cluster limits,
+# and the text fallback when structured generation fails.
+import json
+
+import httpx
+import pytest
+from groq import APIStatusError
+
+import Quiz.quiz_generator as quiz_generator
+from Quiz.saving_quiz import parse_quiz_json
+
+
+def _saq(n):
+    return {"question": f"What is concept {n}?", "answer": f"Concept {n} is explained here.", "explanation": "x"}
+
+
+def _mcq(n):
+    return {"question": f"Which option describes item {n}?", "options": {"A": "one", "B": "two", "C": "three", "D": "four"},
+            "correct_answer": "A", "explanation": "y"}
+
+
+@pytest.mark.parametrize("cluster", [{"cluster_id": "C1", "saqs": 5}, {"cluster_id": "C1", "mcqs": {"q": 1}}])
+def test_non_list_questions_are_invalid(cluster):
+    with pytest.raises(ValueError):
+        parse_quiz_json(json.dumps({"clusters": [cluster]}), {"C1": (1, 1)})
+    assert not quiz_generator._is_structured_quiz(json.dumps({"clusters": [cluster]}), {"C1": (1, 1)})
+
+
+def test_repeated_cluster_id_respects_limits():
+    raw = json.dumps({"clusters": [
+        {"cluster_id": "C1", "saqs": [_saq(1)], "mcqs": [_mcq(1)]},
+        {"cluster_id": "C1", "saqs": [_saq(2), _saq(3)], "mcqs": [_mcq(2), _mcq(3)]},
+        {"cluster_id": "C2", "saqs": [_saq(4)], "mcqs": []},
+    ]})
+
+    result = parse_quiz_json(raw, {"C1": (2, 1), "C2": (1, 0)})
+
+    assert [q["type"] for q in result["C1"]] == ["SAQ", "MCQ", "SAQ"]
+    assert [q["question"] for q in result["C1"] if q["type"] == "SAQ"] == [_saq(1)["question"], _saq(2)["question"]]
+    assert len(result["C2"]) == 1
+
+
+def _status_error(status):
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    return APIStatusError("json_validate_failed", response=httpx.Response(status, request=request), body=None)
+
+
+@pytest.mark.parametrize("error", [_status_error(400), TypeError("'int' object is not iterable"), ValueError("bad")])
+def test_structured_failure_falls_back_to_text(monkeypatch, error):
+    def fail(batch, lane=None, usage=None):
+        raise error
+
+    def text_questions(cluster_info, num_saq, num_mcq, lane=None, usage=None):
+        questions = [{**_saq(f"{cluster_info['theme']}-{i}"), "type": "SAQ"} for i in range(num_saq)]
+        questions += [{**_mcq(f"{cluster_info['theme']}-{i}"), "type": "MCQ"} for i in range(num_mcq)]
+        return questions
+
+    monkeypatch.setattr(quiz_generator, "GENERATION_MODE", "json")
+    monkeypatch.setattr(quiz_generator, "load_existing_quiz", lambda paths, params: None)
+    monkeypatch.setattr(quiz_generator, "get_clusters",
+                        lambda path: {"Theme_1": [f"kw{i}" for i in range(6)], "Theme_2": [f"kw{i}" for i in range(4)]})
+    monkeypatch.setattr(quiz_generator, "generate_questions_from_clusters_json", fail)
+    monkeypatch.setattr(quiz_generator, "generate_questions_from_cluster", text_questions)
+
+    result = quiz_generator.generate_quiz_from_pdf(["/tmp/paper.pdf"], max_questions=6, save=False)
+
+    assert len(result["quiz"]) == 6
+
+
+def test_other_provider_errors_propagate(monkeypatch):
+    def fail(batch, lane=None, usage=None):
+        raise _status_error(401)
+
+    monkeypatch.setattr(quiz_generator, "GENERATION_MODE", "json")
+    monkeypatch.setattr(quiz_generator, "load_existing_quiz", lambda paths, params: None)
+    monkeypatch.setattr(quiz_generator, "get_clusters", lambda path: {"Theme_1": [f"kw{i}" for i in range(6)]})
+    monkeypatch.setattr(quiz_generator, "generate_questions_from_clusters_json", fail)
+
+    with pytest.raises(APIStatusError):
+        quiz_generator.generate_quiz_from_pdf(["/tmp/paper.pdf"], max_questions=4, save=False)
@@ -0,0 +1,77 @@
+# test_submissions.py
+# Backend/submissions.py: history eviction keeps pending submissions, and a
+# submission evicted while its grade is being saved still finishes as complete.
+import uuid
+
+import pytest
+
+import Backend.submissions as submissions
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    saved = {}
+
+    def save_user_attempt(submission_id, pdf_names, attempt_record):
+        saved[submission_id] = attempt_record["grading_status"]
+
+    monkeypatch.setattr(submissions.saving_quiz, "save_user_attempt", save_user_attempt)
+    monkeypatch.setattr(submissions, "_submissions", submissions.OrderedDict())
+    # Grading is driven by hand in these tests
+    monkeypatch.setattr(submissions._executor, "submit", lambda fn, *args: None)
+    return saved
+
+
+def _record():
+    quiz = [{"question_id": "q_0", "type": "SAQ", "is_correct": None}]
+    return {"total_questions": 1, "total_correct": 0, "evaluated_quiz": quiz}
+
+
+def _start(saq=True):
+    submission_id = str(uuid.uuid4())
+    jobs = [(0, {"question": "Q", "correct_answer": "A", "user_answer": "A"})] if saq else []
+    submissions.start_submission(submission_id, "paper", _record(), jobs)
+    return submission_id
+
+
+def test_eviction_skips_pending_submissions(saved, monkeypatch):
+    monkeypatch.setattr(submissions, "SUBMISSION_HISTORY", 3)
+    pending = _start()
+    finished = [_start(saq=False) for _ in range(4)]
+
+    assert list(submissions._submissions) == [pending] + finished[-2:]
+
+
+def test_submission_evicted_during_save_completes(saved, monkeypatch):
+    monkeypatch.setattr(submissions, "SUBMISSION_HISTORY", 1)
+    monkeypatch.setattr(submissions, "evaluate_saq_batch",
+                        lambda items: [{"is_correct": True, "score": 9, "verdict": "CORRECT"} for _ in items])
+    submission_id = _start()
+    save = submissions.saving_quiz.save_user_attempt
+
+    def save_and_evict(*args):
+        save(*args)
+        # Another submission arrives while the graded attempt is being written
+        _start(saq=False)
+
+    monkeypatch.setattr(submissions.saving_quiz, "save_user_attempt", save_and_evict)
+    submissions._grade(submission_id)
+
+    assert submission_id not in submissions._submissions
+    assert saved[submission_id] == submissions.COMPLETE
+
+
+def test_failed_save_after_grading_is_not_failed(saved, monkeypatch):
+    monkeypatch.setattr(submissions, "evaluate_saq_batch",
+                        lambda items: [{"is_correct": False, "score": 2, "verdict": "INCORRECT"} for _ in items])
+    submission_id = _start()
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(submissions.saving_quiz, "save_user_attempt", fail)
+    submissions._grade(submission_id)
+
+    view = submissions.get_submission(submission_id)
+    assert view["status"] == submissions.COMPLETE
+    assert view["version"] == 1
@@ -0,0 +1,99 @@
+# test_worker.py
+# Backend/worker.py with stubbed jobs: --once drains both lanes, and SIGTERM
+# stops claiming but lets in-flight jobs finish.
+import os
+import signal
+import sys
+import threading
+import time
+
+import pytest
+
+jobs = pytest.importorskip("Backend.jobs")
+import Backend.worker as worker_module
+from Backend.extensions import db
+from Backend.models.candidate_models import CandidateEvalAI
+from Backend.worker import Worker
+from tests.conftest import add_evaluation_rows, add_generation_rows
+
+
+def _stub_jobs(monkeypatch, generation_seconds=0.0, started=None):
+    def generate_for_record(record_id):
+        if started is not None:
+            started.set()
+        time.sleep(generation_seconds)
+        db.session.get(CandidateEvalAI, record_id).completed = True
+        db.session.commit()
+
+    def evaluate_records(record_ids):
+        for record in CandidateEvalAI.query.filter(CandidateEvalAI.id.in_(record_ids)):
+            record.evaluation_completed = True
+        db.session.commit()
+
+    monkeypatch.setattr(jobs, "generate_for_record", generate_for_record)
+    monkeypatch.setattr(jobs, "evaluate_records", evaluate_records)
+
+
+def _states(app):
+    with app.app_context():
+        rows = CandidateEvalAI.query.order_by(CandidateEvalAI.id).all()
+        return {row.id: (row.picked_up, row.completed, row.evaluation_completed) for row in rows}
+
+
+@pytest.fixture
+def restore_signals():
+    handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+    yield
+    for sig, handler in handlers.items():
+        signal.signal(sig, handler)
+
+
+def test_once_drains_both_lanes(app, monkeypatch, restore_signals):
+    _stub_jobs(monkeypatch)
+    generation_ids = add_generation_rows(app, 7)
+    evaluation_ids = add_evaluation_rows(app, 5, first_candidate_id=100)
+    monkeypatch.setattr(worker_module, "create_app", lambda: app)
+    monkeypatch.setattr(sys, "argv", ["worker", "--once", "--poll-seconds", "0.1",
+                                      "--evaluation-concurrency", "1", "--generation-concurrency", "3"])
+
+    worker_module.main()
+
+    states = _states(app)
+    assert all(states[i][1] for i in generation_ids)
+    assert all(states[i][2] for i in evaluation_ids)
+    summaries = {name: m.summary() for name, m in jobs.lane_metrics.items()}
+    assert summaries[jobs.GENERATION_LANE]["in_flight"] == 0
+    assert summaries[jobs.EVALUATION_LANE]["in_flight"] == 0
+
+
+def test_once_with_empty_queues_exits(app, monkeypatch):
+    _stub_jobs(monkeypatch)
+    thread = threading.Thread(target=Worker(app, poll_seconds=0.1).run, kwargs={"once": True})
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+
+
+def test_sigterm_finishes_in_flight_jobs_and_stops_claiming(app, monkeypatch, restore_signals):
+    started = threading.Event()
+    _stub_jobs(monkeypatch, generation_seconds=0.5, started=started)
+    ids = add_generation_rows(app, 6)
+    worker = Worker(app, evaluation_concurrency=1, generation_concurrency=2, poll_seconds=0.1)
+    signal.signal(signal.SIGTERM, worker.stop)
+
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    assert started.wait(timeout=10)
+    os.kill(os.getpid(), signal.SIGTERM)
+    # Handlers run on the main thread between bytecodes: keep it responsive while joining
+    deadline = time.monotonic() + 10
+    while thread.is_alive() and time.monotonic() < deadline:
+        thread.join(timeout=0.05)
+
+    assert not thread.is_alive()
+    states = _states(app)
+    picked = [i for i in ids if states[i][0]]
+    # Only the jobs running at SIGTERM were claimed, and each of them finished
+    assert 1 <= len(picked) <= 2
+    assert all(states[i][1] for i in picked)
+    assert not any(states[i][0] for i in ids if i not in picked)
@@ -1,4 +1,4 @@
-import React, { useState } from "react";
+import React, { useRef, useState } from "react";
 import QuizScreen from "./QuizScreen";
 
 function App() {
@@ -10,6 +10,11 @@ function App() {
   const [loading, setLoading] = useState(false);
   const [stage, setStage] = useState("UPLOAD");
   const [submissionResult, setSubmissionResult] = useState(null);
+  const [quizKey, setQuizKey] = useState(null);
+  const [generating, setGenerating] = useState(false);
+  const [progressMessage, setProgressMessage] = useState("");
+  // Bumped to stop polling a submission the user has moved away from
+  const pollRef = useRef(0);
 
   const BASE_URL = `${window.location.protocol}//${window.location.hostname}:8005`;
   console.log("Backend URL:", BASE_URL);
@@ -35,6 +40,23 @@ function App() {
   };
 
 
+  const describeProgress = (event) => {
+    switch (event.stage) {
+      case "extraction":
+        return `Extracting keywords from ${event.pdf} (${event.index}/${event.total})...`;
+      case "clustering":
+        return `Found ${event.clusters} topic clusters`;
+      case "distribution":
+        return `Planning ${event.planned_questions} questions...`;
+      case "generation":
+        return `Generating questions (${event.requests} requests)...`;
+      case "cache_hit":
+        return "Loading saved quiz...";
+      default:
+        return "Working...";
+    }
+  };
+
   const handleSubmitPDFs = async () => {
     if (files.length === 0) {
       alert("Please select at least one PDF");
@@ -46,16 +68,21 @@ function App() {
 
     setLoading(true);
     setUploadError(null); // reset previous error
+    setProgressMessage("Uploading PDFs...");
+    setMcqAnswers({});
+    setSaqAnswers({});
+    setQuizKey(null);
 
     try {
-      const res = await fetch(`${BASE_URL}/upload_pdfs/`, {
+      const res = await fetch(`${BASE_URL}/upload_pdfs/stream`, {
         method: "POST",
         body: formData,
       });
 
-      const data = await res.json();
-
-      if (!res.ok || data.error) {
+      // Validation errors come back as a plain JSON response
+      const contentType = res.headers.get("content-type") || "";
+      if (!res.ok || contentType.includes("application/json")) {
+        const data = await res.json();
         let message = data.message || "Upload failed";
 
         if (data.error === "invalid_file") {
@@ -71,21 +98,68 @@ function App() {
         return;
       }
 
-      const mcq = data.quiz.filter((q) => q.type === "MCQ");
-      const saq = data.quiz.filter((q) => q.type === "SAQ");
+      // NDJSON stream: questions are usable as soon as each cluster completes
+      setGenerating(true);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let started = false;
+      let streamed = { mcq: [], saq: [] };
+
+      const handleEvent = (event) => {
+        if (event.event === "progress") {
+          setProgressMessage(describeProgress(event));
+        } else if (event.event === "questions") {
+          streamed = {
+            mcq: [...streamed.mcq, ...event.questions.filter((q) => q.type === "MCQ")],
+            saq: [...streamed.saq, ...event.questions.filter((q) => q.type === "SAQ")],
+          };
+          setActiveQuiz(streamed);
+          if (!started && streamed.mcq.length > 0) {
+            started = true;
+            setLoading(false);
+            setStage("MCQ");
+          }
+        } else if (event.event === "done") {
+          setQuizKey(event.quiz_key);
+          // Keep the order the candidate has already seen; pick up anything missed
+          const seen = new Set([...streamed.mcq, ...streamed.saq].map((q) => q.id));
+          const missing = event.quiz.filter((q) => !seen.has(q.id));
+          streamed = {
+            mcq: [...streamed.mcq, ...missing.filter((q) => q.type === "MCQ")],
+            saq: [...streamed.saq, ...missing.filter((q) => q.type === "SAQ")],
+          };
+          setActiveQuiz(streamed);
+          if (!started) {
+            started = true;
+            setStage("MCQ");
+          }
+        } else if (event.event === "error") {
+          throw new Error(event.message);
+        }
+      };
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
 
-      setActiveQuiz({ mcq, saq });
-      setMcqAnswers({});
-      setSaqAnswers({});
-      setStage("MCQ");
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+        lines.filter((line) => line.trim()).forEach((line) => handleEvent(JSON.parse(line)));
+      }
+      if (buffer.trim()) handleEvent(JSON.parse(buffer));
     } catch (err) {
       console.error(err);
       setUploadError({
-        message: "Server not reachable",
+        message: err.message && err.message !== "Failed to fetch" ? err.message : "Server not reachable",
         files: [],
       });
+      setStage("UPLOAD");
     }
 
+    setGenerating(false);
+    setProgressMessage("");
     setLoading(false);
   };
 
@@ -105,6 +179,7 @@ function App() {
   // ----------------------
   const submitUserQuiz = async () => {
     const payload = {
+      quiz_key: quizKey,
       pdf_names: files.map((f) => f.name),
       mcq_answers: mcqAnswers,
       saq_answers: saqAnswers,
@@ -121,6 +196,11 @@ function App() {
       const data = await res.json();
       setSubmissionResult(data);
       setStage("RESULT");
+
+      // MCQs are scored already; short answers are graded in the background
+      if (data.status === "pending") {
+        pollSubmission(data.submission_id);
+      }
     } catch (err) {
       console.error(err);
       alert("Error submitting quiz");
@@ -128,10 +208,33 @@ function App() {
     setLoading(false);
   };
 
+  const pollSubmission = async (submissionId) => {
+    const pollId = ++pollRef.current;
+
+    while (pollRef.current === pollId) {
+      await new Promise((resolve) => setTimeout(resolve, 1500));
+      if (pollRef.current !== pollId) return;
+
+      try {
+        const res = await fetch(`${BASE_URL}/submissions/${submissionId}`);
+        if (!res.ok) continue;
+
+        const data = await res.json();
+        if (data.status !== "pending") {
+          setSubmissionResult((prev) => ({ ...prev, ...data }));
+          return;
+        }
+      } catch (err) {
+        console.error(err);
+      }
+    }
+  };
+
   // ----------------------
   // Retake quiz
   // ----------------------
   const handleRetakeQuiz = () => {
+    pollRef.current += 1;
     setMcqAnswers({});
     setSaqAnswers({});
     setSubmissionResult(null);
@@ -142,10 +245,12 @@ function App() {
   // New quiz
   // ----------------------
   const handleNewQuiz = () => {
+    pollRef.current += 1;
     setFiles([]);
     setMcqAnswers({});
     setSaqAnswers({});
     setActiveQuiz(null);
+    setQuizKey(null);
     setSubmissionResult(null);
     setUploadError(null);
     setStage("UPLOAD");
@@ -166,7 +271,7 @@ function App() {
 
       <h1 className="text-3xl font-bold mb-6">Quiz Generator</h1>
 
-      {loading && <p>Loading...</p>}
+      {loading && <p>{progressMessage || "Loading..."}</p>}
 
       {/* Upload */}
       {uploadError && (
@@ -245,6 +350,7 @@ function App() {
           type="MCQ"
           onAnswerChange={handleMcqAnswer}
           answers={mcqAnswers}
+          moreComing={generating}
           onFinish={() => setStage("SAQ")}
         />
       )}
@@ -256,6 +362,7 @@ function App() {
           type="SAQ"
           onAnswerChange={handleSaqAnswer}
           answers={saqAnswers}
+          moreComing={generating}
           onFinish={() => setStage("SUBMIT")}
         />
       )}
@@ -277,12 +384,23 @@ function App() {
           <p className="mb-4 text-lg">
             Score: <strong>{submissionResult.total_correct}</strong> /{" "}
             <strong>{submissionResult.total_questions}</strong>
+            {submissionResult.status === "pending" && (
+              <span className="ml-2 text-gray-600">(grading short answers...)</span>
+            )}
           </p>
 
+          {submissionResult.status === "failed" && (
+            <p className="mb-4 text-red-700">
+              Short answers could not be graded right now. Your attempt has been saved.
+            </p>
+          )}
+
           {submissionResult.evaluated_quiz.map((q, index) => (
             <div
               key={q.question_id}
-              className={`p-4 border rounded mb-4 ${q.is_correct ? "bg-green-100" : "bg-red-100"
+              className={`p-4 border rounded mb-4 ${q.is_correct === null
+                ? "bg-gray-50"
+                : q.is_correct ? "bg-green-100" : "bg-red-100"
                 }`}
             >
               <p className="font-semibold">
@@ -321,7 +439,9 @@ function App() {
               )}
 
               <p className="mt-1 font-semibold">
-                {q.is_correct ? "✅ Correct" : "❌ Incorrect"}
+                {q.is_correct === null
+                  ? "⏳ Grading..."
+                  : q.is_correct ? "✅ Correct" : "❌ Incorrect"}
               </p>
             </div>
           ))}
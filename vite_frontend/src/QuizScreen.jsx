@@ -1,6 +1,6 @@
 import { useState } from "react";
 
-export default function QuizScreen({ questions, type, onAnswerChange, answers, onFinish }) {
+export default function QuizScreen({ questions, type, onAnswerChange, answers, onFinish, moreComing = false }) {
     const [currentIndex, setCurrentIndex] = useState(0);
     const [warning, setWarning] = useState(""); // for popup text
     const q = questions[currentIndex];
@@ -19,6 +19,12 @@ export default function QuizScreen({ questions, type, onAnswerChange, answers, o
         // clear warning
         setWarning("");
 
+        // Questions are still streaming in; wait for the rest before finishing
+        if (currentIndex + 1 >= questions.length && moreComing) {
+            setWarning("More questions are still being generated, please wait...");
+            return;
+        }
+
         if (currentIndex + 1 < questions.length) {
             setCurrentIndex(currentIndex + 1);
         } else if (onFinish) {